@@ -0,0 +1,122 @@
+"""
+Benchmark de las respuestas a consultas generales y de la información del negocio.
+
+Compara el armado anterior de las respuestas (el diccionario de f-strings
+completo en cada llamada) con el paquete precompiladas por versión de la
+información del negocio, para una intención y para varias, y cuenta las
+lecturas de Redis por mensaje: antes cada mensaje leía "info_business";
+con BusinessInfoStore se lee una vez por intervalo de refresco.
+
+Requiere Redis configurado en .env (mismos valores que la app); no requiere
+MySQL ni el modelo.
+
+Uso:
+    python -m benchmarks.business_responses --iterations 100000 --messages 2000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from src.core.business_info import BUSINESS_INFO_KEY, BusinessInfoStore
+from src.core.memory import BUSINESS_CACHE, RedisManager
+from src.template.business_responses import BusinessResponseCache
+from benchmarks.checkpointer import RoundTripCounter
+from benchmarks.event_loop_lag import NullDatabase
+from benchmarks.session_state import BUSINESS_INFO
+
+
+def legacy_render(business_info: Dict[str, Any], intents: List[str]) -> Optional[str]:
+    """Armado anterior: todas las respuestas en cada llamada."""
+    intent_responses = {
+        "direccion": f"🏢 Nuestra dirección es: {business_info.get('direccion', 'No disponible')}",
+        "horario": f"🕒 Nuestro horario de atención es: {business_info.get('horario', 'No disponible')}",
+        "email": f"📧 Puedes contactarnos por email a: {business_info.get('email', 'No disponible')}",
+        "telefono1": f"📞 Nuestro teléfono principal es: {business_info.get('telefono_1', 'No disponible')}",
+        "telefono2": f"📞 Teléfono alternativo: {business_info.get('telefono_2', 'No disponible')}",
+        "telefono3": f"📞 Otro teléfono: {business_info.get('telefono_3', 'No disponible')}",
+        "whatsapp_servicio_tecnico": f"🔧 WhatsApp del servicio técnico: {business_info.get('whatsapp_servicio_tecnico', 'No disponible')}",
+        "whatsapp_ventas": f"📞 WhatsApp de ventas: {business_info.get('whatsapp_ventas', 'No disponible')}",
+        "whatsapp_administracion": f"📞 WhatsApp de administración: {business_info.get('whatsapp_administracion', 'No disponible')}",
+        "whatsapp_cobranza": f"📞 WhatsApp de cobranza: {business_info.get('whatsapp_cobranza', 'No disponible')}",
+        "security": f"🚨 Teléfono de Security 24: {business_info.get('security', 'No disponible')}",
+        "saludo": "👋 ¡Hola! Soy el asistente virtual de Taborra Alarmas SRL. ¿En qué puedo ayudarte hoy?",
+        "despedida": "👋 ¡Gracias por contactar a Taborra Alarmas SRL! Estamos para ayudarte cuando lo necesites.",
+        "agradecimiento": "🙏 De nada! Aqui estoy para lo que necesites de nuestros servicios! No dudes en preguntar si necesitas otra cosa."
+    }
+    detected_intents = [i for i in intents if i in intent_responses]
+    if detected_intents:
+        return "\n\n".join(intent_responses[intent] for intent in detected_intents)
+    return None
+
+
+def bench_render(iterations: int) -> None:
+    cache = BusinessResponseCache()
+    for label, intents in (("una intención", ["horario"]),
+                           ("varias", ["direccion", "horario", "whatsapp_ventas"])):
+        assert legacy_render(BUSINESS_INFO, intents) == cache.get(BUSINESS_INFO).render(intents)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            legacy_render(BUSINESS_INFO, intents)
+        legacy_us = (time.perf_counter() - start) / iterations * 1e6
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            cache.get(BUSINESS_INFO).render(intents)
+        bundle_us = (time.perf_counter() - start) / iterations * 1e6
+
+        print(f"{label:<14} anterior={legacy_us:6.2f} µs  precompilado={bundle_us:6.2f} µs  "
+              f"({legacy_us / bundle_us:4.1f}x)")
+
+    # Cambio de la información del negocio: se arma un paquete nuevo una sola vez
+    changed = {**BUSINESS_INFO, "horario": "Lunes a sábado de 9 a 13"}
+    for _ in range(1000):
+        cache.get(changed).render(["horario"])
+    print(f"caché: {json.dumps(cache.metrics())}")
+
+
+async def bench_redis_reads(messages: int, refresh_seconds: float, interval_ms: float) -> None:
+    redis_manager = RedisManager()
+    await redis_manager.set_value(BUSINESS_INFO_KEY, BUSINESS_INFO, 86400)
+    counter = RoundTripCounter(redis_manager.redis_client)
+
+    counter.round_trips = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(messages):
+            await redis_manager.get_value(BUSINESS_INFO_KEY)
+            await asyncio.sleep(interval_ms / 1000)
+    legacy = counter.round_trips / messages
+
+    # TTL de la copia en memoria (espacio de la caché local)
+    redis_manager.local_caches[BUSINESS_CACHE].ttl = refresh_seconds
+    store = BusinessInfoStore(redis_manager, NullDatabase())
+    counter.round_trips = 0
+    for _ in range(messages):
+        await store.get()
+        await asyncio.sleep(interval_ms / 1000)
+    cached = counter.round_trips / messages
+
+    print(f"lecturas de Redis por mensaje ({messages} mensajes cada {interval_ms} ms, refresco {refresh_seconds} s): "
+          f"anterior={legacy:.4f}  en memoria={cached:.4f}")
+    print(f"caché local: {json.dumps(redis_manager.local_caches[BUSINESS_CACHE].metrics())}")
+    await redis_manager.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--refresh", type=float, default=1.0, help="Segundos entre lecturas de Redis")
+    parser.add_argument("--interval-ms", type=float, default=1.0, help="Separación entre mensajes")
+    args = parser.parse_args()
+
+    bench_render(args.iterations)
+    await bench_redis_reads(args.messages, args.refresh, args.interval_ms)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark del estado de conversación guardado con el checkpointer de Redis.
+
+Recorre sesiones de troubleshooting completas (repetidas) de varios hilos y
+compara por turno el guardado anterior (GET del estado del flujo, JSON,
+invocación con el estado en la entrada y SET o DEL al final) con el grafo
+compilado con RedisCheckpointSaver (lectura previa reutilizada por el grafo y
+un único checkpoint por turno con los canales que cambiaron): latencia del
+turno, idas y vueltas a Redis y bytes escritos.
+
+Requiere Redis configurado en .env (mismos valores que la app); no requiere
+MySQL ni el modelo: las intenciones vienen dadas.
+
+Uso:
+    python -m benchmarks.checkpointer --threads 20 --turns 200
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+from src.core.checkpointer import RedisCheckpointSaver
+from src.core.memory import RedisManager
+from src.graphs.main_graph import CONVERSATION_INPUT_CHANNELS, create_conversation_graph
+from benchmarks.event_loop_lag import NullDatabase
+from benchmarks.session_state import BUSINESS_INFO, SESSION
+from benchmarks.webhook_latency import percentile
+
+
+class RoundTripCounter:
+    def __init__(self, redis_client):
+        """Cuenta los comandos y pipelines enviados por un cliente de Redis."""
+        self.round_trips = 0
+        self.bytes_written = 0
+        original_execute = redis_client.execute_command
+        original_pipeline = redis_client.pipeline
+
+        async def execute_command(*args, **options):
+            self.round_trips += 1
+            self.bytes_written += sum(len(a) for a in args[2:] if isinstance(a, (str, bytes)))
+            return await original_execute(*args, **options)
+
+        def pipeline(*args, **kwargs):
+            pipe = original_pipeline(*args, **kwargs)
+            original_pipe_execute = pipe.execute
+
+            async def execute(*a, **kw):
+                self.round_trips += 1
+                for command, _ in pipe.command_stack:
+                    self.bytes_written += sum(len(x) for x in command[2:] if isinstance(x, (str, bytes)))
+                return await original_pipe_execute(*a, **kw)
+            pipe.execute = execute
+            return pipe
+
+        redis_client.execute_command = execute_command
+        redis_client.pipeline = pipeline
+
+
+def turn_input(text: str, intents: List[str]) -> Dict[str, Any]:
+    return {"messages": deque([HumanMessage(content=text)], maxlen=10), "user_data": {"id": 1, "phone": "0"},
+            "user_level": 2, "intents": intents, "context": "bench", "business_info": BUSINESS_INFO}
+
+
+async def legacy_turn(graph, redis_manager: RedisManager, thread_id: str, text: str, intents: List[str]) -> None:
+    """Guardado anterior: estado del flujo en una clave con JSON."""
+    key = f"bench:state:{thread_id}"
+    stored = await redis_manager.get_value(key)
+    state = {**turn_input(text, intents), "troubleshooting_active": bool(stored), "troubleshooting_state": stored}
+    result = await graph.ainvoke(state, config={"configurable": {"database": NullDatabase()}})
+    if result.get("troubleshooting_active") and result.get("troubleshooting_state"):
+        await redis_manager.set_value(key, result["troubleshooting_state"], 1800)
+    else:
+        await redis_manager.delete_key(key)
+
+
+async def checkpointer_turn(graph, checkpointer: RedisCheckpointSaver, thread_id: str, text: str,
+                            intents: List[str]) -> None:
+    """Checkpointer: lectura previa reutilizada y un checkpoint por turno."""
+    config = {"configurable": {"thread_id": thread_id, "database": NullDatabase()}}
+    await checkpointer.prefetch(config)
+    await graph.ainvoke(turn_input(text, intents), config=config, checkpoint_during=False)
+
+
+async def run(label: str, turn, threads: int, turns: int, counter: RoundTripCounter) -> None:
+    latencies = []
+    run_id = uuid.uuid4().hex[:8]
+
+    async def thread(n: int):
+        for i in range(turns):
+            text, intents = SESSION[i % len(SESSION)]
+            start = time.perf_counter()
+            await turn(f"{run_id}:{n}", text, intents)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    counter.round_trips = counter.bytes_written = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(thread(n) for n in range(threads)))
+    total = threads * turns
+    print(f"{label:<13} p50={percentile(latencies, 50):7.3f} ms  p99={percentile(latencies, 99):7.3f} ms  "
+          f"media={statistics.mean(latencies):7.3f} ms  idas y vueltas/turno={counter.round_trips / total:4.2f}  "
+          f"bytes escritos/turno={counter.bytes_written / total:7.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    redis_manager = RedisManager()
+    counter = RoundTripCounter(redis_manager.redis_client)
+    checkpointer = RedisCheckpointSaver(redis_manager, transient_channels=CONVERSATION_INPUT_CHANNELS)
+    plain_graph = create_conversation_graph()
+    checkpointed_graph = create_conversation_graph(checkpointer=checkpointer)
+
+    print(f"📊 {args.threads} hilos x {args.turns} turnos")
+    await run("anterior", lambda t, text, intents: legacy_turn(plain_graph, redis_manager, t, text, intents),
+              args.threads, args.turns, counter)
+    await run("checkpointer", lambda t, text, intents: checkpointer_turn(checkpointed_graph, checkpointer, t, text,
+                                                                         intents),
+              args.threads, args.turns, counter)
+    print(f"checkpointer: {json.dumps(checkpointer.metrics())}")
+    await redis_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
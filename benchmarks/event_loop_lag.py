@@ -0,0 +1,130 @@
+"""
+Benchmark de retraso del event loop con el grafo de conversación asíncrono.
+
+Ejecuta conversaciones concurrentes con `conversation_graph.ainvoke` (saludo,
+consulta general, flujo de troubleshooting completo y pedido a Home Assistant
+con un controlador simulado que tarda --ha-ms) mientras una tarea mide cuánto
+se atrasa el event loop respecto de un tick de --tick-ms. Cada usuario espera
+--think-ms entre mensajes. Con nodos asíncronos el retraso se mantiene plano al
+subir la concurrencia hasta que el CPU del proceso se satura (con --think-ms 0
+se mide justamente ese límite).
+
+No requiere Redis, MySQL ni el modelo: las intenciones vienen dadas.
+
+Uso:
+    python -m benchmarks.event_loop_lag --levels 1,10,50,200 --rounds 5
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+
+from langchain_core.messages import HumanMessage
+from src.graphs.registry import graph_registry
+from benchmarks.webhook_latency import percentile
+
+BUSINESS_INFO = {"direccion": "Calle 1", "horario": "9 a 18", "whatsapp_ventas": "+54 11 0000-0000"}
+
+# (texto, intenciones) de cada conversación simulada
+CONVERSATION = [
+    ("hola", ["saludo"]),
+    ("cual es el horario", ["horario"]),
+    ("tengo un problema con la alarma", ["problema_alarma"]),
+    ("si", []),
+    ("1", []),
+    ("1", []),
+    ("5", []),
+    ("como esta la alarma", ["estado_alarma"]),
+]
+
+
+class SlowHomeAssistant:
+    def __init__(self, latency_ms: float):
+        """Controlador de Home Assistant simulado con latencia de red."""
+        self.latency = latency_ms / 1000
+
+    async def trigger_home_assistant(self, user_id, phone, method, params=None):
+        await asyncio.sleep(self.latency)
+        return {"success": True}
+
+
+class NullDatabase:
+    async def save_rating(self, **kwargs):
+        await asyncio.sleep(0)
+        return True
+
+
+async def conversation(graph, n: int, config: dict, latencies: List[float], think_ms: float) -> None:
+    """Recorre la conversación simulada de un usuario, turno por turno."""
+    messages, troubleshooting_state = [], None
+    for text, intents in CONVERSATION:
+        messages.append(HumanMessage(content=text))
+        state = {
+            "messages": messages,
+            "user_data": {"id": n + 1, "phone": f"54911{n:07d}", "level": 3, "first_name": "Bench"},
+            "user_level": 3,
+            "intents": intents,
+            "context": "bench",
+            "business_info": BUSINESS_INFO,
+            "troubleshooting_active": troubleshooting_state is not None,
+            "troubleshooting_state": troubleshooting_state
+        }
+        start = time.perf_counter()
+        result = await graph.ainvoke(state, config=config)
+        latencies.append((time.perf_counter() - start) * 1000)
+        messages = result["messages"]
+        troubleshooting_state = result.get("troubleshooting_state") if result.get(
+            "troubleshooting_active") else None
+        # Tiempo que tarda el usuario en escribir el siguiente mensaje
+        await asyncio.sleep(think_ms / 1000)
+
+
+async def measure(graph, concurrency: int, rounds: int, tick_ms: float, ha_ms: float,
+                  think_ms: float) -> Tuple[List[float], List[float], float]:
+    """Ejecuta `concurrency` conversaciones por ronda midiendo el retraso del loop."""
+    config = {"configurable": {"home_assistant_controller": SlowHomeAssistant(ha_ms),
+                               "database": NullDatabase()}}
+    lags, latencies = [], []
+    running = True
+
+    async def monitor():
+        tick = tick_ms / 1000
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(tick)
+            lags.append(max(0.0, (time.perf_counter() - start - tick) * 1000))
+
+    monitor_task = asyncio.create_task(monitor())
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(conversation(graph, n, config, latencies, think_ms) for n in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    running = False
+    await monitor_task
+    return lags, latencies, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", default="1,10,50,200")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--tick-ms", type=float, default=5.0)
+    parser.add_argument("--ha-ms", type=float, default=50.0)
+    parser.add_argument("--think-ms", type=float, default=500.0)
+    args = parser.parse_args()
+
+    graph = graph_registry.get("conversation")
+    print(f"📊 {len(CONVERSATION)} turnos por conversación, {args.rounds} rondas, "
+          f"tick {args.tick_ms} ms, Home Assistant {args.ha_ms} ms, "
+          f"pausa entre mensajes {args.think_ms} ms")
+    for level in (int(x) for x in args.levels.split(",")):
+        lags, latencies, elapsed = await measure(graph, level, args.rounds, args.tick_ms, args.ha_ms,
+                                                 args.think_ms)
+        print(f"concurrencia={level:<4} turnos/s={len(latencies) / elapsed:8.1f}  "
+              f"turno p50={percentile(latencies, 50):7.2f} ms p99={percentile(latencies, 99):7.2f} ms  "
+              f"retraso loop p50={percentile(lags, 50):6.2f} ms p99={percentile(lags, 99):6.2f} ms "
+              f"max={max(lags) if lags else 0:6.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""
+Benchmark del registro de grafos compilados.
+
+Mide el costo de arranque (compilar el grafo de conversación en cada
+controlador, como antes, contra compilar y validar una vez con
+graph_registry y compartirlo) y el costo por turno: conversaciones completas
+con `ainvoke` y, para los pasos de troubleshooting, un subgrafo compilado
+con los mismos nodos (solo para la comparación, la aplicación ya no lo usa)
+invocado aparte contra llamar directamente al enrutador y al nodo del paso
+(el despacho manual) y contra el nodo del paso dentro del grafo de
+conversación (como se ejecuta en la aplicación).
+
+No requiere Redis, MySQL ni el modelo: las intenciones vienen dadas.
+
+Uso:
+    python -m benchmarks.graph_registry --controllers 10 --conversations 200
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+from typing import Callable, List
+
+from langchain_core.messages import HumanMessage
+from langgraph.graph import END, StateGraph
+from src.graphs.main_graph import CONVERSATION_NODES, create_conversation_graph
+from src.graphs.registry import GraphRegistry, graph_registry
+from src.graphs.routers import route_troubleshooting, route_troubleshooting_step
+from src.graphs.tracing import graph_tracer
+from src.graphs.troubleshooting import TROUBLESHOOTING_INPUT_KEYS, TROUBLESHOOTING_NODES, TroubleshootingState
+from benchmarks.event_loop_lag import CONVERSATION, BUSINESS_INFO, NullDatabase, SlowHomeAssistant, conversation
+from benchmarks.webhook_latency import percentile
+
+# (paso actual, mensaje del usuario) de cada paso de troubleshooting medido
+TROUBLESHOOTING_TURNS = [(0, "tengo un problema"), (1, "si"), (2, "1"), (3, "1"), (4, "5"), (2, "salir")]
+
+
+def create_troubleshooting_graph():
+    """
+    Subgrafo de troubleshooting como se invocaba antes: el enrutador de
+    entrada elige el nodo del paso actual y el grafo termina después de él.
+    """
+    graph = StateGraph(TroubleshootingState)
+    for name, node in TROUBLESHOOTING_NODES.items():
+        graph.add_node(name, graph_tracer.node("troubleshooting", name, node))
+        graph.add_edge(name, END)
+    graph.set_conditional_entry_point(
+        graph_tracer.router("troubleshooting", "route_troubleshooting", route_troubleshooting),
+        {name: name for name in TROUBLESHOOTING_NODES}
+    )
+    return graph.compile(checkpointer=False)
+
+
+def timed(fn: Callable[[], object], repeat: int) -> List[float]:
+    """Ejecuta `fn` `repeat` veces y devuelve las duraciones en ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def troubleshooting_state(step: int, text: str) -> dict:
+    """Estado de troubleshooting en el paso indicado con el mensaje del usuario."""
+    return {
+        "messages": [HumanMessage(content=text)],
+        "current_step": step,
+        "keyboard_type": "modelo_1555" if step >= 3 else None,
+        "problem_type": None,
+        "solutions_shown": [],
+        "rating": None,
+        "business_info": BUSINESS_INFO,
+        "user_data": {"id": 1}
+    }
+
+
+def report(label: str, samples: List[float]) -> None:
+    print(f"{label:<44} n={len(samples):<6} p50={percentile(samples, 50):8.3f} ms  "
+          f"p99={percentile(samples, 99):8.3f} ms  media={statistics.mean(samples):8.3f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--controllers", type=int, default=10)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Arranque: antes cada WhatsAppController compilaba su propio grafo
+    report("compilar grafo por controlador", timed(create_conversation_graph, args.controllers))
+    registry = GraphRegistry()
+    for name, factory in graph_registry.factories.items():
+        registry.register(name, factory, graph_registry.required_nodes[name])
+    report("registro: compilar y validar todo (1 vez)", timed(registry.compile_all, 1))
+    report("registro: obtener grafo compartido", timed(lambda: registry.get("conversation"), args.controllers))
+
+    # Por turno: conversaciones completas con el grafo compartido
+    graph = registry.get("conversation")
+    config = {"configurable": {"home_assistant_controller": SlowHomeAssistant(0),
+                               "database": NullDatabase()}}
+    latencies: List[float] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for n in range(args.conversations):
+            await conversation(graph, n, config, latencies, 0)
+    report(f"turno de conversación ({len(CONVERSATION)} por conversación)", latencies)
+
+    # Por paso de troubleshooting: subgrafo compilado vs. despacho manual vs.
+    # nodo del paso en el grafo de conversación
+    subgraph = create_troubleshooting_graph()
+    direct, compiled, inline = [], [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.steps):
+            step, text = TROUBLESHOOTING_TURNS[i % len(TROUBLESHOOTING_TURNS)]
+            state = troubleshooting_state(step, text)
+            start = time.perf_counter()
+            TROUBLESHOOTING_NODES[route_troubleshooting(state)](state)
+            direct.append((time.perf_counter() - start) * 1000)
+
+            state = troubleshooting_state(step, text)
+            start = time.perf_counter()
+            await subgraph.ainvoke(state)
+            compiled.append((time.perf_counter() - start) * 1000)
+
+            state = troubleshooting_state(step, text)
+            state = {**{key: state[key] for key in TROUBLESHOOTING_INPUT_KEYS}, "troubleshooting_active": True,
+                     "troubleshooting_state": {key: value for key, value in state.items()
+                                               if key not in TROUBLESHOOTING_INPUT_KEYS}}
+            start = time.perf_counter()
+            await CONVERSATION_NODES[route_troubleshooting_step(state)](state, config)
+            inline.append((time.perf_counter() - start) * 1000)
+    report("paso de troubleshooting: despacho manual", direct)
+    report("paso de troubleshooting: subgrafo compilado", compiled)
+    report("paso de troubleshooting: en la conversación", inline)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Verificación de los servicios que reciben los nodos del grafo de conversación.
+
+Recorre la conversación simulada de benchmarks.event_loop_lag (saludo,
+consulta general, troubleshooting completo con calificación y pedido a Home
+Assistant) con el grafo compartido instrumentado, pasando los servicios en
+config["configurable"] como lo hace WhatsAppController, y comprueba que los
+nodos los usaron: la calificación se guarda en la base de datos, Home
+Assistant se dispara después del aviso por WhatsApp (y el turno queda como
+ya respondido, salvo que el disparo falle) y los nodos lentos se registran
+con su chat.
+
+No requiere Redis, MySQL ni el modelo: las intenciones vienen dadas.
+
+Uso:
+    python -m benchmarks.graph_services
+"""
+import asyncio
+import contextlib
+import io
+from typing import Any, List, Tuple
+
+from langchain_core.messages import HumanMessage
+from src.graphs.registry import graph_registry
+from src.graphs.tracing import graph_tracer
+from benchmarks.event_loop_lag import BUSINESS_INFO, conversation
+
+
+class RecordingDatabase:
+    def __init__(self):
+        """Base de datos simulada que registra las calificaciones guardadas."""
+        self.ratings: List[dict] = []
+
+    async def save_rating(self, **kwargs):
+        self.ratings.append(kwargs)
+        return True
+
+
+class RecordingHomeAssistant:
+    def __init__(self, calls: List[Tuple[str, Any]], success: bool = True):
+        """Controlador de Home Assistant simulado que registra cada disparo."""
+        self.calls = calls
+        self.success = success
+
+    async def trigger_home_assistant(self, user_id, phone, method, params=None):
+        self.calls.append(("trigger", method))
+        return {"success": self.success, "message": "⚠️ Home Assistant no respondió"}
+
+
+class RecordingWhatsApp:
+    def __init__(self, calls: List[Tuple[str, Any]]):
+        """Servicio de WhatsApp simulado que registra cada mensaje enviado."""
+        self.calls = calls
+
+    async def send_message(self, phone, message):
+        self.calls.append(("send", message))
+        return True
+
+
+async def home_assistant_turn(graph, config: dict) -> dict:
+    """Un pedido a Home Assistant de un usuario de nivel 3."""
+    state = {
+        "messages": [HumanMessage(content="como esta la alarma")],
+        "user_data": {"id": 1, "phone": "5491100000000", "level": 3, "first_name": "Check"},
+        "user_level": 3,
+        "intents": ["estado_alarma"],
+        "context": "check",
+        "business_info": BUSINESS_INFO,
+        "troubleshooting_active": False,
+        "troubleshooting_state": None
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        return await graph.ainvoke(state, config=config)
+
+
+async def main():
+    graph = graph_registry.get("conversation")
+    database = RecordingDatabase()
+    calls: List[Tuple[str, Any]] = []
+    config = {"configurable": {"chat_id": "check-chat",
+                               "database": database,
+                               "home_assistant_controller": RecordingHomeAssistant(calls),
+                               "whatsapp_service": RecordingWhatsApp(calls)}}
+
+    # Con umbral 0 todos los nodos cuentan como lentos y se registra su chat
+    slow_node_ms, graph_tracer.slow_node_ms = graph_tracer.slow_node_ms, 0
+    recent = len(graph_tracer.recent_slow)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await conversation(graph, 0, config, [], 0)
+    finally:
+        graph_tracer.slow_node_ms = slow_node_ms
+
+    assert [rating["rating"] for rating in database.ratings] == [5], database.ratings
+    assert [kind for kind, _ in calls] == ["send", "trigger"], calls
+    assert calls[1] == ("trigger", "estado_alarma"), calls
+
+    # Disparo correcto: el aviso ya es la respuesta del turno
+    calls.clear()
+    result = await home_assistant_turn(graph, config)
+    assert result.get("response_sent") is True, result
+    assert [kind for kind, _ in calls] == ["send", "trigger"], calls
+
+    # Disparo fallido: el error se responde por el camino normal
+    calls.clear()
+    failing = {"configurable": {**config["configurable"],
+                                "home_assistant_controller": RecordingHomeAssistant(calls, success=False)}}
+    result = await home_assistant_turn(graph, failing)
+    assert not result.get("response_sent"), result
+    assert result["messages"][-1].content == "⚠️ Home Assistant no respondió", result["messages"][-1]
+
+    if graph_tracer.enabled:
+        slow = list(graph_tracer.recent_slow)[recent:]
+        assert slow and all(entry["chat_id"] == "check-chat" for entry in slow), slow
+    print(f"✅ Calificación guardada: {database.ratings[0]}")
+    print("✅ Home Assistant: aviso, disparo y respuesta de error verificados")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Benchmark de agrupación de llamadas al LLM del clasificador de intenciones.
+
+Lanza clasificaciones concurrentes contra el servidor simulado de
+benchmarks.mock_llm_server (no usa la API real) y compara dos modos:
+
+- direct: cada predict es su propio request al modelo (comportamiento anterior).
+- batched: las llamadas pasan por IntentBatcher (ventana + abatch + tope de
+  llamadas en curso).
+
+Uso:
+    python -m benchmarks.llm_batching --callers 64 --messages 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+
+from langchain_openai import ChatOpenAI
+from src.chains.intent_batcher import IntentBatcher
+from src.chains.intent_classifier import IntentClassifier
+from benchmarks.mock_llm_server import add_server_arguments, latency_from_args, start_server
+from benchmarks.webhook_latency import percentile
+
+TEXTS = ["cual es el horario de atencion de ustedes", "tengo un problema con el teclado",
+         "me pasan la direccion del local", "necesito hablar con alguien urgente"]
+
+
+async def run(classifier: IntentClassifier, callers: int, messages: int) -> Tuple[List[float], float, int]:
+    """Ejecuta las clasificaciones concurrentes y mide cada una."""
+    latencies, errors = [], 0
+
+    async def caller(n: int):
+        nonlocal errors
+        for i in range(messages):
+            start = time.perf_counter()
+            intents = await classifier._predict_llm(f"{TEXTS[(n + i) % len(TEXTS)]} #{n}-{i}")
+            if intents is None:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(n) for n in range(callers)))
+    return latencies, time.perf_counter() - start, errors
+
+
+def report(name: str, latencies: List[float], elapsed: float, errors: int, max_inflight: int) -> None:
+    print(f"{name:<8} n={len(latencies):<5} errores={errors:<3} "
+          f"rps={len(latencies) / elapsed:8.1f}  "
+          f"p50={percentile(latencies, 50):8.2f} ms  "
+          f"p99={percentile(latencies, 99):8.2f} ms  "
+          f"media={statistics.mean(latencies):8.2f} ms  "
+          f"max_en_curso={max_inflight}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--callers", type=int, default=64)
+    parser.add_argument("--messages", type=int, default=10)
+    add_server_arguments(parser)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    runner, stats = await start_server(args.port, latency_from_args(args))
+    llm = ChatOpenAI(model="mock", temperature=0, api_key="mock", max_retries=0,
+                     base_url=f"http://127.0.0.1:{args.port}/v1")
+
+    print(f"📊 {args.callers} llamadores x {args.messages} clasificaciones "
+          f"(servidor: {args.latency} {args.latency_ms} ms, knee {args.knee})")
+    for name, batcher in (
+        ("direct", None),
+        ("batched", IntentBatcher(args.window_ms, args.max_concurrency, args.max_concurrency)),
+    ):
+        stats["max_inflight"] = 0
+        classifier = IntentClassifier(api_key="mock", llm=llm, batcher=batcher)
+        report(name, *await run(classifier, args.callers, args.messages), stats["max_inflight"])
+        if batcher:
+            print(f"         lotes={batcher.metrics()['batches']} "
+                  f"tamaño_medio={batcher.metrics()['avg_batch_size']}")
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Benchmark de la caché local delante de Redis con invalidación por pub/sub.
+
+Simula dos workers (dos RedisManager con su propia caché local, escuchando
+el canal de invalidaciones) y mide:
+
+- lecturas de datos de usuario con acceso sesgado (pocos usuarios muy
+  activos) leyendo siempre de Redis y JSON vs. a través de la caché local:
+  tiempo por lectura, idas y vueltas y proporción de aciertos por espacio;
+- el tiempo que tarda la escritura de un worker en invalidar la copia del
+  otro (desde set_cached_value hasta que el otro ve el valor nuevo).
+
+Requiere Redis configurado en .env (mismos valores que la app); no requiere
+MySQL ni el modelo.
+
+Uso:
+    python -m benchmarks.local_cache --users 2000 --reads 50000 --updates 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from src.core.memory import HA_CONFIG_CACHE, USER_CACHE, RedisManager
+from benchmarks.checkpointer import RoundTripCounter
+from benchmarks.webhook_latency import percentile
+
+
+async def bench_reads(worker: RedisManager, counter: RoundTripCounter, users: int, reads: int) -> None:
+    run_id = uuid.uuid4().hex[:8]
+    keys = [f"bench:{run_id}:{n}" for n in range(users)]
+    for n, key in enumerate(keys):
+        await worker.set_value(key, {"id": n, "first_name": "Bench", "last_name": "", "phone": key, "level": 2}, 600)
+    # Acceso sesgado: pocos usuarios concentran la mayoría de los mensajes
+    rng = random.Random(1)
+    sequence = [keys[min(users, int(rng.paretovariate(1.2))) - 1] for _ in range(reads)]
+
+    for label, read in (("redis", worker.get_value),
+                        ("caché local", lambda key: worker.get_cached_value(USER_CACHE, key))):
+        counter.round_trips = 0
+        start = time.perf_counter()
+        for key in sequence:
+            await read(key)
+        elapsed_us = (time.perf_counter() - start) / reads * 1e6
+        print(f"{label:<12} {elapsed_us:7.2f} µs/lectura  idas y vueltas/lectura={counter.round_trips / reads:.4f}")
+
+
+async def bench_invalidation(reader: RedisManager, writer: RedisManager, updates: int) -> None:
+    key = f"ha_config:bench:{uuid.uuid4().hex[:8]}"
+    latencies = []
+    for version in range(updates):
+        await reader.get_cached_value(HA_CONFIG_CACHE, key)
+        start = time.perf_counter()
+        await writer.set_cached_value(HA_CONFIG_CACHE, key, {"version": version}, 600)
+        while (await reader.get_cached_value(HA_CONFIG_CACHE, key) or {}).get("version") != version:
+            await asyncio.sleep(0)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"invalidación entre workers: p50={percentile(latencies, 50):.3f} ms  "
+          f"p99={percentile(latencies, 99):.3f} ms  ({updates} escrituras)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=50000)
+    parser.add_argument("--updates", type=int, default=200)
+    args = parser.parse_args()
+
+    worker_a, worker_b = RedisManager(), RedisManager()
+    counter = RoundTripCounter(worker_a.redis_client)
+    await worker_a.start_cache_invalidation()
+    await worker_b.start_cache_invalidation()
+    # Esperar a que ambos estén suscriptos
+    await asyncio.sleep(0.5)
+
+    await bench_reads(worker_a, counter, args.users, args.reads)
+    await bench_invalidation(worker_a, worker_b, args.updates)
+    print(f"worker A: {json.dumps(worker_a.local_cache_metrics())}")
+    await worker_b.stop_cache_invalidation()
+    await worker_a.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+"""
+Servidor local compatible con la API de chat de OpenAI (y con el envío de
+mensajes de la Graph API de WhatsApp) para pruebas de carga y benchmarks.
+
+- POST /v1/chat/completions: para el prompt del clasificador responde las
+  intenciones que encuentran las palabras clave de RuleBasedClassifier en el
+  "Mensaje del usuario"; para cualquier otro prompt, un texto fijo.
+- POST /{version}/{phone_id}/messages: acepta el envío y devuelve un id falso.
+
+La latencia sigue una distribución configurable (fija, uniforme o lognormal,
+con semilla para que sea reproducible) y, opcionalmente, crece con la
+concurrencia: latencia * (1 + (en_curso / knee) ** 2). Una fracción de los
+requests al modelo puede fallar con el status indicado. Como los proveedores
+con caché de prefijos, informa como tokens en caché el mensaje de sistema
+cuando ya lo recibió antes.
+
+Uso:
+    python -m benchmarks.mock_llm_server --port 8099 --latency lognormal \\
+        --latency-ms 300 --sigma 0.4 --error-rate 0.02
+
+    # y en .env (o en el entorno) de la app:
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1
+    WHATSAPP_API_URL=http://127.0.0.1:8099/v22.0
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import Any, Dict
+from aiohttp import web
+from src.chains.rule_classifier import RuleBasedClassifier
+
+CANNED_RESPONSE = "Respuesta simulada del servidor local."
+
+_keyword_classifier = RuleBasedClassifier()
+
+
+def fake_intents(prompt: str) -> str:
+    """Intenciones por palabras clave del mensaje del usuario del prompt."""
+    message = prompt.split("Mensaje del usuario:")[-1].split("\n")[0]
+    return ",".join(_keyword_classifier.match_keywords(message)) or "ninguna"
+
+
+class LatencyModel:
+    def __init__(self, kind: str = "fixed", latency_ms: float = 40.0, sigma: float = 0.4,
+                 knee: float = 0.0, seed: int = 7):
+        """
+        Distribución de latencia del servidor simulado.
+
+        Args:
+            kind: "fixed", "uniform" (entre 0.5x y 1.5x) o "lognormal"
+            latency_ms: Latencia (mediana) sin carga
+            sigma: Dispersión de la lognormal
+            knee: Llamadas en curso a partir de las cuales la latencia se
+                duplica (0 deshabilita el efecto de la concurrencia)
+            seed: Semilla del generador
+        """
+        self.kind = kind
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.knee = knee
+        self.rng = random.Random(seed)
+
+    def sample(self, inflight: int) -> float:
+        """Latencia en milisegundos para una llamada con `inflight` en curso."""
+        if self.kind == "uniform":
+            value = self.latency_ms * self.rng.uniform(0.5, 1.5)
+        elif self.kind == "lognormal":
+            value = self.latency_ms * self.rng.lognormvariate(0, self.sigma)
+        else:
+            value = self.latency_ms
+        if self.knee:
+            value *= 1 + (inflight / self.knee) ** 2
+        return value
+
+
+def create_app(
+    latency: LatencyModel,
+    error_rate: float = 0.0,
+    error_status: int = 500,
+    whatsapp_latency_ms: float = 0.0
+) -> web.Application:
+    """
+    Crea la aplicación del servidor simulado.
+
+    Args:
+        latency: Distribución de latencia de las llamadas al modelo
+        error_rate: Fracción de llamadas al modelo que fallan
+        error_status: Status HTTP de las fallas (500, 429, 503, ...)
+        whatsapp_latency_ms: Latencia fija de los envíos de WhatsApp
+    """
+    app = web.Application()
+    stats: Dict[str, Any] = {"inflight": 0, "max_inflight": 0, "requests": 0,
+                             "errors": 0, "whatsapp_messages": 0}
+    app["stats"] = stats
+    seen_prefixes = set()
+
+    async def chat_completions(request: web.Request) -> web.Response:
+        body = await request.json()
+        stats["inflight"] += 1
+        stats["requests"] += 1
+        stats["max_inflight"] = max(stats["max_inflight"], stats["inflight"])
+        try:
+            await asyncio.sleep(latency.sample(stats["inflight"]) / 1000)
+        finally:
+            stats["inflight"] -= 1
+
+        if error_rate and latency.rng.random() < error_rate:
+            stats["errors"] += 1
+            return web.json_response(
+                {"error": {"message": "Error simulado", "type": "server_error"}},
+                status=error_status)
+
+        messages = body.get("messages", [])
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        prefix = str(messages[0].get("content", "")) if messages and messages[0].get("role") == "system" else ""
+        cached_tokens = len(prefix) // 4 if prefix in seen_prefixes else 0
+        seen_prefixes.add(prefix)
+        content = fake_intents(prompt) if "Mensaje del usuario:" in prompt else CANNED_RESPONSE
+        return web.json_response({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 3,
+                      "total_tokens": len(prompt) // 4 + 3,
+                      "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+        })
+
+    async def whatsapp_messages(request: web.Request) -> web.Response:
+        await request.read()
+        stats["whatsapp_messages"] += 1
+        if whatsapp_latency_ms:
+            await asyncio.sleep(whatsapp_latency_ms / 1000)
+        return web.json_response({
+            "messaging_product": "whatsapp",
+            "messages": [{"id": f"wamid.mock{uuid.uuid4().hex}"}]
+        })
+
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/{version}/{phone_id}/messages", whatsapp_messages)
+    return app
+
+
+async def start_server(
+    port: int = 8099,
+    latency: LatencyModel = None,
+    error_rate: float = 0.0,
+    error_status: int = 500,
+    whatsapp_latency_ms: float = 0.0
+):
+    """
+    Inicia el servidor en segundo plano.
+
+    Returns:
+        Tupla (runner, stats); cerrar con `await runner.cleanup()`
+    """
+    app = create_app(latency or LatencyModel(), error_rate, error_status, whatsapp_latency_ms)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, app["stats"]
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """Agrega al parser las opciones del servidor simulado."""
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--sigma", type=float, default=0.4)
+    parser.add_argument("--knee", type=float, default=16.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--whatsapp-latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def latency_from_args(args: argparse.Namespace) -> LatencyModel:
+    """Crea la distribución de latencia a partir de las opciones."""
+    return LatencyModel(args.latency, args.latency_ms, args.sigma, args.knee, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(
+        create_app(latency_from_args(args), args.error_rate, args.error_status,
+                   args.whatsapp_latency_ms),
+        host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
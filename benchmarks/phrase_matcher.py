@@ -0,0 +1,120 @@
+"""
+Corpus de corrección y microbenchmark del detector de frases del troubleshooting.
+
+Verifica el evento ("exit", "confirm" o "default") que troubleshooting_event
+asigna a cada mensaje del corpus y mide el costo por mensaje del trie
+compilado contra la búsqueda anterior, que probaba cada frase como
+subcadena (`any(phrase in msg ...)`) y daba falsos positivos como "no"
+dentro de "nombre". También mide cómo escala con tablas de frases
+sintéticas más grandes frente a una única expresión regular alternada con
+límites de palabra. Termina con código 1 si algún caso del corpus falla.
+
+Uso:
+    python -m benchmarks.phrase_matcher --repeat 20000 --table-sizes 26,200,1000
+"""
+import argparse
+import random
+import re
+import sys
+import timeit
+from typing import List, Tuple
+
+from src.graphs.routers import TROUBLESHOOTING_PHRASE_MATCHER, troubleshooting_event
+from src.template.prompts import TROUBLESHOOTING_PHRASES
+from src.utils.helpers import normalize_text
+from src.utils.phrase_matcher import PhraseMatcher
+
+LONG_MESSAGE = "quiero que me ayuden con el teclado del modelo neo lcd que emite un sonido"
+
+# (mensaje, evento esperado)
+CORPUS: List[Tuple[str, str]] = [
+    # Salidas
+    ("salir", "exit"), ("Salir.", "exit"), ("quiero salir", "exit"), ("CANCELAR", "exit"),
+    ("no", "exit"), ("No!", "exit"), ("no gracias", "exit"), ("no, gracias", "exit"),
+    ("no quiero seguir", "exit"), ("ya no", "exit"), ("chau", "exit"), ("menú", "exit"),
+    ("volver al menu principal", "exit"), ("atrás", "exit"), ("atras", "exit"),
+    ("quiero hablar de otra cosa", "exit"), ("otro tema", "exit"), ("stop", "exit"),
+    ("no me interesa", "exit"), ("ok no", "exit"), ("No, no", "exit"), ("volver", "exit"),
+    # Confirmaciones
+    ("si", "confirm"), ("Sí", "confirm"), ("SI", "confirm"), ("sí, dale", "confirm"),
+    ("dale", "confirm"), ("ok", "confirm"), ("Ok!", "confirm"), ("1", "confirm"),
+    ("quiero", "confirm"), ("si quiero", "confirm"), ("aceptar", "confirm"), ("yes", "confirm"),
+    # Sin frases: antes eran falsos positivos por subcadena
+    ("mi nombre es juan", "default"), ("modelo neo lcd", "default"), ("anular una zona", "default"),
+    ("tengo un problema con la alarma", "default"), ("el teclado emite un sonido", "default"),
+    ("sistema", "default"), ("okupa", "default"), ("10", "default"), ("15", "default"),
+    ("parlante", "default"), ("monitoreo", "default"), ("5500", "default"), ("", "default"),
+    ("anoche sonó la sirena", "default"), ("hay que reparar el sensor", "default"),
+    ("es el modelo uno", "default"), ("bueno", "default"), ("con éxito", "default"),
+    ("la puerta del norte", "default"), ("terminal", "default"),
+    # "no", "volver", ... dentro de una respuesta no salen del flujo (títulos
+    # de problemas del paso 3 y descripciones libres)
+    ("No puedo activar el sistema", "default"), ("el sistema no se activa", "default"),
+    ("no me funciona el teclado", "default"), ("quiero volver a intentar", "confirm"),
+    ("si, no se", "confirm"), ("la sirena no para de sonar", "default"),
+]
+
+# En la confirmación (paso 1) cualquier negativa termina el flujo
+STEP_1_CORPUS: List[Tuple[str, str]] = [
+    ("si, no se", "exit"), ("no, ahora no puedo", "exit"), ("ahora no", "exit"),
+    ("si", "confirm"), ("si quiero", "confirm"), ("dale", "confirm"),
+]
+
+
+def legacy_event(message: str) -> str:
+    """Detección anterior: frases como subcadenas del mensaje en minúsculas."""
+    message = message.lower()
+    if not message:
+        return "default"
+    if any(phrase in message for phrase in TROUBLESHOOTING_PHRASES["exit"] + TROUBLESHOOTING_PHRASES["exit_alone"]
+           + ["atrás", "menú"]):
+        return "exit"
+    if any(phrase == message or phrase in message.split()
+           for phrase in TROUBLESHOOTING_PHRASES["confirm"] + ["sí"]):
+        return "confirm"
+    return "default"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--table-sizes", default="26,200,1000")
+    args = parser.parse_args()
+
+    failures = [(text, expected, troubleshooting_event(text)) for text, expected in CORPUS
+                if troubleshooting_event(text) != expected]
+    failures += [(f"{text} (paso 1)", expected, troubleshooting_event(text, 1)) for text, expected in STEP_1_CORPUS
+                 if troubleshooting_event(text, 1) != expected]
+    legacy_wrong = [text for text, expected in CORPUS if legacy_event(text) != expected]
+    print(f"📋 Corpus: {len(CORPUS) + len(STEP_1_CORPUS)} casos, {len(failures)} fallas "
+          f"(la búsqueda anterior fallaba {len(legacy_wrong)}: {legacy_wrong})")
+    for text, expected, got in failures:
+        print(f"❌ {text!r}: esperado {expected}, obtenido {got}")
+
+    print(f"📊 {len(TROUBLESHOOTING_PHRASE_MATCHER.phrase_categories)} frases, "
+          f"{args.repeat} repeticiones por mensaje")
+    for text in ["si", "no gracias", "tengo un problema con la alarma", LONG_MESSAGE]:
+        legacy_us = timeit.timeit(lambda: legacy_event(text), number=args.repeat) / args.repeat * 1e6
+        matcher_us = timeit.timeit(lambda: troubleshooting_event(text), number=args.repeat) / args.repeat * 1e6
+        print(f"{text[:40]!r:<44} anterior={legacy_us:6.2f} us  trie={matcher_us:6.2f} us")
+
+    # Escalado con tablas sintéticas de 1 a 3 palabras
+    rng = random.Random(7)
+    vocabulary = ["".join(rng.choice("abcdefghijlmnopqrstuv") for _ in range(rng.randint(3, 8)))
+                  for _ in range(2000)]
+    repeat = max(1, args.repeat // 4)
+    for size in (int(x) for x in args.table_sizes.split(",")):
+        phrases = [" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(size)]
+        matcher = PhraseMatcher({"frase": phrases})
+        alternation = re.compile(r"\b(?:" + "|".join(
+            re.escape(p) for p in sorted(matcher.phrase_categories, key=len, reverse=True)) + r")\b")
+        regex_us = timeit.timeit(lambda: alternation.findall(normalize_text(LONG_MESSAGE)),
+                                 number=repeat) / repeat * 1e6
+        trie_us = timeit.timeit(lambda: matcher.find(LONG_MESSAGE), number=repeat) / repeat * 1e6
+        print(f"tabla de {size:<5} frases  regex alternada={regex_us:7.2f} us  trie={trie_us:6.2f} us")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
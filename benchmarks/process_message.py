@@ -0,0 +1,96 @@
+"""
+Benchmark de latencia y throughput de WhatsAppController.process_message.
+
+Levanta benchmarks.mock_llm_server (modelo y envíos de WhatsApp simulados,
+con latencia y errores reproducibles), apunta la app a él con
+OPENAI_BASE_URL / WHATSAPP_API_URL y procesa mensajes de remitentes
+concurrentes por el camino completo (Redis, MySQL, clasificador y grafo).
+No gasta presupuesto de API ni depende de la red.
+
+Requiere MySQL y Redis configurados en .env (mismos valores que la app).
+
+Uso:
+    python -m benchmarks.process_message --senders 20 --messages 10 \\
+        --latency lognormal --latency-ms 300 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import List, Tuple
+
+from src.config.settings import settings
+from src.core.container import ServiceContainer
+from benchmarks.mock_llm_server import add_server_arguments, latency_from_args, start_server
+from benchmarks.webhook_latency import percentile
+
+TEXTS = ["hola, cual es el horario de atencion del local", "me pasan la direccion de la oficina",
+         "necesito el telefono para llamar a alguien", "quiero saber el mail de la empresa",
+         "gracias por la ayuda de hoy"]
+
+
+async def run(services: ServiceContainer, senders: int, messages: int) -> Tuple[List[float], float, int]:
+    """Procesa los mensajes de cada remitente en orden y mide cada uno."""
+    controller = services.whatsapp_controller
+    latencies, errors = [], 0
+
+    async def sender(n: int):
+        nonlocal errors
+        phone = f"54911{n:07d}"
+        for i in range(messages):
+            parsed_data = {
+                "success": True,
+                "message_id": f"bench:{uuid.uuid4()}",
+                # Texto único para que no lo resuelva la caché de resultados
+                "text": f"{TEXTS[(n + i) % len(TEXTS)]} {uuid.uuid4().hex[:6]}",
+                "phone": phone,
+                "name": f"Bench {n}"
+            }
+            start = time.perf_counter()
+            try:
+                result = await controller.process_message(parsed_data)
+                if str(result.get("status", "")).startswith("Error"):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender(n) for n in range(senders)))
+    return latencies, time.perf_counter() - start, errors
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--senders", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=10)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    runner, stats = await start_server(
+        args.port, latency_from_args(args), args.error_rate, args.error_status,
+        args.whatsapp_latency_ms)
+    settings.OPENAI_BASE_URL = f"http://127.0.0.1:{args.port}/v1"
+    settings.WHATSAPP_API_URL = f"http://127.0.0.1:{args.port}/v22.0"
+
+    services = ServiceContainer()
+    await services.start()
+    try:
+        print(f"📊 {args.senders} remitentes x {args.messages} mensajes "
+              f"(modelo: {args.latency} {args.latency_ms} ms, errores {args.error_rate:.0%})")
+        latencies, elapsed, errors = await run(services, args.senders, args.messages)
+        print(f"process_message n={len(latencies):<5} errores={errors:<3} "
+              f"rps={len(latencies) / elapsed:7.1f}  "
+              f"p50={percentile(latencies, 50):8.2f} ms  "
+              f"p99={percentile(latencies, 99):8.2f} ms  "
+              f"media={statistics.mean(latencies):8.2f} ms")
+        print(f"servidor: requests={stats['requests']} errores={stats['errors']} "
+              f"max_en_curso={stats['max_inflight']} envios_whatsapp={stats['whatsapp_messages']}")
+    finally:
+        await services.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+"""
+Benchmark de idas y vueltas a Redis por mensaje en process_message.
+
+Procesa sesiones de troubleshooting completas (repetidas) de varios
+teléfonos con el controlador real y el grafo con checkpointer, y compara la
+secuencia anterior de llamadas a Redis (exists + set para duplicados,
+lecturas sueltas de usuario, chat e historial y LPUSH, LTRIM y EXPIRE por
+separado para cada uno de los dos mensajes del historial) con la actual
+(SET NX EX y las lecturas del inicio en un lote, historial en un MULTI):
+idas y vueltas por mensaje y latencia.
+
+Requiere Redis configurado en .env (mismos valores que la app); no requiere
+MySQL ni el modelo: las intenciones vienen dadas, la base de datos y
+WhatsApp son simulados.
+
+Uso:
+    python -m benchmarks.redis_round_trips --phones 20 --messages 100
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List
+
+from langchain_core.messages import HumanMessage
+from src.config.settings import settings
+from src.controllers.whatsapp_controller import WhatsAppController
+from src.core.memory import RedisManager
+from benchmarks.checkpointer import RoundTripCounter
+from benchmarks.event_loop_lag import SlowHomeAssistant
+from benchmarks.session_state import BUSINESS_INFO, SESSION
+from benchmarks.webhook_latency import percentile
+
+INTENTS = dict(SESSION)
+
+
+class BenchDatabase:
+    """Base de datos simulada: todos los usuarios existen."""
+
+    async def get_user_by_phone(self, phone: str) -> Dict[str, Any]:
+        return {"id": 1, "first_name": "Bench", "last_name": "", "phone": phone, "level": 2}
+
+    async def load_business_info(self) -> Dict[str, Any]:
+        return BUSINESS_INFO
+
+    async def find_active_conversation(self, user_id, chat_id):
+        return 1
+
+    async def save_conversation_message(self, conversation_id, role, content):
+        return True
+
+    async def save_rating(self, **kwargs):
+        return True
+
+
+class NullWhatsApp:
+    """Envíos de WhatsApp descartados."""
+
+    async def send_message(self, phone, text):
+        return {}
+
+    async def split_and_send_message(self, phone, text):
+        return {}
+
+    async def send_image(self, phone, url, caption):
+        return {}
+
+
+async def legacy_message(controller: WhatsAppController, parsed_data: Dict[str, Any]) -> None:
+    """Secuencia anterior de llamadas a Redis alrededor del mismo grafo."""
+    redis_manager = controller.redis_manager
+    phone = parsed_data["phone"]
+    if await redis_manager.exists(f"message:{parsed_data['message_id']}"):
+        return
+    await redis_manager.set_value(f"message:{parsed_data['message_id']}", "1", 86400)
+    user_data = await controller._get_or_create_user(phone, parsed_data["name"])
+    chat_id = await redis_manager.get_or_create_chat_id(phone)
+    config = {"configurable": {"thread_id": f"{phone}:{chat_id}", "database": controller.database,
+                               "redis_manager": redis_manager, "chat_id": chat_id}}
+    await controller.checkpointer.prefetch(config)
+    history = await redis_manager.get_message_history(f"chat:{phone}", settings.MESSAGE_WINDOW_SIZE)
+    messages = deque(controller._convert_history_to_messages(reversed(history)),
+                     maxlen=max(2, settings.MESSAGE_WINDOW_SIZE))
+    messages.append(HumanMessage(content=parsed_data["text"]))
+    state = {"messages": messages, "user_data": user_data, "user_level": user_data.get("level", 1),
+             "intents": INTENTS[parsed_data["text"]], "context": "bench",
+             "business_info": await controller.business_info.get()}
+    result = await controller.conversation_graph.ainvoke(state, config=config, checkpoint_during=False)
+
+    key = f"taborra:chat:chat:{phone}:messages"
+    for role, content in (("user", parsed_data["text"]), ("assistant", result["messages"][-1].content)):
+        await redis_manager.redis_client.lpush(key, json.dumps({"role": role, "content": content}))
+        await redis_manager.redis_client.ltrim(key, 0, 49)
+        await redis_manager.redis_client.expire(key, 86400 * 7)
+
+
+async def run(label: str, process, phones: int, messages: int, counter: RoundTripCounter) -> None:
+    latencies = []
+    run_id = uuid.uuid4().hex[:8]
+
+    def parsed(n: int, i: int) -> Dict[str, Any]:
+        return {"success": True, "message_id": f"bench:{uuid.uuid4()}", "text": SESSION[i % len(SESSION)][0],
+                "phone": f"bench{run_id}{n:05d}", "name": "Bench"}
+
+    async def phone(n: int):
+        for i in range(messages):
+            start = time.perf_counter()
+            await process(parsed(n, i))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Primera pasada fuera de la medición: usuarios y chats ya en Redis
+        await asyncio.gather(*(phone(n) for n in range(phones)))
+        counter.round_trips = 0
+        latencies.clear()
+        await asyncio.gather(*(phone(n) for n in range(phones)))
+    total = len(latencies)
+    print(f"{label:<9} idas y vueltas/mensaje={counter.round_trips / total:5.2f}  "
+          f"p50={percentile(latencies, 50):7.3f} ms  p99={percentile(latencies, 99):7.3f} ms  "
+          f"media={statistics.mean(latencies):7.3f} ms  ({total} mensajes)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--phones", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=100)
+    args = parser.parse_args()
+
+    redis_manager = RedisManager()
+    counter = RoundTripCounter(redis_manager.redis_client)
+    controller = WhatsAppController(whatsapp_service=NullWhatsApp(), redis_manager=redis_manager,
+                                    database=BenchDatabase(), home_assistant_controller=SlowHomeAssistant(0))
+
+    async def classify(user_data: Dict[str, Any], text: str) -> List[str]:
+        return INTENTS[text]
+    controller._classify = classify
+
+    print(f"📊 {args.phones} teléfonos x {args.messages} mensajes")
+    await run("anterior", lambda parsed_data: legacy_message(controller, parsed_data),
+              args.phones, args.messages, counter)
+    await run("lotes", controller.process_message, args.phones, args.messages, counter)
+    await redis_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
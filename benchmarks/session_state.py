@@ -0,0 +1,130 @@
+"""
+Benchmark del costo por turno del estado de conversación.
+
+Recorre una sesión larga (el flujo de troubleshooting completo, repetido)
+con el grafo compartido y un historial de Redis simulado, y compara por
+turno el formato anterior (lista de mensajes y estado de troubleshooting
+guardado con todos sus mensajes y los datos del negocio) con la ventana
+acotada y el estado guardado solo con los campos del flujo: mensajes en el
+grafo, bytes guardados en Redis, tiempo de serializar y deserializar el
+estado y pico de memoria del turno.
+
+No requiere Redis, MySQL ni el modelo: las intenciones vienen dadas.
+
+Uso:
+    python -m benchmarks.session_state --turns 500 --window 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Dict, List
+
+from langchain_core.messages import AIMessage, HumanMessage
+from src.config.settings import settings
+from src.graphs.registry import graph_registry
+from benchmarks.event_loop_lag import NullDatabase
+
+BUSINESS_INFO = {"direccion": "Av. Siempre Viva 742, Buenos Aires", "horario": "Lunes a viernes de 9 a 18",
+                 "email": "info@ejemplo.com", "whatsapp_servicio_tecnico": "+54 11 0000-0000",
+                 "whatsapp_ventas": "+54 11 0000-0001", "security": "0800-000-0000"}
+
+# Sesión de troubleshooting que se repite: (texto, intenciones)
+SESSION = [("tengo un problema con la alarma", ["problema_alarma"]), ("si", []), ("1", []),
+           ("1", []), ("5", [])]
+
+
+def to_dicts(messages) -> List[Dict[str, str]]:
+    return [{"role": "user" if isinstance(m, HumanMessage) else "assistant", "content": m.content}
+            for m in messages]
+
+
+def from_dicts(history) -> list:
+    return [HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
+            for m in history]
+
+
+def legacy_storage(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Formato anterior del estado guardado: todos los campos y los mensajes."""
+    return {**state, "messages": to_dicts(state["messages"])}
+
+
+async def run(turns: int, windowed: bool) -> Dict[str, List[float]]:
+    """Ejecuta la sesión y mide cada turno."""
+    graph = graph_registry.get("conversation")
+    config = {"configurable": {"database": NullDatabase()}}
+    user_data = {"id": 1, "phone": "5491100000000", "level": 2, "first_name": "Bench"}
+    history: List[Dict[str, str]] = []  # lista de Redis: el más reciente primero, hasta 50
+    stored = None  # estado de troubleshooting guardado (JSON)
+    stats = {"messages": [], "stored_bytes": [], "serialize_us": [], "peak_kb": []}
+
+    for turn in range(turns):
+        text, intents = SESSION[turn % len(SESSION)]
+        tracemalloc.start()
+        if windowed:
+            messages = deque(from_dicts(reversed(history[:settings.MESSAGE_WINDOW_SIZE])),
+                             maxlen=settings.MESSAGE_WINDOW_SIZE)
+        else:
+            messages = from_dicts(history[:10])
+        messages.append(HumanMessage(content=text))
+        state = {"messages": messages, "user_data": user_data, "user_level": 2, "intents": intents,
+                 "context": "bench", "business_info": BUSINESS_INFO,
+                 "troubleshooting_active": False, "troubleshooting_state": None}
+
+        start = time.perf_counter()
+        if stored:
+            loaded = json.loads(stored)
+            if not windowed:
+                loaded["messages"] = from_dicts(loaded["messages"])
+            state.update(troubleshooting_active=True, troubleshooting_state=loaded)
+        elapsed = time.perf_counter() - start
+
+        result = await graph.ainvoke(state, config=config)
+        final = result["messages"]
+        history[:0] = to_dicts([final[-1], final[-2]])
+        del history[50:]
+
+        start = time.perf_counter()
+        if result.get("troubleshooting_active") and result.get("troubleshooting_state"):
+            ts_state = result["troubleshooting_state"]
+            blob = ts_state if windowed else legacy_storage(
+                {**ts_state, "messages": final, "business_info": BUSINESS_INFO, "user_data": user_data})
+            stored = json.dumps(blob)
+        else:
+            stored = None
+        elapsed += time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats["messages"].append(len(final))
+        stats["stored_bytes"].append(len(stored) if stored else 0)
+        stats["serialize_us"].append(elapsed * 1e6)
+        stats["peak_kb"].append(peak / 1024)
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--window", type=int, default=settings.MESSAGE_WINDOW_SIZE)
+    args = parser.parse_args()
+    settings.MESSAGE_WINDOW_SIZE = args.window
+
+    print(f"📊 {args.turns} turnos, ventana de {args.window} mensajes")
+    for label, windowed in (("anterior", False), ("ventana", True)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = await run(args.turns, windowed)
+        stored = [b for b in stats["stored_bytes"] if b]
+        print(f"{label:<9} mensajes en el grafo max={max(stats['messages']):<3} "
+              f"estado guardado media={statistics.mean(stored):7.0f} B max={max(stored):6d} B  "
+              f"serializar+cargar media={statistics.mean(stats['serialize_us']):7.1f} us  "
+              f"pico de memoria media={statistics.mean(stats['peak_kb']):6.1f} KB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Benchmark de latencia del webhook: conexiones por request vs. contenedor compartido.
+
+Simula 50 remitentes concurrentes ejecutando el trabajo de E/S que hace cada
+webhook (deduplicación en Redis, búsqueda de usuario y de conversación en MySQL)
+en dos modos:
+
+- per_request: comportamiento anterior, `connect()` + `close()` alrededor de
+  cada mensaje sobre una instancia de Database compartida.
+- shared: pools creados una sola vez por ServiceContainer (lifespan).
+
+Requiere MySQL y Redis configurados en .env (mismos valores que la app).
+
+Uso:
+    python -m benchmarks.webhook_latency --senders 50 --messages 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import List, Tuple
+
+from src.core.container import ServiceContainer
+from src.core.database import Database
+from src.core.memory import RedisManager
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano (values en ms)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+async def simulate_webhook(database: Database, redis_manager: RedisManager, phone: str) -> None:
+    """Trabajo de E/S representativo de un mensaje entrante."""
+    message_id = f"bench:{uuid.uuid4()}"
+    if not await redis_manager.exists(f"message:{message_id}"):
+        await redis_manager.set_value(f"message:{message_id}", "1", 60)
+    user = await database.get_user_by_phone(phone)
+    if user:
+        chat_id = await redis_manager.get_or_create_chat_id(phone)
+        await database.find_active_conversation(user["id"], chat_id)
+
+
+async def run_per_request(senders: int, messages: int) -> Tuple[List[float], int]:
+    """Modo anterior: abrir y cerrar los pools en cada request."""
+    database = Database()
+    redis_manager = RedisManager()
+    latencies, errors = [], 0
+
+    async def sender(n: int):
+        nonlocal errors
+        for _ in range(messages):
+            start = time.perf_counter()
+            try:
+                await database.connect()
+                await simulate_webhook(database, redis_manager, f"54911{n:07d}")
+            except Exception:
+                errors += 1
+            finally:
+                await database.close()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(sender(n) for n in range(senders)))
+    await redis_manager.close()
+    return latencies, errors
+
+
+async def run_shared(senders: int, messages: int) -> Tuple[List[float], int]:
+    """Modo nuevo: pools y clientes del contenedor durante toda la ejecución."""
+    services = ServiceContainer()
+    await services.start()
+    latencies, errors = [], 0
+
+    async def sender(n: int):
+        nonlocal errors
+        for _ in range(messages):
+            start = time.perf_counter()
+            try:
+                await simulate_webhook(services.database, services.redis_manager, f"54911{n:07d}")
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(sender(n) for n in range(senders)))
+    await services.close()
+    return latencies, errors
+
+
+def report(name: str, latencies: List[float], errors: int) -> None:
+    print(f"{name:<12} n={len(latencies):<5} errores={errors:<4} "
+          f"p50={percentile(latencies, 50):8.2f} ms  "
+          f"p99={percentile(latencies, 99):8.2f} ms  "
+          f"media={statistics.mean(latencies):8.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"📊 {args.senders} remitentes x {args.messages} mensajes")
+    report("per_request", *await run_per_request(args.senders, args.messages))
+    report("shared", *await run_shared(args.senders, args.messages))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -161,6 +161,25 @@ INSERT INTO `conversations` VALUES (1,1,'b279b159-7d3c-4427-bcf3-0b3a8fe50891','
 /*!40000 ALTER TABLE `conversations` ENABLE KEYS */;
 UNLOCK TABLES;
 
+--
+-- Table structure for table `intent_labels`
+--
+
+DROP TABLE IF EXISTS `intent_labels`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `intent_labels` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `text_hash` char(40) NOT NULL,
+  `text` mediumtext COLLATE utf8mb4_unicode_ci NOT NULL,
+  `intents` json NOT NULL,
+  `prompt_version` varchar(32) NOT NULL,
+  `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `text_hash` (`text_hash`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `level`
 --
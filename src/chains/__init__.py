@@ -1,4 +1,12 @@
 # src/chains/__init__.py
-from .intent_classifier import IntentClassifier
+from .intent_classifier import IntentClassifier, IntentClassifierCache
+from .intent_cache import IntentResultCache
+from .intent_batcher import IntentBatcher
+from .intent_model import IntentModel
+from .llm_guard import CircuitBreaker, LLMGuard
+from .rule_classifier import RuleBasedClassifier
+from .token_usage import TokenUsage
 
-__all__ = ["IntentClassifier"]
+__all__ = ["CircuitBreaker", "IntentBatcher", "IntentClassifier", "IntentClassifierCache",
+           "IntentModel", "IntentResultCache", "LLMGuard", "RuleBasedClassifier",
+           "TokenUsage"]
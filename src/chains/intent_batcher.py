@@ -0,0 +1,129 @@
+# src/chains/intent_batcher.py
+"""
+Agrupación (micro-batching) de las llamadas al LLM del clasificador.
+
+Las llamadas que llegan para una misma cadena dentro de una ventana corta
+(unos milisegundos) se envían juntas con `chain.abatch`, y cada resultado se
+devuelve a quien lo esperaba. La cantidad total de llamadas al modelo en curso
+queda acotada, así los picos no abren decenas de requests simultáneos.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from langchain_core.runnables import Runnable
+from src.config.settings import settings
+from src.utils.metrics import LatencyWindow
+
+
+class IntentBatcher:
+    def __init__(
+        self,
+        window_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None
+    ):
+        """
+        Inicializa el agrupador.
+
+        Args:
+            window_ms: Milisegundos que se espera a otras llamadas antes de enviar el lote
+            max_batch_size: Tamaño a partir del cual el lote se envía sin esperar
+            max_concurrency: Máximo de llamadas al modelo en curso (entre todos los lotes)
+        """
+        self.window = (window_ms if window_ms is not None else settings.LLM_BATCH_WINDOW_MS) / 1000
+        self.max_batch_size = max_batch_size or settings.LLM_BATCH_MAX_SIZE
+        self.max_concurrency = max_concurrency or settings.LLM_BATCH_MAX_CONCURRENCY
+        self.pending: Dict[int, Tuple[Runnable, List[Tuple[Dict[str, Any], asyncio.Future]]]] = {}
+        self.timers: Dict[int, asyncio.TimerHandle] = {}
+        self.tasks: Set[asyncio.Task] = set()
+        self.inflight = 0
+        self.capacity: Optional[asyncio.Condition] = None
+
+        # Métricas
+        self.calls = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.batch_latency = LatencyWindow()
+
+    async def invoke(self, chain: Runnable, inputs: Dict[str, Any]) -> Any:
+        """
+        Encola una llamada y espera su resultado.
+
+        Args:
+            chain: Cadena a invocar (las llamadas se agrupan por cadena)
+            inputs: Variables del prompt
+
+        Returns:
+            Respuesta del modelo (o la excepción de esa llamada)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = id(chain)
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = (chain, [])
+            self.pending[key] = entry
+            self.timers[key] = loop.call_later(self.window, self._flush, key)
+        entry[1].append((inputs, future))
+        self.calls += 1
+
+        if len(entry[1]) >= self.max_batch_size:
+            self.timers.pop(key).cancel()
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: int) -> None:
+        """Envía el lote pendiente de una cadena."""
+        self.timers.pop(key, None)
+        entry = self.pending.pop(key, None)
+        if not entry:
+            return
+        task = asyncio.create_task(self._run_batch(*entry))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run_batch(self, chain: Runnable, items: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        """Ejecuta un lote respetando el máximo de llamadas en curso."""
+        if self.capacity is None:
+            self.capacity = asyncio.Condition()
+        size = len(items)
+        async with self.capacity:
+            await self.capacity.wait_for(
+                lambda: self.inflight == 0 or self.inflight + size <= self.max_concurrency)
+            self.inflight += size
+
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, size)
+        start = time.perf_counter()
+        try:
+            results = await chain.abatch(
+                [inputs for inputs, _ in items],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True
+            )
+        except Exception as e:
+            results = [e] * size
+        finally:
+            self.batch_latency.observe((time.perf_counter() - start) * 1000)
+            async with self.capacity:
+                self.inflight -= size
+                self.capacity.notify_all()
+
+        for (_, future), result in zip(items, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas del agrupador."""
+        return {
+            "calls": self.calls,
+            "batches": self.batches,
+            "avg_batch_size": round(self.calls / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "inflight": self.inflight,
+            "batch_latency": self.batch_latency.snapshot()
+        }
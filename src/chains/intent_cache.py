@@ -0,0 +1,137 @@
+# src/chains/intent_cache.py
+"""
+Caché en Redis de resultados del clasificador de intenciones.
+
+La clave combina el texto normalizado, la versión del template del prompt
+(y el modelo) y el hash de los métodos de Home Assistant del usuario, de modo
+que cambiar cualquiera de ellos invalida los resultados anteriores.
+
+Además, si se le pasa la base de datos, registra en MySQL (intent_labels) cada
+texto con las intenciones que devolvió el LLM: son las etiquetas con las que
+se entrena el modelo local de intenciones.
+"""
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional, Set
+from src.config.settings import settings
+from src.core.database import Database
+from src.core.memory import RedisManager
+from src.chains.rule_classifier import normalize_text
+from src.utils.metrics import LatencyWindow
+
+
+class IntentResultCache:
+    INDEX_KEY = "taborra:intent_cache:index"
+
+    def __init__(
+        self,
+        redis_manager: RedisManager,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        database: Optional[Database] = None
+    ):
+        """
+        Inicializa la caché de resultados.
+
+        Args:
+            redis_manager: Gestor de Redis
+            ttl: Segundos de vida de cada resultado
+            max_entries: Cantidad máxima de resultados guardados
+            database: Base de datos donde se registran las etiquetas del LLM
+                (opcional)
+        """
+        self.redis_manager = redis_manager
+        self.ttl = ttl or settings.INTENT_CACHE_TTL
+        self.max_entries = max_entries or settings.INTENT_CACHE_MAX_ENTRIES
+        self.database = database
+        self.label_tasks: Set[asyncio.Task] = set()
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.llm_latency = LatencyWindow()
+        self.saved_ms = 0.0
+        self.labels_recorded = 0
+
+    def make_key(self, text: str, prompt_version: str, ha_key: str) -> Optional[str]:
+        """
+        Construye la clave de un resultado.
+
+        Args:
+            text: Texto del usuario
+            prompt_version: Versión del template y modelo del clasificador
+            ha_key: Hash de los métodos de Home Assistant
+
+        Returns:
+            Clave de Redis o None si el texto queda vacío al normalizarlo
+        """
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        digest = hashlib.sha1(
+            f"{prompt_version}|{ha_key}|{normalized}".encode()).hexdigest()
+        return f"taborra:intent_cache:{digest}"
+
+    async def get(self, key: str) -> Optional[List[str]]:
+        """
+        Busca un resultado en caché.
+
+        Args:
+            key: Clave generada con make_key
+
+        Returns:
+            Intenciones guardadas o None si no hay resultado
+        """
+        value = await self.redis_manager.get_value(key)
+        if isinstance(value, list):
+            self.hits += 1
+            # Cada acierto evita, en promedio, una llamada al modelo
+            self.saved_ms += self.llm_latency.percentile(50)
+            return value
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, intents: List[str], llm_latency_ms: float) -> None:
+        """
+        Guarda un resultado del modelo.
+
+        Args:
+            key: Clave generada con make_key
+            intents: Intenciones devueltas por el modelo
+            llm_latency_ms: Duración de la llamada al modelo
+        """
+        self.llm_latency.observe(llm_latency_ms)
+        await self.redis_manager.set_capped_value(
+            key, intents, self.ttl, self.INDEX_KEY, self.max_entries)
+
+    def record_label(self, text: str, intents: List[str], prompt_version: str) -> None:
+        """
+        Registra en segundo plano las intenciones que devolvió el LLM para un
+        texto, sin demorar la respuesta al usuario.
+
+        Args:
+            text: Texto del usuario
+            intents: Intenciones devueltas por el modelo
+            prompt_version: Versión del template y modelo del clasificador
+        """
+        normalized = normalize_text(text)
+        if not self.database or not normalized:
+            return
+        text_hash = hashlib.sha1(normalized.encode()).hexdigest()
+        task = asyncio.create_task(self.database.save_intent_label(
+            text_hash, text, intents, prompt_version))
+        self.label_tasks.add(task)
+        task.add_done_callback(self.label_tasks.discard)
+        self.labels_recorded += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas de la caché de resultados."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "llm_latency": self.llm_latency.snapshot(),
+            "estimated_saved_ms": round(self.saved_ms, 2),
+            "labels_recorded": self.labels_recorded
+        }
@@ -1,13 +1,68 @@
 # src/chains/intent_classifier.py
+import hashlib
+import json
+import time
+from collections import OrderedDict
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from src.config.settings import settings
 from src.template import prompts
+from src.chains.rule_classifier import RuleBasedClassifier, rule_classifier
+from src.chains.intent_cache import IntentResultCache
+from src.chains.intent_model import IntentModel
+from src.chains.intent_batcher import IntentBatcher
+from src.chains.llm_guard import LLMGuard
+from src.chains.token_usage import token_usage
+
+
+def ha_methods_key(ha_methods: Optional[Dict[str, Any]]) -> str:
+    """
+    Genera un hash estable del conjunto de métodos de Home Assistant.
+    Solo influyen el nombre y la descripción, que son lo que entra al prompt.
+
+    Args:
+        ha_methods: Métodos de Home Assistant del usuario
+
+    Returns:
+        Hash hexadecimal (vacío equivale a sin métodos)
+    """
+    normalized = sorted(
+        (name, (info or {}).get("description", "") if isinstance(info, dict) else "")
+        for name, info in (ha_methods or {}).items()
+    )
+    return hashlib.sha1(json.dumps(normalized, ensure_ascii=False).encode()).hexdigest()
+
+
+def prompt_version(model_name: str) -> str:
+    """
+    Versión del clasificador usada en las claves de caché: cambia si se
+    modifica el template base o el modelo.
+
+    Args:
+        model_name: Nombre del modelo
+
+    Returns:
+        Hash corto de template y modelo
+    """
+    return hashlib.sha1(
+        f"{model_name}|{prompts.INTENT_CLASSIFIER_SYSTEM_TEMPLATE}|"
+        f"{prompts.INTENT_CLASSIFIER_USER_TEMPLATE}".encode()).hexdigest()[:12]
 
 
 class IntentClassifier:
-    def __init__(self, api_key: str = None, model_name: str = None, ha_methods: Dict[str, Any] = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        model_name: str = None,
+        ha_methods: Dict[str, Any] = None,
+        llm: Optional[ChatOpenAI] = None,
+        local_classifier: Optional[RuleBasedClassifier] = None,
+        result_cache: Optional[IntentResultCache] = None,
+        intent_model: Optional[IntentModel] = None,
+        batcher: Optional[IntentBatcher] = None,
+        guard: Optional[LLMGuard] = None
+    ):
         """
         Inicializa el clasificador de intenciones usando LangChain
 
@@ -15,42 +70,55 @@ class IntentClassifier:
             api_key: API key para OpenAI (opcional, se puede usar desde settings)
             model_name: Modelo a utilizar (opcional, se puede usar desde settings)
             ha_methods: Métodos de Home Assistant disponibles (opcional)
+            llm: Modelo ya creado para compartir su pool de conexiones (opcional)
+            local_classifier: Clasificador por reglas consultado antes del LLM
+                (opcional, por defecto el compartido)
+            result_cache: Caché de resultados en Redis (opcional)
+            intent_model: Modelo local entrenado offline (opcional)
+            batcher: Agrupador de llamadas concurrentes al modelo (opcional)
+            guard: Plazo, respaldo y circuit breaker de las llamadas (opcional)
         """
+        self.local_classifier = local_classifier or rule_classifier
+        self.result_cache = result_cache
+        self.intent_model = intent_model
+        self.batcher = batcher
+        self.guard = guard
         self.api_key = api_key or settings.OPENAI_API_KEY
         self.model_name = model_name or settings.MODEL_NAME
         self.ha_methods = ha_methods or {}
+        self.ha_key = ha_methods_key(self.ha_methods)
+        # Intenciones de HA que el modelo local no puede devolver a este usuario
+        self.unavailable_ha_intents = [
+            intent for intent in prompts.INTENTS_HA if intent not in self.ha_methods]
+        self.version = prompt_version(self.model_name)
 
         # Verificar que tenemos una API key
         if not self.api_key:
             raise ValueError("No se ha proporcionado una API key para OpenAI")
 
-        # Crear el modelo
-        self.llm = ChatOpenAI(
+        # Crear el modelo (o reutilizar el compartido)
+        self.llm = llm or ChatOpenAI(
             model=self.model_name,
             temperature=0,
-            openai_api_key=self.api_key
+            openai_api_key=self.api_key,
+            base_url=settings.OPENAI_BASE_URL
         )
 
-        # Generar la lista de intenciones de Home Assistant
-        intents_ha_text = ""
+        # Sección de intenciones de Home Assistant del usuario. Va al final del
+        # prompt, junto al mensaje, para que el prefijo sea igual para todos
+        ha_section = ""
         if self.ha_methods:
             intents_ha_lines = []
             for method_name, method_info in self.ha_methods.items():
                 description = method_info.get('description', "")
                 intents_ha_lines.append(f"- {method_name}: {description}")
-            intents_ha_text = "\n".join(intents_ha_lines)
-
-        # Crear el template completo con las intenciones de HA ya incluidas
-        template_text = prompts.INTENT_CLASSIFIER_BASE_TEMPLATE
-        if intents_ha_text:
-            ha_section = f"\nIntenciones de Home Assistant:\n{intents_ha_text}\n"
-            # Insertar la sección antes de la parte "Mensaje del usuario"
-            template_parts = template_text.split("Mensaje del usuario:")
-            template_text = template_parts[0] + ha_section + \
-                "Mensaje del usuario:" + template_parts[1]
+            ha_section = "Intenciones de Home Assistant:\n" + \
+                "\n".join(intents_ha_lines) + "\n\n"
 
-        # Crear el prompt con el texto de template modificado
-        self.prompt = ChatPromptTemplate.from_template(template_text)
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", prompts.INTENT_CLASSIFIER_SYSTEM_TEMPLATE),
+            ("human", prompts.INTENT_CLASSIFIER_USER_TEMPLATE)
+        ]).partial(ha_section=ha_section)
 
         # Crear la cadena
         self.chain = self.prompt | self.llm
@@ -65,8 +133,67 @@ class IntentClassifier:
         Returns:
             Lista de intenciones detectadas
         """
+        # Primer nivel: reglas locales para mensajes triviales
+        if settings.RULE_CLASSIFIER_ENABLED:
+            local_intents = self.local_classifier.predict(text)
+            if local_intents is not None:
+                print(f"⚡ Intenciones resueltas localmente: {local_intents}")
+                return local_intents
+
+        # Segundo nivel: modelo local entrenado offline, solo si hay confianza
+        if self.intent_model and settings.INTENT_MODEL_ENABLED:
+            model_intents = self.intent_model.predict(
+                text, self.unavailable_ha_intents)
+            if model_intents is not None:
+                print(f"🤖 Intenciones resueltas por el modelo local: {model_intents}")
+                return model_intents
+
+        # Tercer nivel: resultados previos del modelo para el mismo texto
+        cache_key = None
+        if self.result_cache and settings.INTENT_CACHE_ENABLED:
+            cache_key = self.result_cache.make_key(
+                text, self.version, self.ha_key)
+            if cache_key:
+                cached_intents = await self.result_cache.get(cache_key)
+                if cached_intents is not None:
+                    print(f"💾 Intenciones desde caché: {cached_intents}")
+                    return cached_intents
+
+        start = time.perf_counter()
+        intents = await self._predict_llm(text)
+        if intents is None:
+            # Modelo caído, lento o con el breaker abierto: modo degradado con
+            # palabras clave locales (sin guardar el resultado en caché)
+            intents = self.local_classifier.match_keywords(text)
+            print(f"🛟 Modo degradado, intenciones por palabras clave: {intents}")
+            return intents
+
+        if cache_key:
+            await self.result_cache.put(
+                cache_key, intents, (time.perf_counter() - start) * 1000)
+        if self.result_cache:
+            self.result_cache.record_label(text, intents, self.version)
+        return intents
+
+    async def _predict_llm(self, text: str) -> Optional[List[str]]:
+        """
+        Clasifica un texto con el modelo.
+
+        Args:
+            text: Texto del usuario a clasificar
+
+        Returns:
+            Lista de intenciones detectadas o None si la llamada falló
+        """
         try:
-            response = await self.chain.ainvoke({"text": text})
+            start = time.perf_counter()
+            if self.guard:
+                response = await self.guard.run(lambda: self._invoke_chain(text))
+                if response is None:
+                    return None
+            else:
+                response = await self._invoke_chain(text)
+            token_usage.record(response, (time.perf_counter() - start) * 1000)
 
             # Procesar la respuesta
             if not response.content or response.content.lower() == "ninguna":
@@ -81,5 +208,115 @@ class IntentClassifier:
 
         except Exception as e:
             print(f"❌ Error al clasificar intenciones: {e}")
-            # En caso de error, devolver una lista vacía
-            return []
+            return None
+
+    async def _invoke_chain(self, text: str) -> Any:
+        """Invoca la cadena, agrupando la llamada si hay un agrupador."""
+        if self.batcher and settings.LLM_BATCH_ENABLED:
+            return await self.batcher.invoke(self.chain, {"text": text})
+        return await self.chain.ainvoke({"text": text})
+
+
+class IntentClassifierCache:
+    def __init__(
+        self,
+        llm: Optional[ChatOpenAI] = None,
+        max_size: Optional[int] = None,
+        ttl: Optional[float] = None,
+        result_cache: Optional[IntentResultCache] = None,
+        intent_model: Optional[IntentModel] = None,
+        batcher: Optional[IntentBatcher] = None,
+        guard: Optional[LLMGuard] = None
+    ):
+        """
+        Caché LRU de clasificadores compilados, indexada por el hash del
+        conjunto de métodos de Home Assistant. Todos los clasificadores
+        comparten el mismo modelo, y por lo tanto las conexiones HTTP/TLS.
+
+        Args:
+            llm: Modelo compartido (opcional, se crea uno desde settings)
+            max_size: Cantidad máxima de clasificadores en caché
+            ttl: Segundos de vida de cada clasificador
+            result_cache: Caché de resultados compartida por los clasificadores
+            intent_model: Modelo local compartido por los clasificadores
+            batcher: Agrupador de llamadas compartido por los clasificadores
+            guard: Protección de latencia compartida por los clasificadores
+        """
+        self.llm = llm or ChatOpenAI(
+            model=settings.MODEL_NAME,
+            temperature=0,
+            openai_api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL
+        )
+        self.max_size = max_size or settings.CLASSIFIER_CACHE_SIZE
+        self.ttl = ttl or settings.CLASSIFIER_CACHE_TTL
+        self.result_cache = result_cache
+        self.intent_model = intent_model
+        self.batcher = batcher
+        self.guard = guard
+        self.entries: "OrderedDict[str, Tuple[float, IntentClassifier]]" = OrderedDict()
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, classifier: IntentClassifier) -> None:
+        """Agrega un clasificador ya construido a la caché."""
+        if classifier.result_cache is None:
+            classifier.result_cache = self.result_cache
+        if classifier.intent_model is None:
+            classifier.intent_model = self.intent_model
+        if classifier.batcher is None:
+            classifier.batcher = self.batcher
+        if classifier.guard is None:
+            classifier.guard = self.guard
+        key = classifier.ha_key
+        self.entries[key] = (time.monotonic(), classifier)
+        self.entries.move_to_end(key)
+        self._evict()
+
+    def get(self, ha_methods: Optional[Dict[str, Any]] = None) -> IntentClassifier:
+        """
+        Devuelve el clasificador para un conjunto de métodos de Home Assistant,
+        construyéndolo solo si no está en caché o expiró.
+
+        Args:
+            ha_methods: Métodos de Home Assistant del usuario
+
+        Returns:
+            Clasificador de intenciones
+        """
+        key = ha_methods_key(ha_methods)
+        entry = self.entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        classifier = IntentClassifier(
+            ha_methods=ha_methods, llm=self.llm, result_cache=self.result_cache,
+            intent_model=self.intent_model, batcher=self.batcher, guard=self.guard)
+        self.entries[key] = (time.monotonic(), classifier)
+        self.entries.move_to_end(key)
+        self._evict()
+        return classifier
+
+    def _evict(self) -> None:
+        """Elimina los clasificadores menos usados por encima del tamaño máximo."""
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas actuales de la caché."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0
+        }
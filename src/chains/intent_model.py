@@ -0,0 +1,325 @@
+# src/chains/intent_model.py
+"""
+Modelo local de intenciones entrenado offline.
+
+TF-IDF de n-gramas de caracteres (y palabras) con una regresión logística
+multiclase, donde cada clase es un conjunto de intenciones ("" = ninguna).
+Se entrena con python -m src.chains.train_intent_model, se guarda en un
+.npz y se carga al iniciar la aplicación. Solo responde cuando la clase más
+probable supera el umbral de confianza; si no, el mensaje pasa al LLM.
+
+Depende de numpy (instalado con langchain); si no está disponible el modelo
+simplemente no se carga.
+"""
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from src.chains.rule_classifier import normalize_text
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy viene con langchain
+    np = None
+
+NGRAM_RANGE = (2, 4)
+
+
+def label_key(intents: Iterable[str]) -> str:
+    """
+    Clase del modelo para un conjunto de intenciones.
+
+    Args:
+        intents: Intenciones del mensaje
+
+    Returns:
+        Intenciones únicas y ordenadas separadas por comas ("" si no hay)
+    """
+    return ",".join(sorted({intent.strip() for intent in intents if intent.strip()}))
+
+
+def extract_features(text: str) -> Counter:
+    """
+    Extrae los n-gramas de caracteres y las palabras de un mensaje.
+
+    Args:
+        text: Texto del usuario
+
+    Returns:
+        Conteo de cada feature
+    """
+    normalized = normalize_text(text)
+    features = Counter(f"w:{word}" for word in normalized.split())
+    padded = f" {normalized} "
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for i in range(len(padded) - n + 1):
+            features[padded[i:i + n]] += 1
+    return features
+
+
+class IntentModel:
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        idf: "np.ndarray",
+        weights: "np.ndarray",
+        bias: "np.ndarray",
+        classes: List[str],
+        threshold: float = 0.85,
+        info: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Inicializa un modelo ya entrenado.
+
+        Args:
+            vocabulary: Índice de cada feature
+            idf: Peso IDF de cada feature
+            weights: Matriz (clases x features)
+            bias: Sesgo de cada clase
+            classes: Clases (conjuntos de intenciones) en orden
+            threshold: Confianza mínima para responder sin el LLM
+            info: Datos del entrenamiento (fecha, muestras, ...)
+        """
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.classes = classes
+        self.threshold = threshold
+        self.info = info or {}
+
+        # Métricas
+        self.total = 0
+        self.resolved = 0
+        self.rejected = 0
+
+    def vectorize(self, text: str) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Vector TF-IDF disperso (índices, valores) normalizado en L2.
+
+        Args:
+            text: Texto del usuario
+
+        Returns:
+            Índices de las features conocidas y sus pesos
+        """
+        counts = extract_features(text)
+        indices, values = [], []
+        for feature, count in counts.items():
+            idx = self.vocabulary.get(feature)
+            if idx is not None:
+                indices.append(idx)
+                values.append((1.0 + math.log(count)) * self.idf[idx])
+        indices = np.array(indices, dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        norm = np.sqrt(values @ values) if len(values) else 0.0
+        if norm:
+            values /= norm
+        return indices, values
+
+    def probabilities(self, text: str) -> "np.ndarray":
+        """Probabilidad de cada clase para un mensaje."""
+        indices, values = self.vectorize(text)
+        logits = self.weights[:, indices] @ values + self.bias
+        logits -= logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def classify(self, text: str) -> Tuple[List[str], float]:
+        """
+        Clase más probable sin aplicar el umbral.
+
+        Args:
+            text: Texto del usuario
+
+        Returns:
+            Tupla (intenciones, confianza)
+        """
+        probs = self.probabilities(text)
+        best = int(probs.argmax())
+        label = self.classes[best]
+        return (label.split(",") if label else []), float(probs[best])
+
+    def predict(self, text: str, disallowed: Sequence[str] = ()) -> Optional[List[str]]:
+        """
+        Clasifica un mensaje solo si la confianza supera el umbral.
+
+        Args:
+            text: Texto del usuario
+            disallowed: Intenciones que el usuario no tiene disponibles
+                (p. ej. métodos de Home Assistant no configurados)
+
+        Returns:
+            Lista de intenciones o None si el mensaje debe pasar al LLM
+        """
+        self.total += 1
+        if not normalize_text(text):
+            return None
+        intents, confidence = self.classify(text)
+        if confidence < self.threshold or any(intent in disallowed for intent in intents):
+            self.rejected += 1
+            return None
+        self.resolved += 1
+        return intents
+
+    @classmethod
+    def train(
+        cls,
+        samples: Sequence[Tuple[str, str]],
+        epochs: int = 40,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+        threshold: float = 0.85,
+        seed: int = 13,
+        min_support: int = 20
+    ) -> "IntentModel":
+        """
+        Entrena el modelo con descenso por gradiente estocástico.
+
+        Args:
+            samples: Pares (texto, clase) con la clase generada por label_key
+            epochs: Pasadas sobre los datos
+            learning_rate: Tasa de aprendizaje inicial
+            l2: Regularización L2
+            threshold: Umbral de confianza del modelo resultante
+            seed: Semilla para el orden de las muestras
+            min_support: Ejemplos mínimos de una clase para aprenderla; las
+                clases con menos se omiten y sus mensajes quedan para el LLM
+
+        Returns:
+            Modelo entrenado
+
+        Raises:
+            ValueError: Si quedan menos de dos clases con soporte suficiente
+        """
+        if np is None:
+            raise RuntimeError("numpy no está instalado")
+
+        support = Counter(label for _, label in samples)
+        skipped = sorted(label for label, n in support.items() if n < min_support)
+        samples = [sample for sample in samples if support[sample[1]] >= min_support]
+        classes = sorted({label for _, label in samples})
+        if len(classes) < 2:
+            raise ValueError(
+                f"Se necesitan al menos dos clases con {min_support} ejemplos o más "
+                f"(hay {len(classes)})")
+        class_index = {label: i for i, label in enumerate(classes)}
+        documents = [extract_features(text) for text, _ in samples]
+
+        # Vocabulario e IDF suavizado
+        document_frequency = Counter()
+        for counts in documents:
+            document_frequency.update(counts.keys())
+        vocabulary = {feature: i for i, feature in enumerate(sorted(document_frequency))}
+        idf = np.zeros(len(vocabulary))
+        for feature, df in document_frequency.items():
+            idf[vocabulary[feature]] = math.log((1 + len(documents)) / (1 + df)) + 1
+
+        model = cls(vocabulary, idf, np.zeros((len(classes), len(vocabulary))),
+                    np.zeros(len(classes)), classes, threshold)
+        vectors = [model.vectorize(text) for text, _ in samples]
+        targets = [class_index[label] for _, label in samples]
+
+        # Peso por clase para que el historial no aplaste a las clases chicas
+        class_counts = Counter(targets)
+        class_weight = {c: len(samples) / (len(classes) * n) for c, n in class_counts.items()}
+
+        rng = random.Random(seed)
+        order = list(range(len(samples)))
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + 0.1 * epoch)
+            for i in order:
+                indices, values = vectors[i]
+                logits = model.weights[:, indices] @ values + model.bias
+                logits -= logits.max()
+                grad = np.exp(logits)
+                grad /= grad.sum()
+                grad[targets[i]] -= 1.0
+                grad *= class_weight[targets[i]]
+                model.weights[:, indices] *= 1 - rate * l2
+                model.weights[:, indices] -= rate * np.outer(grad, values)
+                model.bias -= rate * grad
+
+        model.info = {
+            "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "samples": len(samples),
+            "features": len(vocabulary),
+            "classes": len(classes),
+            "skipped_classes": skipped
+        }
+        return model
+
+    def save(self, path: str) -> None:
+        """
+        Guarda el modelo en un archivo .npz.
+
+        Args:
+            path: Ruta del archivo
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez_compressed(
+            path,
+            vocabulary=np.array(vocabulary),
+            idf=self.idf,
+            weights=self.weights,
+            bias=self.bias,
+            classes=np.array(self.classes),
+            info=np.array(json.dumps(self.info))
+        )
+
+    @classmethod
+    def load(cls, path: str, threshold: Optional[float] = None) -> Optional["IntentModel"]:
+        """
+        Carga un modelo guardado con save().
+
+        Args:
+            path: Ruta del archivo
+            threshold: Umbral de confianza (opcional, por defecto desde settings)
+
+        Returns:
+            Modelo cargado o None si no existe o no se pudo leer
+        """
+        from src.config.settings import settings
+
+        if np is None:
+            print("⚠️ numpy no está instalado, no se carga el modelo local de intenciones")
+            return None
+        if not os.path.exists(path):
+            print(f"⚠️ No se encontró el modelo local de intenciones en {path}")
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                vocabulary = {str(feature): i for i, feature in enumerate(data["vocabulary"])}
+                model = cls(
+                    vocabulary,
+                    data["idf"],
+                    data["weights"],
+                    data["bias"],
+                    [str(label) for label in data["classes"]],
+                    threshold if threshold is not None else settings.INTENT_MODEL_THRESHOLD,
+                    json.loads(str(data["info"]))
+                )
+            print(f"✅ Modelo local de intenciones cargado ({model.info.get('samples')} muestras, "
+                  f"{len(model.classes)} clases)")
+            return model
+        except Exception as e:
+            print(f"❌ Error al cargar el modelo local de intenciones: {e}")
+            return None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas del modelo local."""
+        return {
+            **self.info,
+            "threshold": self.threshold,
+            "total": self.total,
+            "resolved_locally": self.resolved,
+            "rejected": self.rejected,
+            "local_share": round(self.resolved / self.total, 3) if self.total else 0.0
+        }
@@ -0,0 +1,179 @@
+# src/chains/llm_guard.py
+"""
+Protección de latencia para las llamadas al LLM del clasificador.
+
+Cada llamada tiene un plazo máximo, puede lanzar una segunda llamada de
+respaldo (hedging) si la primera tarda más de lo configurado, y pasa por un
+circuit breaker que se abre tras varias fallas seguidas. Mientras el breaker
+está abierto no se llama al modelo y el clasificador responde en modo
+degradado con palabras clave locales.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from src.config.settings import settings
+
+T = TypeVar("T")
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        """
+        Inicializa el breaker cerrado.
+
+        Args:
+            failure_threshold: Fallas consecutivas que abren el breaker
+            reset_timeout: Segundos abierto antes de permitir una llamada de prueba
+        """
+        self.failure_threshold = failure_threshold or settings.LLM_BREAKER_FAILURES
+        self.reset_timeout = reset_timeout or settings.LLM_BREAKER_RESET
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_progress = False
+
+        # Métricas
+        self.times_opened = 0
+
+    def allow_request(self) -> bool:
+        """
+        Indica si se puede llamar al modelo. Con el breaker abierto, pasado el
+        tiempo de espera deja pasar una única llamada de prueba (half-open).
+        """
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.trial_in_progress = False
+        if self.state == self.HALF_OPEN and not self.trial_in_progress:
+            self.trial_in_progress = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Registra una llamada exitosa y cierra el breaker."""
+        if self.state != self.CLOSED:
+            print("✅ Circuit breaker del LLM cerrado")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.trial_in_progress = False
+
+    def record_failure(self) -> None:
+        """Registra una falla y abre el breaker si corresponde."""
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                print(f"⚠️ Circuit breaker del LLM abierto tras {self.consecutive_failures} fallas")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.trial_in_progress = False
+
+
+class LLMGuard:
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        hedge_delay: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        Inicializa la protección.
+
+        Args:
+            timeout: Plazo máximo de cada llamada en segundos
+            hedge_delay: Segundos tras los cuales se lanza la llamada de
+                respaldo (0 la deshabilita)
+            breaker: Circuit breaker (opcional, se crea uno desde settings)
+        """
+        self.timeout = timeout or settings.LLM_TIMEOUT
+        self.hedge_delay = hedge_delay if hedge_delay is not None else settings.LLM_HEDGE_DELAY
+        self.breaker = breaker or CircuitBreaker()
+
+        # Métricas
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.short_circuited = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def run(self, factory: Callable[[], Awaitable[T]]) -> Optional[T]:
+        """
+        Ejecuta una llamada al modelo con plazo, respaldo y breaker.
+
+        Args:
+            factory: Función que crea la corrutina de la llamada (se invoca
+                una vez más si se lanza la llamada de respaldo)
+
+        Returns:
+            Resultado de la llamada o None si falló, venció el plazo o el
+            breaker está abierto
+        """
+        if not self.breaker.allow_request():
+            self.short_circuited += 1
+            return None
+
+        self.calls += 1
+        try:
+            result = await asyncio.wait_for(self._hedged(factory), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.breaker.record_failure()
+            print(f"⚠️ Llamada al LLM cancelada tras {self.timeout} s")
+            return None
+        except Exception as e:
+            self.failures += 1
+            self.breaker.record_failure()
+            print(f"❌ Error en la llamada al LLM: {e}")
+            return None
+
+        self.breaker.record_success()
+        return result
+
+    async def _hedged(self, factory: Callable[[], Awaitable[T]]) -> T:
+        """Lanza la llamada y, si tarda, una de respaldo; gana la primera exitosa."""
+        primary = asyncio.ensure_future(factory())
+        tasks = {primary}
+        try:
+            if not self.hedge_delay:
+                return await primary
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            hedge = asyncio.ensure_future(factory())
+            tasks.add(hedge)
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas de la protección y estado del breaker."""
+        return {
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "short_circuited": self.short_circuited,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
@@ -0,0 +1,125 @@
+# src/chains/rule_classifier.py
+"""
+Primer nivel determinístico del clasificador de intenciones.
+
+Resuelve localmente los mensajes triviales ("hola", "gracias", "si", "5",
+"salir", ...) con un autómata de expresiones regulares compilado una sola
+vez sobre el vocabulario de prompts.py. Solo responde cuando todo el mensaje
+queda cubierto por frases conocidas; ante la duda devuelve None y el mensaje
+pasa al LLM.
+"""
+import re
+from typing import Dict, Any, List, Optional
+from src.template import prompts
+from src.utils.helpers import normalize_text
+
+
+class RuleBasedClassifier:
+    def __init__(
+        self,
+        phrases: Optional[Dict[str, List[str]]] = None,
+        trivial_phrases: Optional[List[str]] = None,
+        filler_words: Optional[List[str]] = None
+    ):
+        """
+        Compila el autómata de frases.
+
+        Args:
+            phrases: Frases por intención (las claves pueden agrupar varias
+                intenciones separadas por comas)
+            trivial_phrases: Mensajes completos sin intención
+            filler_words: Palabras que no cambian la intención
+        """
+        phrases = phrases or prompts.INTENT_RULE_PHRASES
+        trivial_phrases = trivial_phrases or prompts.TRIVIAL_MESSAGE_PHRASES
+        filler_words = filler_words or prompts.INTENT_RULE_FILLER_WORDS
+
+        self.phrase_intents: Dict[str, List[str]] = {}
+        for intents, intent_phrases in phrases.items():
+            for phrase in intent_phrases:
+                self.phrase_intents[normalize_text(phrase)] = intents.split(",")
+
+        # Las frases más largas primero para que "muchas gracias" gane a "gracias"
+        alternatives = sorted(self.phrase_intents, key=len, reverse=True)
+        self.phrase_re = re.compile(
+            r"\b(?:" + "|".join(re.escape(p) for p in alternatives) + r")\b")
+        self.trivial_re = re.compile(
+            r"(?:\d+|" + "|".join(re.escape(normalize_text(p)) for p in trivial_phrases) + r")")
+        self.filler_words = {normalize_text(w) for w in filler_words}
+
+        # Métricas
+        self.total = 0
+        self.resolved = 0
+        self.trivial = 0
+        self.keyword_matches = 0
+
+    def predict(self, text: str) -> Optional[List[str]]:
+        """
+        Clasifica un mensaje solo si hay certeza.
+
+        Args:
+            text: Texto del usuario
+
+        Returns:
+            Lista de intenciones (vacía para mensajes triviales) o None si
+            el mensaje debe pasar al LLM
+        """
+        self.total += 1
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+
+        if self.trivial_re.fullmatch(normalized):
+            self.resolved += 1
+            self.trivial += 1
+            return []
+
+        intents: List[str] = []
+
+        def collect(match: re.Match) -> str:
+            for intent in self.phrase_intents[match.group(0)]:
+                if intent not in intents:
+                    intents.append(intent)
+            return " "
+
+        residual = self.phrase_re.sub(collect, normalized)
+        if not intents or any(word not in self.filler_words for word in residual.split()):
+            return None
+
+        self.resolved += 1
+        return intents
+
+    def match_keywords(self, text: str) -> List[str]:
+        """
+        Coincidencia laxa por palabras clave para el modo degradado: devuelve
+        las intenciones de todas las frases encontradas, sin exigir que cubran
+        el mensaje completo.
+
+        Args:
+            text: Texto del usuario
+
+        Returns:
+            Lista de intenciones encontradas (vacía si no hay ninguna)
+        """
+        self.keyword_matches += 1
+        intents: List[str] = []
+        for match in self.phrase_re.finditer(normalize_text(text)):
+            for intent in self.phrase_intents[match.group(0)]:
+                if intent not in intents:
+                    intents.append(intent)
+        return intents
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas del clasificador local."""
+        return {
+            "total": self.total,
+            "resolved_locally": self.resolved,
+            "trivial": self.trivial,
+            "fallthrough": self.total - self.resolved,
+            "degraded_keyword_matches": self.keyword_matches,
+            "local_share": round(self.resolved / self.total, 3) if self.total else 0.0
+        }
+
+
+# Instancia compartida por todos los clasificadores
+rule_classifier = RuleBasedClassifier()
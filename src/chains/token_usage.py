@@ -0,0 +1,105 @@
+# src/chains/token_usage.py
+"""
+Contabilidad de tokens de las llamadas al LLM del clasificador.
+
+Registra los tokens de prompt (y cuántos vinieron de la caché de prefijos del
+proveedor), los de respuesta y la latencia de cada llamada, con totales y las
+últimas llamadas para el endpoint /metrics.
+"""
+from collections import deque
+from typing import Any, Dict, Optional
+from src.utils.metrics import LatencyWindow
+
+
+class TokenUsage:
+    def __init__(self, recent_size: int = 50):
+        """
+        Inicializa los contadores.
+
+        Args:
+            recent_size: Cantidad de llamadas recientes conservadas con su detalle
+        """
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls_without_usage = 0
+        self.latency = LatencyWindow()
+        self.recent = deque(maxlen=recent_size)
+
+    @staticmethod
+    def extract(response: Any) -> Optional[Dict[str, int]]:
+        """
+        Extrae el uso de tokens de una respuesta de LangChain.
+
+        Args:
+            response: Mensaje devuelto por el modelo
+
+        Returns:
+            Diccionario con prompt, cached y completion, o None si el
+            proveedor no informó el uso
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            details = usage.get("input_token_details") or {}
+            return {
+                "prompt": usage.get("input_tokens", 0),
+                "cached": details.get("cache_read", 0) or 0,
+                "completion": usage.get("output_tokens", 0)
+            }
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+        if token_usage:
+            details = token_usage.get("prompt_tokens_details") or {}
+            return {
+                "prompt": token_usage.get("prompt_tokens", 0),
+                "cached": details.get("cached_tokens", 0) or 0,
+                "completion": token_usage.get("completion_tokens", 0)
+            }
+        return None
+
+    def record(self, response: Any, latency_ms: float) -> Optional[Dict[str, int]]:
+        """
+        Registra una llamada al modelo.
+
+        Args:
+            response: Mensaje devuelto por el modelo
+            latency_ms: Duración de la llamada
+
+        Returns:
+            Uso de tokens de la llamada o None si no se informó
+        """
+        self.calls += 1
+        self.latency.observe(latency_ms)
+        usage = self.extract(response)
+        if usage is None:
+            self.calls_without_usage += 1
+            return None
+
+        self.prompt_tokens += usage["prompt"]
+        self.cached_prompt_tokens += usage["cached"]
+        self.completion_tokens += usage["completion"]
+        # Sin el texto del usuario: el detalle se expone en /metrics
+        self.recent.append({**usage, "latency_ms": round(latency_ms, 2)})
+        print(f"🧾 Tokens: prompt={usage['prompt']} (caché={usage['cached']}) "
+              f"respuesta={usage['completion']} en {latency_ms:.0f} ms")
+        return usage
+
+    def metrics(self) -> Dict[str, Any]:
+        """Totales, promedios por llamada y últimas llamadas."""
+        counted = self.calls - self.calls_without_usage
+        return {
+            "calls": self.calls,
+            "calls_without_usage": self.calls_without_usage,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / counted, 1) if counted else 0.0,
+            "avg_completion_tokens": round(self.completion_tokens / counted, 1) if counted else 0.0,
+            "prefix_cache_ratio": round(self.cached_prompt_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0,
+            "latency": self.latency.snapshot(),
+            "recent": list(self.recent)
+        }
+
+
+# Contadores compartidos por todos los clasificadores
+token_usage = TokenUsage()
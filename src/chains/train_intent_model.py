@@ -0,0 +1,283 @@
+# src/chains/train_intent_model.py
+"""
+Entrenamiento y evaluación offline del modelo local de intenciones.
+
+Uso:
+    # 1. Exportar a JSONL los mensajes que clasificó el LLM, etiquetados con
+    #    las intenciones que devolvió (tabla intent_labels). Los demás mensajes
+    #    de usuarios quedan con "intents": null para etiquetarlos a mano (o se
+    #    ignoran).
+    python -m src.chains.train_intent_model export --out data/intent_history.jsonl
+
+    # 2. Entrenar con la semilla de prompts.py más el historial etiquetado,
+    #    mostrar el reporte de precisión/latencia y guardar el modelo. Las
+    #    clases con menos de --min-support ejemplos no se aprenden y sus
+    #    mensajes siempre pasan al LLM.
+    python -m src.chains.train_intent_model train --data data/intent_history.jsonl
+
+    # 3. Evaluar un modelo guardado contra un JSONL etiquetado.
+    python -m src.chains.train_intent_model evaluate --data data/intent_eval.jsonl
+
+El entrenamiento y la evaluación no usan la red (solo el export lee MySQL).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+from src.config.settings import settings
+from src.template import prompts
+from src.chains.intent_model import IntentModel, label_key
+from src.chains.rule_classifier import normalize_text
+from src.utils.metrics import LatencyWindow
+
+
+def seed_samples() -> List[Tuple[str, str]]:
+    """
+    Muestras semilla: ejemplos de prompts.py, frases de las reglas y
+    mensajes triviales.
+
+    Returns:
+        Pares (texto, clase)
+    """
+    samples = []
+    for intents, texts in prompts.INTENT_TRAINING_SEED.items():
+        samples.extend((text, label_key(intents.split(","))) for text in texts)
+    for intents, phrases in prompts.INTENT_RULE_PHRASES.items():
+        samples.extend((phrase, label_key(intents.split(","))) for phrase in phrases)
+    samples.extend((phrase, "") for phrase in prompts.TRIVIAL_MESSAGE_PHRASES)
+    return samples
+
+
+def load_samples(paths: Sequence[str]) -> List[Tuple[str, str]]:
+    """
+    Lee muestras etiquetadas de archivos JSONL ({"text": ..., "intents": [...]}).
+    Las filas sin etiquetar ("intents": null) se ignoran.
+
+    Args:
+        paths: Archivos JSONL
+
+    Returns:
+        Pares (texto, clase)
+    """
+    samples = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if row.get("intents") is None or not row.get("text"):
+                    continue
+                samples.append((row["text"], label_key(row["intents"])))
+    return samples
+
+
+def deduplicate(samples: Sequence[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Elimina textos repetidos (tras normalizarlos); gana la última etiqueta."""
+    unique: Dict[str, Tuple[str, str]] = {}
+    for text, label in samples:
+        unique[normalize_text(text)] = (text, label)
+    return list(unique.values())
+
+
+def split_samples(
+    samples: Sequence[Tuple[str, str]],
+    holdout: float,
+    seed: int
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Separa entrenamiento y evaluación estratificando por clase. Las clases
+    con menos de 3 ejemplos quedan enteras en entrenamiento.
+
+    Returns:
+        Tupla (entrenamiento, evaluación)
+    """
+    by_label: Dict[str, list] = defaultdict(list)
+    for sample in samples:
+        by_label[sample[1]].append(sample)
+
+    rng = random.Random(seed)
+    train, test = [], []
+    for label in sorted(by_label):
+        group = by_label[label]
+        rng.shuffle(group)
+        cut = int(len(group) * holdout) if len(group) >= 3 else 0
+        test.extend(group[:cut])
+        train.extend(group[cut:])
+    return train, test
+
+
+def evaluate(model: IntentModel, samples: Sequence[Tuple[str, str]]) -> Dict[str, dict]:
+    """
+    Evalúa el modelo sobre muestras etiquetadas.
+
+    Returns:
+        Reporte global y por clase: precisión, recall, cobertura con el umbral
+        y latencia de predicción
+    """
+    per_label = defaultdict(lambda: {"support": 0, "tp": 0, "fp": 0, "covered": 0,
+                                     "covered_ok": 0, "latency": LatencyWindow()})
+    overall = {"total": 0, "correct": 0, "covered": 0, "covered_ok": 0,
+               "latency": LatencyWindow()}
+
+    for text, label in samples:
+        start = time.perf_counter()
+        intents, confidence = model.classify(text)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        predicted = label_key(intents)
+        covered = confidence >= model.threshold
+
+        stats = per_label[label]
+        stats["support"] += 1
+        stats["latency"].observe(elapsed_ms)
+        overall["total"] += 1
+        overall["latency"].observe(elapsed_ms)
+        if predicted == label:
+            stats["tp"] += 1
+            overall["correct"] += 1
+        else:
+            per_label[predicted]["fp"] += 1
+        if covered:
+            stats["covered"] += 1
+            overall["covered"] += 1
+            if predicted == label:
+                stats["covered_ok"] += 1
+                overall["covered_ok"] += 1
+
+    report = {"labels": {}}
+    for label, stats in sorted(per_label.items()):
+        predicted_total = stats["tp"] + stats["fp"]
+        report["labels"][label or "ninguna"] = {
+            "support": stats["support"],
+            "precision": round(stats["tp"] / predicted_total, 3) if predicted_total else 0.0,
+            "recall": round(stats["tp"] / stats["support"], 3) if stats["support"] else 0.0,
+            "coverage": round(stats["covered"] / stats["support"], 3) if stats["support"] else 0.0,
+            "covered_accuracy": round(stats["covered_ok"] / stats["covered"], 3) if stats["covered"] else 0.0,
+            "latency": stats["latency"].snapshot()
+        }
+    total = overall["total"]
+    report["overall"] = {
+        "samples": total,
+        "accuracy": round(overall["correct"] / total, 3) if total else 0.0,
+        "coverage": round(overall["covered"] / total, 3) if total else 0.0,
+        "covered_accuracy": round(overall["covered_ok"] / overall["covered"], 3) if overall["covered"] else 0.0,
+        "threshold": model.threshold,
+        "latency": overall["latency"].snapshot()
+    }
+    return report
+
+
+def print_report(report: Dict[str, dict]) -> None:
+    """Imprime el reporte de evaluación como tabla."""
+    print(f"{'intención':<40} {'n':>4} {'prec':>6} {'recall':>6} {'cobert':>6} "
+          f"{'ok@umb':>6} {'p50 ms':>7} {'p99 ms':>7}")
+    for label, row in report["labels"].items():
+        if not row["support"]:
+            continue
+        print(f"{label[:40]:<40} {row['support']:>4} {row['precision']:>6.2f} {row['recall']:>6.2f} "
+              f"{row['coverage']:>6.2f} {row['covered_accuracy']:>6.2f} "
+              f"{row['latency']['p50_ms']:>7.3f} {row['latency']['p99_ms']:>7.3f}")
+    overall = report["overall"]
+    print(f"\n📊 Exactitud: {overall['accuracy']:.3f} | cobertura con umbral {overall['threshold']}: "
+          f"{overall['coverage']:.3f} (exactitud cubierta {overall['covered_accuracy']:.3f}) | "
+          f"latencia p50 {overall['latency']['p50_ms']:.3f} ms, p99 {overall['latency']['p99_ms']:.3f} ms")
+
+
+async def export_history(out: str, limit: int) -> None:
+    """
+    Exporta a JSONL las etiquetas del LLM de intent_labels y, sin etiquetar,
+    los mensajes de usuarios de conversation_messages que no tienen una.
+    """
+    from src.core.database import Database
+
+    database = Database()
+    try:
+        labels = await database.get_intent_labels(limit)
+        messages = await database.get_user_messages(limit)
+    finally:
+        await database.close()
+
+    seen = set()
+    unlabelled = 0
+    with open(out, "w", encoding="utf-8") as f:
+        for row in labels:
+            seen.add(normalize_text(row["text"]))
+            f.write(json.dumps({"text": row["text"], "intents": row["intents"],
+                                "source": "llm"}, ensure_ascii=False) + "\n")
+        for row in messages:
+            normalized = normalize_text(row["content"])
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            unlabelled += 1
+            f.write(json.dumps({"text": row["content"], "intents": None, "source": None},
+                               ensure_ascii=False) + "\n")
+    print(f"✅ {len(labels)} mensajes etiquetados por el LLM y {unlabelled} sin etiquetar "
+          f"exportados a {out}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Modelo local de intenciones")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Exportar historial a JSONL")
+    export_parser.add_argument("--out", required=True)
+    export_parser.add_argument("--limit", type=int, default=5000)
+
+    train_parser = subparsers.add_parser("train", help="Entrenar y guardar el modelo")
+    train_parser.add_argument("--data", action="append", default=[],
+                              help="JSONL etiquetado (se puede repetir)")
+    train_parser.add_argument("--out", default=settings.INTENT_MODEL_PATH)
+    train_parser.add_argument("--holdout", type=float, default=0.2)
+    train_parser.add_argument("--epochs", type=int, default=40)
+    train_parser.add_argument("--threshold", type=float, default=settings.INTENT_MODEL_THRESHOLD)
+    train_parser.add_argument("--min-support", type=int, default=settings.INTENT_MODEL_MIN_SUPPORT)
+    train_parser.add_argument("--seed", type=int, default=13)
+
+    eval_parser = subparsers.add_parser("evaluate", help="Evaluar un modelo guardado")
+    eval_parser.add_argument("--data", action="append", required=True)
+    eval_parser.add_argument("--model", default=settings.INTENT_MODEL_PATH)
+    eval_parser.add_argument("--threshold", type=float, default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        asyncio.run(export_history(args.out, args.limit))
+        return
+
+    if args.command == "evaluate":
+        model = IntentModel.load(args.model, args.threshold)
+        if model:
+            print_report(evaluate(model, load_samples(args.data)))
+        return
+
+    samples = deduplicate(seed_samples() + load_samples(args.data))
+    train, test = split_samples(samples, args.holdout, args.seed)
+    print(f"🚀 Entrenando con {len(train)} muestras, evaluando con {len(test)}")
+
+    try:
+        start = time.perf_counter()
+        model = IntentModel.train(train, epochs=args.epochs, threshold=args.threshold,
+                                  seed=args.seed, min_support=args.min_support)
+        print(f"⏱️ Entrenamiento: {time.perf_counter() - start:.2f} s")
+        if test:
+            # Las clases omitidas cuentan como errores: en producción van al LLM
+            print_report(evaluate(model, test))
+
+        # El modelo final se entrena con todas las muestras
+        model = IntentModel.train(samples, epochs=args.epochs, threshold=args.threshold,
+                                  seed=args.seed, min_support=args.min_support)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    model.save(args.out)
+    print(f"✅ Modelo guardado en {args.out} ({model.info['features']} features, "
+          f"{model.info['classes']} clases, {len(model.info['skipped_classes'])} omitidas "
+          f"por tener menos de {args.min_support} ejemplos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,58 @@ class Settings(BaseSettings):
     MODEL_NAME: str = Field(default="gpt-3.5-turbo")
     MODEL: str = Field(default_factory=lambda: os.getenv(
         "MODEL", "gpt-3.5-turbo"))
+    # URL base compatible con OpenAI (p. ej. benchmarks.mock_llm_server);
+    # vacía usa la API de OpenAI
+    OPENAI_BASE_URL: Optional[str] = Field(
+        default_factory=lambda: os.getenv("OPENAI_BASE_URL") or None)
+
+    # Clasificador local por reglas (antes del LLM)
+    RULE_CLASSIFIER_ENABLED: bool = Field(default_factory=lambda: os.getenv(
+        "RULE_CLASSIFIER_ENABLED", "True").lower() == "true")
+
+    # Modelo local de intenciones entrenado offline (segundo nivel)
+    INTENT_MODEL_ENABLED: bool = Field(default_factory=lambda: os.getenv(
+        "INTENT_MODEL_ENABLED", "True").lower() == "true")
+    INTENT_MODEL_PATH: str = Field(default_factory=lambda: os.getenv(
+        "INTENT_MODEL_PATH", "models/intent_model.npz"))
+    INTENT_MODEL_THRESHOLD: float = Field(default_factory=lambda: float(
+        os.getenv("INTENT_MODEL_THRESHOLD", "0.85")))
+    INTENT_MODEL_MIN_SUPPORT: int = Field(default_factory=lambda: int(
+        os.getenv("INTENT_MODEL_MIN_SUPPORT", "20")))
+
+    # Agrupación de llamadas concurrentes al LLM del clasificador
+    LLM_BATCH_ENABLED: bool = Field(default_factory=lambda: os.getenv(
+        "LLM_BATCH_ENABLED", "True").lower() == "true")
+    LLM_BATCH_WINDOW_MS: float = Field(default_factory=lambda: float(
+        os.getenv("LLM_BATCH_WINDOW_MS", "5")))
+    LLM_BATCH_MAX_SIZE: int = Field(default_factory=lambda: int(
+        os.getenv("LLM_BATCH_MAX_SIZE", "16")))
+    LLM_BATCH_MAX_CONCURRENCY: int = Field(default_factory=lambda: int(
+        os.getenv("LLM_BATCH_MAX_CONCURRENCY", "16")))
+
+    # Plazo, llamada de respaldo y circuit breaker del LLM del clasificador
+    LLM_TIMEOUT: float = Field(default_factory=lambda: float(
+        os.getenv("LLM_TIMEOUT", "8")))
+    LLM_HEDGE_DELAY: float = Field(default_factory=lambda: float(
+        os.getenv("LLM_HEDGE_DELAY", "2.5")))
+    LLM_BREAKER_FAILURES: int = Field(default_factory=lambda: int(
+        os.getenv("LLM_BREAKER_FAILURES", "5")))
+    LLM_BREAKER_RESET: float = Field(default_factory=lambda: float(
+        os.getenv("LLM_BREAKER_RESET", "30")))
+
+    # Caché de resultados de clasificación en Redis
+    INTENT_CACHE_ENABLED: bool = Field(default_factory=lambda: os.getenv(
+        "INTENT_CACHE_ENABLED", "True").lower() == "true")
+    INTENT_CACHE_TTL: int = Field(default_factory=lambda: int(
+        os.getenv("INTENT_CACHE_TTL", "86400")))
+    INTENT_CACHE_MAX_ENTRIES: int = Field(default_factory=lambda: int(
+        os.getenv("INTENT_CACHE_MAX_ENTRIES", "10000")))
+
+    # Caché de clasificadores de intenciones
+    CLASSIFIER_CACHE_SIZE: int = Field(default_factory=lambda: int(
+        os.getenv("CLASSIFIER_CACHE_SIZE", "128")))
+    CLASSIFIER_CACHE_TTL: float = Field(default_factory=lambda: float(
+        os.getenv("CLASSIFIER_CACHE_TTL", "3600")))
 
     # WhatsApp Business API
     WHATSAPP_PHONE_ID: str = Field(
@@ -25,6 +77,13 @@ class Settings(BaseSettings):
     VERIFY_TOKEN: str = Field(
         default_factory=lambda: os.getenv("VERIFY_TOKEN"))
 
+    # Token de los endpoints /metrics (Authorization: Bearer <token>); sin
+    # token los endpoints quedan deshabilitados
+    METRICS_TOKEN: Optional[str] = Field(
+        default_factory=lambda: os.getenv("METRICS_TOKEN") or None)
+    WHATSAPP_API_URL: str = Field(default_factory=lambda: os.getenv(
+        "WHATSAPP_API_URL", "https://graph.facebook.com/v22.0"))
+
     @property
     def URL_SERVIDOR(self) -> str:
         return os.getenv("URL_SERVIDOR", "")
@@ -41,6 +100,33 @@ class Settings(BaseSettings):
     REDIS_URL: str = Field(default_factory=lambda: os.getenv(
         "REDIS_URL", "redis://localhost:6379/0"))
 
+    # Pool de conexiones de Redis compartido por el proceso (timeouts en segundos)
+    REDIS_MAX_CONNECTIONS: int = Field(default_factory=lambda: int(
+        os.getenv("REDIS_MAX_CONNECTIONS", "50")))
+    REDIS_POOL_TIMEOUT: float = Field(default_factory=lambda: float(
+        os.getenv("REDIS_POOL_TIMEOUT", "5")))
+    REDIS_HEALTH_CHECK_INTERVAL: int = Field(default_factory=lambda: int(
+        os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")))
+    REDIS_SOCKET_TIMEOUT: float = Field(default_factory=lambda: float(
+        os.getenv("REDIS_SOCKET_TIMEOUT", "5")))
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = Field(default_factory=lambda: float(
+        os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", "5")))
+
+    # Caché local delante de Redis (TTL en segundos y máximo de claves por
+    # espacio; invalidación entre workers por pub/sub)
+    LOCAL_CACHE_ENABLED: bool = Field(default_factory=lambda: os.getenv(
+        "LOCAL_CACHE_ENABLED", "True").lower() == "true")
+    LOCAL_CACHE_USER_TTL: float = Field(default_factory=lambda: float(
+        os.getenv("LOCAL_CACHE_USER_TTL", "300")))
+    LOCAL_CACHE_USER_MAX_ENTRIES: int = Field(default_factory=lambda: int(
+        os.getenv("LOCAL_CACHE_USER_MAX_ENTRIES", "10000")))
+    LOCAL_CACHE_HA_CONFIG_TTL: float = Field(default_factory=lambda: float(
+        os.getenv("LOCAL_CACHE_HA_CONFIG_TTL", "300")))
+    LOCAL_CACHE_HA_CONFIG_MAX_ENTRIES: int = Field(default_factory=lambda: int(
+        os.getenv("LOCAL_CACHE_HA_CONFIG_MAX_ENTRIES", "1000")))
+    LOCAL_CACHE_INVALIDATION_CHANNEL: str = Field(default_factory=lambda: os.getenv(
+        "LOCAL_CACHE_INVALIDATION_CHANNEL", "taborra:cache:invalidate"))
+
     # Rasa (si lo necesitas)
     RASA_URL: Optional[str] = Field(
         default_factory=lambda: os.getenv("RASA_URL"))
@@ -60,6 +146,64 @@ class Settings(BaseSettings):
         default_factory=lambda: os.getenv("DB_PASS_WRITER", ""))
     DB_NAME: str = Field(
         default_factory=lambda: os.getenv("DB_NAME", "chatbot_db"))
+    DB_POOL_MIN_SIZE: int = Field(default_factory=lambda: int(
+        os.getenv("DB_POOL_MIN_SIZE", "1")))
+    DB_POOL_MAX_SIZE: int = Field(default_factory=lambda: int(
+        os.getenv("DB_POOL_MAX_SIZE", "10")))
+
+    # Clientes HTTP (WhatsApp / Home Assistant)
+    HTTP_TIMEOUT: float = Field(default_factory=lambda: float(
+        os.getenv("HTTP_TIMEOUT", "10")))
+    HTTP_MAX_CONNECTIONS: int = Field(default_factory=lambda: int(
+        os.getenv("HTTP_MAX_CONNECTIONS", "100")))
+
+    # Cola de ingestión de webhooks
+    QUEUE_MAX_SIZE: int = Field(default_factory=lambda: int(
+        os.getenv("QUEUE_MAX_SIZE", "1000")))
+    QUEUE_WORKERS: int = Field(default_factory=lambda: int(
+        os.getenv("QUEUE_WORKERS", "8")))
+    QUEUE_LATENCY_SAMPLES: int = Field(default_factory=lambda: int(
+        os.getenv("QUEUE_LATENCY_SAMPLES", "1000")))
+    QUEUE_DRAIN_TIMEOUT: float = Field(default_factory=lambda: float(
+        os.getenv("QUEUE_DRAIN_TIMEOUT", "10")))
+
+    # Estadísticas de callbacks de estado (sent/delivered/read)
+    STATUS_STATS_ENABLED: bool = Field(default_factory=lambda: os.getenv(
+        "STATUS_STATS_ENABLED", "False").lower() == "true")
+    STATUS_STATS_SIZE: int = Field(default_factory=lambda: int(
+        os.getenv("STATUS_STATS_SIZE", "4096")))
+
+    # Buzones por teléfono (orden por usuario, lease distribuido en Redis)
+    MAILBOX_IDLE_TIMEOUT: float = Field(default_factory=lambda: float(
+        os.getenv("MAILBOX_IDLE_TIMEOUT", "60")))
+    MAILBOX_LEASE_TTL_MS: int = Field(default_factory=lambda: int(
+        os.getenv("MAILBOX_LEASE_TTL_MS", "30000")))
+    MAILBOX_LEASE_WAIT: float = Field(default_factory=lambda: float(
+        os.getenv("MAILBOX_LEASE_WAIT", "35")))
+    MAILBOX_LEASE_POLL: float = Field(default_factory=lambda: float(
+        os.getenv("MAILBOX_LEASE_POLL", "0.05")))
+    MAILBOX_LEASE_RETRIES: int = Field(default_factory=lambda: int(
+        os.getenv("MAILBOX_LEASE_RETRIES", "6")))
+    MAILBOX_LEASE_BACKOFF_MAX: float = Field(default_factory=lambda: float(
+        os.getenv("MAILBOX_LEASE_BACKOFF_MAX", "2")))
+
+    # Ventana de mensajes de la conversación (historial que recibe el grafo)
+    MESSAGE_WINDOW_SIZE: int = Field(default_factory=lambda: int(
+        os.getenv("MESSAGE_WINDOW_SIZE", "10")))
+
+    # Estado de las conversaciones (checkpoints del grafo en Redis)
+    CHECKPOINT_TTL_SECONDS: int = Field(default_factory=lambda: int(
+        os.getenv("CHECKPOINT_TTL_SECONDS", "1800")))
+
+    # Información del negocio en memoria (segundos entre lecturas de Redis)
+    BUSINESS_INFO_REFRESH_SECONDS: float = Field(default_factory=lambda: float(
+        os.getenv("BUSINESS_INFO_REFRESH_SECONDS", "60")))
+
+    # Instrumentación de los nodos de los grafos
+    GRAPH_TRACING_ENABLED: bool = Field(default_factory=lambda: os.getenv(
+        "GRAPH_TRACING_ENABLED", "True").lower() == "true")
+    GRAPH_SLOW_NODE_MS: float = Field(default_factory=lambda: float(
+        os.getenv("GRAPH_SLOW_NODE_MS", "500")))
 
     # Application
     DEBUG: bool = Field(default_factory=lambda: os.getenv(
@@ -4,21 +4,35 @@ import traceback
 import json
 import uuid
 from src.tools.whatsapp import WhatsAppService
-from src.core.memory import RedisManager
+from src.core.memory import HA_CONFIG_CACHE, RedisManager
 from src.core.database import Database
 from src.tools.home_assistant import HomeAssistantTools
 from src.config import settings
 import time
+import aiohttp
 
 
 class HomeAssistantController:
-    def __init__(self):
+    def __init__(
+        self,
+        whatsapp_service: Optional[WhatsAppService] = None,
+        redis_manager: Optional[RedisManager] = None,
+        database: Optional[Database] = None,
+        http_session: Optional[aiohttp.ClientSession] = None
+    ):
         """
         Inicializa el controlador para procesamiento de respuestas de Home Assistant.
+
+        Args:
+            whatsapp_service: Servicio de WhatsApp (opcional)
+            redis_manager: Gestor de Redis (opcional)
+            database: Servicio de base de datos (opcional)
+            http_session: Sesión HTTP compartida para los webhooks (opcional)
         """
-        self.whatsapp_service = WhatsAppService()
-        self.redis_manager = RedisManager()
-        self.database = Database()
+        self.whatsapp_service = whatsapp_service or WhatsAppService()
+        self.redis_manager = redis_manager or RedisManager()
+        self.database = database or Database()
+        self.http_session = http_session
 
     async def initialize(self):
         """
@@ -37,7 +51,7 @@ class HomeAssistantController:
             Configuración de Home Assistant o diccionario vacío si no existe
         """
         # Buscar primero en caché
-        ha_config = await self.redis_manager.get_value(f"ha_config:{user_id}")
+        ha_config = await self.redis_manager.get_cached_value(HA_CONFIG_CACHE, f"ha_config:{user_id}")
 
         if not ha_config:
             # Si no está en caché, buscar en BD
@@ -45,7 +59,7 @@ class HomeAssistantController:
 
             if ha_config:
                 # Guardar en caché para futuras consultas
-                await self.redis_manager.set_value(f"ha_config:{user_id}", ha_config, 3600)
+                await self.redis_manager.set_cached_value(HA_CONFIG_CACHE, f"ha_config:{user_id}", ha_config, 3600)
 
         print(
             f"🔍 Configuración de Home Assistant para el usuario {user_id}: {ha_config}")
@@ -99,7 +113,8 @@ class HomeAssistantController:
         url = f"{ha_config["webhook_url"]}/api/webhook/activar_{method}"
         ha_tools = HomeAssistantTools(
             webhook_url=url,
-            token=ha_config["token"]
+            token=ha_config["token"],
+            session=self.http_session
         )
 
         # Añadir el token temporal y URL de callback a los parámetros
@@ -302,9 +317,3 @@ class HomeAssistantController:
 
         # Si no encontramos nada específico, devolver el primer método disponible
         return available_methods[0] if available_methods else None
-
-    async def close(self):
-        """
-        Cierra las conexiones utilizadas.
-        """
-        await self.database.close()
@@ -1,11 +1,22 @@
 # src/controllers/whatsapp_controller.py
-from typing import Dict, Any, Optional
-from src.chains.intent_classifier import IntentClassifier
-from src.graphs.main_graph import create_conversation_graph
+import asyncio
+from collections import deque
+from typing import Dict, Any, Iterable, Optional
+from src.chains.intent_classifier import IntentClassifier, IntentClassifierCache
+from src.chains.intent_cache import IntentResultCache
+from src.chains.intent_model import IntentModel
+from src.chains.intent_batcher import IntentBatcher
+from src.chains.llm_guard import LLMGuard
+from src.graphs.main_graph import CONVERSATION_INPUT_CHANNELS
+from src.graphs.registry import graph_registry
+from src.graphs.troubleshooting import TROUBLESHOOTING_INPUT_KEYS, is_structured_troubleshooting_input
 from src.tools.whatsapp import WhatsAppService
-from src.core.memory import RedisManager
+from src.core.memory import USER_CACHE, RedisManager
+from src.core.checkpointer import RedisCheckpointSaver
 from src.core.database import Database
-from src.utils.helpers import parse_whatsapp_payload
+from src.core.business_info import BusinessInfoStore
+from src.core.mailbox import PhoneMailboxes
+from src.utils.helpers import iter_whatsapp_messages
 from src.config.settings import settings
 from langchain_core.messages import HumanMessage, AIMessage
 from src.template.keyboard_types import KEYBOARD_TYPES, get_keyboard_image_url
@@ -19,7 +30,10 @@ class WhatsAppController:
         intent_classifier: Optional[IntentClassifier] = None,
         whatsapp_service: Optional[WhatsAppService] = None,
         redis_manager: Optional[RedisManager] = None,
-        database: Optional[Database] = None
+        database: Optional[Database] = None,
+        home_assistant_controller: Optional[HomeAssistantController] = None,
+        intent_model: Optional[IntentModel] = None,
+        checkpointer: Optional[RedisCheckpointSaver] = None
     ):
         """
         Inicializa el controlador de WhatsApp con servicios inyectables.
@@ -29,22 +43,49 @@ class WhatsAppController:
             whatsapp_service: Servicio de WhatsApp (opcional)
             redis_manager: Gestor de Redis (opcional)
             database: Servicio de base de datos (opcional)
+            home_assistant_controller: Controlador de Home Assistant (opcional)
+            intent_model: Modelo local de intenciones cargado al inicio (opcional)
+            checkpointer: Checkpointer del estado de las conversaciones (opcional)
         """
-        self.intent_classifier = intent_classifier or IntentClassifier(
-            api_key=settings.OPENAI_API_KEY
-        )
         self.whatsapp_service = whatsapp_service or WhatsAppService()
         self.redis_manager = redis_manager or RedisManager()
         self.database = database or Database()
+        self.intent_classifier = intent_classifier or IntentClassifier(
+            api_key=settings.OPENAI_API_KEY
+        )
+        # Clasificadores por conjunto de métodos de HA, con el modelo compartido
+        # una caché de resultados en Redis (que registra las etiquetas del LLM
+        # en MySQL), el modelo local, un agrupador de llamadas concurrentes al
+        # LLM y su protección de latencia
+        self.classifier_cache = IntentClassifierCache(
+            llm=self.intent_classifier.llm,
+            result_cache=IntentResultCache(self.redis_manager, database=self.database),
+            intent_model=intent_model,
+            batcher=IntentBatcher(),
+            guard=LLMGuard()
+        )
+        self.classifier_cache.put(self.intent_classifier)
+        self.business_info = BusinessInfoStore(self.redis_manager, self.database)
+        self.home_assistant_controller = home_assistant_controller or HomeAssistantController(
+            whatsapp_service=self.whatsapp_service,
+            redis_manager=self.redis_manager,
+            database=self.database
+        )
 
-        # Crear grafo de conversación
-        self.conversation_graph = create_conversation_graph()
+        # Buzones por teléfono: orden por usuario, paralelismo entre usuarios
+        self.mailboxes = PhoneMailboxes(
+            self.process_message, self.redis_manager)
 
-    async def initialize(self):
-        """
-        Inicializa servicios necesarios.
-        """
-        await self.database.connect()
+        # Métricas
+        self.classifications = 0
+        self.classifications_skipped = 0
+
+        # Grafo de conversación compilado una única vez y compartido, con el
+        # estado de cada hilo (teléfono:chat) guardado en Redis
+        self.checkpointer = checkpointer or RedisCheckpointSaver(
+            self.redis_manager, transient_channels=CONVERSATION_INPUT_CHANNELS)
+        graph_registry.set_checkpointer("conversation", self.checkpointer)
+        self.conversation_graph = graph_registry.get("conversation")
 
     async def validate_webhook(self, params: Dict[str, str]) -> bool:
         """
@@ -66,70 +107,117 @@ class WhatsAppController:
             challenge is not None
         )
 
-    async def process_message(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_webhook(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Procesa un mensaje de WhatsApp entrante.
+        Procesa todos los mensajes de una entrega del webhook de WhatsApp.
+        Cada mensaje pasa por el buzón de su teléfono: los de un mismo
+        teléfono se procesan en orden y los de teléfonos distintos en paralelo.
 
         Args:
-            payload: Datos del mensaje de WhatsApp
+            payload: Payload completo del webhook
 
         Returns:
-            Diccionario con el estado del procesamiento
+            Diccionario con el estado del procesamiento de cada mensaje
         """
-        # Parsear payload
-        parsed_data = parse_whatsapp_payload(payload)
+        futures = [
+            self.mailboxes.submit(parsed_data["phone"], parsed_data)
+            for parsed_data in iter_whatsapp_messages(payload)
+            if parsed_data["success"]
+        ]
 
-        if not parsed_data["success"]:
+        if not futures:
             return {"status": "Error al parsear payload"}
 
+        results = []
+        for result in await asyncio.gather(*futures, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"❌ Error al procesar mensaje: {result}")
+                result = {"status": f"Error: {result}"}
+            results.append(result)
+        return {"status": "Entrega procesada", "results": results}
+
+    async def process_message(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Procesa un mensaje de WhatsApp entrante.
+
+        Args:
+            parsed_data: Mensaje ya parseado (ver iter_whatsapp_messages)
+
+        Returns:
+            Diccionario con el estado del procesamiento
+        """
         # Extraer información
         message_id = parsed_data["message_id"]
         text_body = parsed_data["text"]
         phone_user = parsed_data["phone"]
         user_name = parsed_data["name"]
 
-        # Verificar mensaje duplicado
-        if await self.redis_manager.exists(f"message:{message_id}"):
+        # Lecturas del inicio del turno en una sola ida y vuelta: marca del
+        # mensaje (SET NX, atómica contra duplicados), datos del usuario, chat
+        # actual e historial (del más reciente al más antiguo)
+        is_new, cached_user, chat_id, history = await (
+            self.redis_manager.batch()
+            .claim_message_id(message_id)
+            .get_cached_value(USER_CACHE, phone_user)
+            .get_chat_id(phone_user)
+            .get_message_history(f"chat:{phone_user}", settings.MESSAGE_WINDOW_SIZE)
+            .execute()
+        )
+
+        # Verificar mensaje duplicado (si Redis falló se procesa igual)
+        if is_new is False:
             return {"status": "Mensaje duplicado ignorado"}
-        await self.redis_manager.set_value(f"message:{message_id}", "1", 86400)
 
         # Obtener datos del usuario
-        user_data = await self._get_or_create_user(phone_user, user_name)
-
-        ha_methods = {}
-        if user_data.get("level", 1) >= 3:
-            try:
-                # Obtener configuración de HA de la BD
-                ha_methods = await self.database.get_home_assistant_methods(user_data["id"])
-            except Exception as e:
-                print(f"❌ Error al cargar métodos de Home Assistant: {e}")
-
-        intent_classifier = IntentClassifier(
-            api_key=settings.OPENAI_API_KEY,
-            ha_methods=ha_methods
-        )
+        user_data = await self._get_or_create_user(phone_user, user_name, cached_user)
+
+        # Los servicios compartidos viajan en config["configurable"] junto con
+        # el hilo del checkpoint de la conversación
+        if not chat_id:
+            chat_id = await self.redis_manager.get_or_create_chat_id(phone_user)
+        graph_config = {
+            "configurable": {
+                "thread_id": f"{phone_user}:{chat_id}",
+                "database": self.database,
+                "redis_manager": self.redis_manager,
+                "home_assistant_controller": self.home_assistant_controller,
+                "whatsapp_service": self.whatsapp_service,
+                "chat_id": chat_id
+            }
+        }
 
-        # Clasificar intenciones
-        intents = await intent_classifier.predict(text_body)
+        # Cargar primero el estado de troubleshooting del último checkpoint
+        # (el grafo reutiliza esta lectura): si el mensaje es la respuesta
+        # esperada por el paso actual no hace falta clasificarlo
+        checkpoint_tuple = await self.checkpointer.prefetch(graph_config)
+        saved_state = checkpoint_tuple.checkpoint["channel_values"] if checkpoint_tuple else {}
+        troubleshooting_state = saved_state.get("troubleshooting_state") if saved_state.get(
+            "troubleshooting_active") else None
+        legacy_state = None
+        if not checkpoint_tuple:
+            legacy_state = troubleshooting_state = await self._load_legacy_troubleshooting_state(user_data, chat_id)
+
+        if troubleshooting_state and is_structured_troubleshooting_input(troubleshooting_state, text_body):
+            intents = []
+            self.classifications_skipped += 1
+            print("⏭️ Respuesta de troubleshooting, se omite la clasificación")
+        else:
+            intents = await self._classify(user_data, text_body)
         print(f"🧠 Intenciones detectadas: {intents}")
 
-        # Obtener historial de mensajes
-        chat_id = await self.redis_manager.get_or_create_chat_id(phone_user)
-        history = await self.redis_manager.get_message_history(f"chat:{phone_user}")
-
-        # Crear lista de mensajes para LangChain
-        messages_history = self._convert_history_to_messages(history)
+        # Ventana acotada en orden cronológico: al agregar el mensaje nuevo y
+        # la respuesta se descartan los más antiguos (mínimo 2 para conservar
+        # el par mensaje/respuesta que se persiste)
+        messages_history = deque(
+            self._convert_history_to_messages(reversed(history)),
+            maxlen=max(2, settings.MESSAGE_WINDOW_SIZE))
         messages_history.append(HumanMessage(content=text_body))
 
-        # Obtener información del negocio
-        business_info = await self.redis_manager.get_value("info_business")
-        print(business_info)
-        # Si no está en Redis, cargar de la base de datos y guardar en Redis
-        if not business_info:
-            business_info = await self.database.load_business_info()
-            await self.redis_manager.set_value("info_business", business_info, 86400)
+        # Obtener información del negocio (en memoria; se relee de Redis periódicamente)
+        business_info = await self.business_info.get()
 
-        # Preparar estado para el grafo
+        # Preparar la entrada del grafo: solo los canales del turno; el estado
+        # de los flujos (troubleshooting) sale del checkpoint del hilo
         state = {
             "messages": messages_history,
             "user_data": user_data,
@@ -137,38 +225,71 @@ class WhatsAppController:
             "intents": intents,
             "context": f"Chat con {user_data.get('first_name', 'Usuario')}",
             "business_info": business_info,
-            "troubleshooting_active": False,
-            "troubleshooting_state": None
+            "response_sent": False
         }
-
-        # Verifica si hay un estado de troubleshooting activo
-        # Verifica si hay un estado de troubleshooting activo
-        troubleshooting_state = await self.redis_manager.get_value(f"taborra:user:{user_data.get('id')}:chat:{chat_id}:state")
-        if troubleshooting_state:
-            # Recuperar el estado y convertir los mensajes
-            troubleshooting_state = self._recover_state_from_storage(
-                troubleshooting_state)
+        if legacy_state:
             state["troubleshooting_active"] = True
-            state["troubleshooting_state"] = troubleshooting_state
-
-        # Procesar con el grafo de conversación
-        result = self.conversation_graph.invoke(state)
+            state["troubleshooting_state"] = legacy_state
+
+        # Procesar con el grafo de conversación (sin bloquear el event loop);
+        # se guarda un único checkpoint al final, con los canales que cambiaron
+        result = await self.conversation_graph.ainvoke(
+            state, config=graph_config, checkpoint_during=False)
+        if legacy_state:
+            # El flujo ya quedó en el checkpoint del hilo
+            await self.redis_manager.delete_key(self._legacy_state_key(user_data, chat_id))
         # Extraer y enviar respuesta
         return await self._process_graph_result(result, user_data, chat_id)
 
-    async def _get_or_create_user(self, phone: str, name: str) -> Dict[str, Any]:
+    async def _classify(self, user_data: Dict[str, Any], text: str) -> list:
+        """
+        Clasifica las intenciones de un mensaje con el clasificador del usuario.
+
+        Args:
+            user_data: Datos del usuario
+            text: Texto del mensaje
+
+        Returns:
+            Lista de intenciones detectadas
+        """
+        ha_methods = {}
+        if user_data.get("level", 1) >= 3:
+            try:
+                # Obtener configuración de HA de la BD
+                ha_methods = await self.database.get_home_assistant_methods(user_data["id"])
+            except Exception as e:
+                print(f"❌ Error al cargar métodos de Home Assistant: {e}")
+
+        intent_classifier = self.classifier_cache.get(ha_methods)
+        self.classifications += 1
+        return await intent_classifier.predict(text)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas del controlador."""
+        return {
+            "classifications": self.classifications,
+            "classifications_skipped": self.classifications_skipped
+        }
+
+    async def _get_or_create_user(
+        self,
+        phone: str,
+        name: str,
+        cached_user: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Obtiene o crea un usuario.
 
         Args:
             phone: Número de teléfono
             name: Nombre del usuario
+            cached_user: Datos ya leídos de la caché o de Redis (opcional; si no se indican se leen)
 
         Returns:
             Datos del usuario
         """
         # Intentar obtener de Redis
-        user_data = await self.redis_manager.get_value(phone)
+        user_data = cached_user or await self.redis_manager.get_cached_value(USER_CACHE, phone)
 
         if not user_data:
             # Buscar en base de datos
@@ -190,11 +311,11 @@ class WhatsAppController:
                 }
 
             # Guardar en Redis
-            await self.redis_manager.set_value(phone, user_data)
+            await self.redis_manager.set_cached_value(USER_CACHE, phone, user_data)
 
         return user_data
 
-    def _convert_history_to_messages(self, history: list) -> list:
+    def _convert_history_to_messages(self, history: Iterable[Dict[str, Any]]) -> list:
         """
         Convierte el historial de mensajes al formato de LangChain.
 
@@ -214,18 +335,28 @@ class WhatsAppController:
                     AIMessage(content=msg.get("content", "")))
         return messages_history
 
-    def _convert_stored_state_to_messages(self, state):
-        """Convierte mensajes almacenados de vuelta a objetos Message"""
-        if "messages" in state:
-            messages = []
-            for msg in state["messages"]:
-                if msg.get("role") == "user":
-                    messages.append(HumanMessage(
-                        content=msg.get("content", "")))
-                elif msg.get("role") == "assistant":
-                    messages.append(AIMessage(content=msg.get("content", "")))
-            state["messages"] = messages
-        return state
+    async def _load_legacy_troubleshooting_state(self, user_data: Dict[str, Any], chat_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lee el estado de troubleshooting guardado con la clave anterior al
+        checkpointer, para que los flujos en curso al actualizar no se
+        pierdan. Solo se consulta cuando el hilo todavía no tiene checkpoint.
+
+        Args:
+            user_data: Datos del usuario
+            chat_id: ID del chat
+
+        Returns:
+            Estado propio del flujo (sin mensajes ni datos del turno) o None
+        """
+        stored = await self.redis_manager.get_value(self._legacy_state_key(user_data, chat_id))
+        if not isinstance(stored, dict):
+            return None
+        print("♻️ Estado de troubleshooting recuperado de la clave anterior")
+        return {key: value for key, value in stored.items() if key not in TROUBLESHOOTING_INPUT_KEYS}
+
+    @staticmethod
+    def _legacy_state_key(user_data: Dict[str, Any], chat_id: str) -> str:
+        return f"taborra:user:{user_data.get('id')}:chat:{chat_id}:state"
 
     async def _process_graph_result(self, result: Dict[str, Any], user_data: Dict[str, Any], chat_id: str) -> Dict[str, Any]:
         """
@@ -240,11 +371,6 @@ class WhatsAppController:
             Diccionario con estado del procesamiento
         """
         final_messages = result.get("messages", [])
-        rating_info = result.get("rating_info", None)
-
-        # Verificar si es necesario procesar una solicitud de Home Assistant
-        requires_ha = result.get("requires_home_assistant", False)
-        ha_request = result.get("ha_request", {})
 
         if not final_messages or not isinstance(final_messages[-1], AIMessage):
             return {"status": "No se generó respuesta"}
@@ -278,18 +404,18 @@ class WhatsAppController:
                         response_message.content
                     )
 
-        # Guardar en historial de mensajes (Redis - temporal)
-        await self.redis_manager.add_message_to_history(
-            f"chat:{user_data.get('phone')}",
-            "user",
-            final_messages[-2].content if len(final_messages) >= 2 else ""
-        )
-        await self.redis_manager.add_message_to_history(
+        # Guardar en historial de mensajes (Redis - temporal): mensaje y
+        # respuesta en una sola transacción
+        await self.redis_manager.add_messages_to_history(
             f"chat:{user_data.get('phone')}",
-            "assistant",
-            response_message.content
+            [("user", final_messages[-2].content if len(final_messages) >= 2 else ""),
+             ("assistant", response_message.content)]
         )
 
+        # El nodo ya envió la respuesta (aviso de Home Assistant)
+        if result.get("response_sent"):
+            return {"status": "Mensaje procesado y respuesta enviada"}
+
         # Detectar si estamos en el paso de selección de teclado
         is_keyboard_selection = False
         if result.get("troubleshooting_active") and result.get("troubleshooting_state"):
@@ -314,112 +440,4 @@ class WhatsAppController:
             # Envío normal de texto
             await self.whatsapp_service.split_and_send_message(user_data.get("phone"), response_message.content)
 
-        # Si se requiere Home Assistant, llamar al webhook
-        if requires_ha and ha_request:
-            try:
-                # Inicializar controlador
-                ha_controller = HomeAssistantController()
-                await ha_controller.initialize()
-
-                # Procesar solicitud
-                user_id = ha_request.get("user_id")
-                phone = ha_request.get("phone")
-                intents = ha_request.get("intents", [])
-
-                # Ver si las intenciones que tiene estan en la lista de Home Assistant
-
-                for intent in intents:
-                    # Enviar mensaje a Home Assistant
-                    response = await ha_controller.trigger_home_assistant(user_id, phone, intent)
-
-                    if response.get("success"):
-                        success_msg = f"✅ Método {intent} ejecutado correctamente en Home Assistant."
-                        print(success_msg)
-                        return {"status": success_msg}
-                    elif not response.get("success"):
-                        error_msg = f"⚠️ No tienes implementado el metodo {intent} en Home Assistant. Por Favor, comunicate con nuestro servicio técnico si quieres mas infomación."
-                        print(f"❌ Error: {response.get('message')}")
-                        await self.whatsapp_service.send_message(phone, response.get('message'))
-
-            except Exception as e:
-                print(f"❌ Error al procesar solicitud de Home Assistant: {e}")
-                error_msg = "⚠️ Ocurrió un error al procesar tu solicitud a Home Assistant. Por favor, intenta más tarde."
-                raise ValueError(error_msg)
-
-        # Verificar si hay una calificación para guardar
-        if rating_info and rating_info.get("rating") is not None:
-            rating = rating_info.get("rating")
-            keyboard_type = rating_info.get("keyboard_type", "desconocido")
-            problem_type = rating_info.get("problem_type", "desconocido")
-
-            if user_data and "id" in user_data:
-                user_id = user_data.get('id')
-
-                # Guardar en base de datos
-                try:
-                    await self.database.save_rating(
-                        user_id=user_id,
-                        rating=rating,
-                        keyboard_type=keyboard_type,
-                        problem_type=problem_type
-                    )
-                    print(
-                        f"✅ Calificación {rating} guardada para usuario {user_id}, problema {problem_type}, teclado {keyboard_type}")
-                except Exception as e:
-                    print(f"❌ Error al guardar calificación: {e}")
-            else:
-                print(
-                    f"⚠️ No se pudo encontrar el ID del usuario para el teléfono {user_data.get("phone")}")
-
-        # Al guardar el estado de troubleshooting, convertirlo a formato serializable
-        if result.get("troubleshooting_active", False) and result.get("troubleshooting_state"):
-            # Convertir los mensajes a formato serializable
-            serializable_state = self._prepare_state_for_storage(
-                result["troubleshooting_state"])
-            await self.redis_manager.set_value(
-                f"taborra:user:{user_data.get('id')}:chat:{chat_id}:state",
-                serializable_state,
-                1800  # 30 minutos
-            )
-        else:
-            # Si estaba activo pero ya no, eliminarlo
-            await self.redis_manager.delete_key(f"taborra:user:{user_data.get('id')}:chat:{chat_id}:state")
-            return {"status": "Mensaje procesado y respuesta enviada"}
-
-    def _prepare_state_for_storage(self, state):
-        """Prepara el estado para almacenamiento en Redis convirtiendo objetos no serializables"""
-        serializable_state = {}
-
-        for key, value in state.items():
-            if key == "messages":
-                # Convertir mensajes a formato serializable
-                serializable_state[key] = []
-                for msg in value:
-                    if isinstance(msg, HumanMessage):
-                        serializable_state[key].append({
-                            "role": "user",
-                            "content": msg.content
-                        })
-                    elif isinstance(msg, AIMessage):
-                        serializable_state[key].append({
-                            "role": "assistant",
-                            "content": msg.content
-                        })
-            else:
-                # Copiar otros valores como están
-                serializable_state[key] = value
-
-        return serializable_state
-
-    def _recover_state_from_storage(self, state):
-        """Recupera el estado de almacenamiento convirtiendo a objetos LangChain"""
-        if "messages" in state and isinstance(state["messages"], list):
-            state["messages"] = self._convert_history_to_messages(
-                state["messages"])
-        return state
-
-    async def close(self):
-        """
-        Cierra los servicios utilizados.
-        """
-        await self.database.close()
+        return {"status": "Mensaje procesado y respuesta enviada"}
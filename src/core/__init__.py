@@ -1,5 +1,6 @@
 # src/core/__init__.py
 from .database import Database
-from .memory import RedisManager
+from .local_cache import LocalCache
+from .memory import RedisBatch, RedisManager
 
-__all__ = ["Database", "RedisManager"]
+__all__ = ["Database", "LocalCache", "RedisBatch", "RedisManager"]
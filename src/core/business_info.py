@@ -0,0 +1,67 @@
+# src/core/business_info.py
+"""
+Información del negocio en memoria.
+
+Antes cada mensaje leía "info_business" de Redis. El almacén la lee a través
+de la caché local de RedisManager (espacio BUSINESS_CACHE, con TTL
+BUSINESS_INFO_REFRESH_SECONDS e invalidada por pub/sub cuando se vuelve a
+guardar) y, si no está en Redis, la carga de MySQL. Mientras no cambie se
+devuelve el mismo objeto, así el paquete de respuestas precompiladas no se
+vuelve a armar.
+"""
+from typing import Any, Dict
+from src.core.database import Database
+from src.core.memory import BUSINESS_CACHE, RedisManager
+
+BUSINESS_INFO_KEY = "info_business"
+
+
+class BusinessInfoStore:
+    def __init__(self, redis_manager: RedisManager, database: Database):
+        """
+        Inicializa el almacén.
+
+        Args:
+            redis_manager: Gestor de Redis
+            database: Servicio de base de datos
+        """
+        self.redis_manager = redis_manager
+        self.database = database
+
+        # Métricas
+        self.requests = 0
+        self.database_loads = 0
+
+    async def get(self) -> Dict[str, Any]:
+        """
+        Devuelve la información del negocio (caché local, Redis o MySQL).
+
+        Returns:
+            Información del negocio
+        """
+        self.requests += 1
+        business_info = await self.redis_manager.get_cached_value(BUSINESS_CACHE, BUSINESS_INFO_KEY)
+        # Si no está en Redis, cargar de la base de datos y guardar en Redis
+        if not business_info:
+            business_info = await self.database.load_business_info()
+            self.database_loads += 1
+            await self.set(business_info, 86400)
+        return business_info
+
+    async def set(self, business_info: Dict[str, Any], expiry: int = 3600) -> None:
+        """
+        Guarda la información del negocio en Redis y en memoria, y avisa a
+        los demás workers.
+
+        Args:
+            business_info: Información del negocio
+            expiry: Tiempo de expiración en segundos
+        """
+        await self.redis_manager.set_cached_value(BUSINESS_CACHE, BUSINESS_INFO_KEY, business_info, expiry)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Consultas y cargas desde la base de datos."""
+        return {
+            "requests": self.requests,
+            "database_loads": self.database_loads
+        }
@@ -0,0 +1,380 @@
+# src/core/checkpointer.py
+"""
+Checkpointer de LangGraph sobre Redis.
+
+Guarda el último checkpoint de cada hilo (thread_id, en la app
+"teléfono:chat_id") en un hash de Redis con el documento del checkpoint, su
+metadata y un campo por canal. Cada checkpoint escribe solo los canales cuya
+versión cambió desde el anterior (el delta) y nunca los canales transitorios,
+que cada invocación vuelve a recibir en la entrada (mensajes, datos del
+usuario y del negocio). Los valores simples se guardan como JSON compacto.
+Todas las claves del hilo expiran y cada escritura renueva la expiración, así
+que los hilos inactivos se eliminan solos.
+
+Solo implementa la API asíncrona: los grafos se ejecutan con `ainvoke`.
+"""
+import base64
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_serializable_checkpoint_metadata,
+)
+from src.config.settings import settings
+from src.core.memory import RedisManager
+
+# Clave de config["configurable"] con el checkpoint que el llamador ya leyó
+# (ver prefetch); la lectura del grafo al empezar lo usa en lugar de ir a Redis
+PREFETCHED_CHECKPOINT_KEY = "prefetched_checkpoint"
+
+# Tipo de los valores guardados como JSON (ver _dumps)
+PLAIN_TYPE = "plain"
+
+
+def _is_plain(value: Any) -> bool:
+    """Indica si un valor vuelve igual de JSON (sin tuplas ni claves que no sean texto)."""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return True
+    if isinstance(value, list):
+        return all(_is_plain(item) for item in value)
+    if isinstance(value, dict):
+        return all(isinstance(key, str) and _is_plain(item) for key, item in value.items())
+    return False
+
+
+class RedisCheckpointSaver(BaseCheckpointSaver):
+    def __init__(
+        self,
+        redis_manager: Optional[RedisManager] = None,
+        ttl: Optional[int] = None,
+        transient_channels: Iterable[str] = (),
+        key_prefix: str = "taborra:checkpoint"
+    ):
+        """
+        Inicializa el checkpointer.
+
+        Args:
+            redis_manager: Gestor de Redis compartido (opcional)
+            ttl: Expiración de los hilos inactivos en segundos (opcional, desde settings)
+            transient_channels: Canales que no se guardan porque la entrada
+                de cada invocación los vuelve a cargar
+            key_prefix: Prefijo de las claves en Redis
+        """
+        super().__init__()
+        self.redis_manager = redis_manager or RedisManager()
+        self.ttl = ttl or settings.CHECKPOINT_TTL_SECONDS
+        self.transient_channels = frozenset(transient_channels)
+        self.key_prefix = key_prefix
+
+        # Métricas
+        self.reads = 0
+        self.prefetch_hits = 0
+        self.checkpoints_written = 0
+        self.channels_written = 0
+        self.bytes_written = 0
+        self.errors = 0
+
+    def _state_key(self, thread_id: str, checkpoint_ns: str) -> str:
+        return f"{self.key_prefix}:{thread_id}:{checkpoint_ns}:state"
+
+    def _writes_key(self, thread_id: str, checkpoint_ns: str) -> str:
+        return f"{self.key_prefix}:{thread_id}:{checkpoint_ns}:writes"
+
+    def _namespaces_key(self, thread_id: str) -> str:
+        return f"{self.key_prefix}:{thread_id}:namespaces"
+
+    def _dumps(self, value: Any) -> str:
+        """
+        Serializa un valor como texto para Redis: los valores simples (el
+        documento del checkpoint, su metadata y el estado de los flujos) como
+        JSON compacto; el resto con el serializador de LangGraph en base64.
+        """
+        if _is_plain(value):
+            return f"{PLAIN_TYPE}|{json.dumps(value, ensure_ascii=False, separators=(',', ':'))}"
+        type_, data = self.serde.dumps_typed(value)
+        return f"{type_}|{base64.b64encode(data).decode('ascii')}"
+
+    def _loads(self, value: str) -> Any:
+        """Deserializa un valor guardado con _dumps."""
+        type_, data = value.split("|", 1)
+        if type_ == PLAIN_TYPE:
+            return json.loads(data)
+        return self.serde.loads_typed((type_, base64.b64decode(data)))
+
+    async def prefetch(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Lee el último checkpoint de un hilo antes de invocar el grafo (por
+        ejemplo, para decidir si hace falta clasificar el mensaje) y lo deja
+        en config["configurable"], de modo que el grafo invocado con ese
+        config no vuelve a leerlo de Redis.
+
+        Args:
+            config: Configuración de la invocación con thread_id
+
+        Returns:
+            Último checkpoint del hilo o None si no hay
+        """
+        config["configurable"].pop(PREFETCHED_CHECKPOINT_KEY, None)
+        checkpoint_tuple = await self.aget_tuple(config)
+        config["configurable"][PREFETCHED_CHECKPOINT_KEY] = checkpoint_tuple
+        return checkpoint_tuple
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Obtiene el último checkpoint de un hilo (o el indicado por
+        checkpoint_id, si sigue siendo el último).
+
+        Args:
+            config: Configuración con thread_id, checkpoint_ns y checkpoint_id opcional
+
+        Returns:
+            Checkpoint con sus valores y escrituras pendientes, o None
+        """
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        if PREFETCHED_CHECKPOINT_KEY in configurable and not checkpoint_id and not checkpoint_ns:
+            self.prefetch_hits += 1
+            return configurable[PREFETCHED_CHECKPOINT_KEY]
+
+        try:
+            async with self.redis_manager.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hgetall(self._state_key(thread_id, checkpoint_ns))
+                pipe.hgetall(self._writes_key(thread_id, checkpoint_ns))
+                stored, writes = await pipe.execute()
+            self.reads += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Error al leer checkpoint de Redis: {e}")
+            return None
+
+        if not stored or (checkpoint_id and stored.get("id") != checkpoint_id):
+            return None
+        return self._load_tuple(thread_id, checkpoint_ns, stored, writes)
+
+    def _load_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        stored: Dict[str, str],
+        writes: Dict[str, str]
+    ) -> CheckpointTuple:
+        """Arma el CheckpointTuple a partir del hash del hilo y sus escrituras."""
+        checkpoint_id = stored["id"]
+        checkpoint = self._loads(stored["checkpoint"])
+
+        # Solo se cargan los canales guardados con la versión del checkpoint;
+        # los transitorios los completa la entrada de la invocación
+        channel_values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = stored.get(f"channel:{channel}")
+            if blob:
+                stored_version, value = blob.split("|", 1)
+                if stored_version == str(version):
+                    channel_values[channel] = self._loads(value)
+        checkpoint["channel_values"] = channel_values
+
+        pending_writes = []
+        for field, value in writes.items():
+            write_checkpoint_id, _, _ = field.split("|", 2)
+            if write_checkpoint_id == checkpoint_id:
+                task_id, channel, data, _ = json.loads(value)
+                pending_writes.append((task_id, channel, self._loads(data)))
+
+        parent_id = stored.get("parent")
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint=checkpoint,
+            metadata=self._loads(stored["metadata"]),
+            parent_config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                            "checkpoint_id": parent_id}} if parent_id else None,
+            pending_writes=pending_writes
+        )
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        """
+        Lista los checkpoints de un hilo. Como solo se conserva el último,
+        devuelve a lo sumo uno.
+        """
+        if not config or limit == 0:
+            return
+        checkpoint_tuple = await self.aget_tuple(config)
+        if not checkpoint_tuple:
+            return
+        if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+            return
+        before_id = get_checkpoint_id(before) if before else None
+        if before_id and checkpoint_tuple.checkpoint["id"] >= before_id:
+            return
+        yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        """
+        Guarda un checkpoint reemplazando el anterior del hilo: el documento,
+        la metadata y solo los canales con versión nueva (salvo los
+        transitorios), en una única transacción.
+
+        Args:
+            config: Configuración del checkpoint padre
+            checkpoint: Checkpoint a guardar
+            metadata: Metadata del checkpoint
+            new_versions: Canales con versión nueva desde el checkpoint anterior
+
+        Returns:
+            Configuración que apunta al checkpoint guardado
+        """
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        next_config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                        "checkpoint_id": checkpoint["id"]}}
+
+        document = checkpoint.copy()
+        values = document.pop("channel_values")
+        # Del registro de versiones de LangGraph solo se guardan las de los
+        # canales con valor guardado: los demás (transitorios, los que
+        # disparan cada nodo) no tienen valor al terminar la invocación, así
+        # que su versión no dispara nada; la próxima escritura les asigna una
+        # nueva
+        kept = {channel for channel in values if channel not in self.transient_channels}
+        document["channel_versions"] = {channel: version
+                                        for channel, version in checkpoint["channel_versions"].items()
+                                        if channel in kept}
+        versions_seen = {}
+        for node, seen in checkpoint["versions_seen"].items():
+            seen = {channel: version for channel, version in seen.items() if channel in kept}
+            if seen:
+                versions_seen[node] = seen
+        document["versions_seen"] = versions_seen
+        fields = {
+            "id": checkpoint["id"],
+            "parent": configurable.get("checkpoint_id") or "",
+            "checkpoint": self._dumps(document),
+            "metadata": self._dumps(get_serializable_checkpoint_metadata(config, metadata))
+        }
+        emptied = []
+        for channel, version in new_versions.items():
+            if channel in self.transient_channels:
+                continue
+            if channel in values:
+                fields[f"channel:{channel}"] = f"{version}|{self._dumps(values[channel])}"
+            else:
+                emptied.append(f"channel:{channel}")
+
+        state_key = self._state_key(thread_id, checkpoint_ns)
+        namespaces_key = self._namespaces_key(thread_id)
+        try:
+            async with self.redis_manager.redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(state_key, mapping=fields)
+                if emptied:
+                    pipe.hdel(state_key, *emptied)
+                # Las escrituras pendientes eran del checkpoint anterior
+                pipe.delete(self._writes_key(thread_id, checkpoint_ns))
+                pipe.expire(state_key, self.ttl)
+                # Solo los subgrafos usan namespaces; el del grafo principal es ""
+                if checkpoint_ns:
+                    pipe.sadd(namespaces_key, checkpoint_ns)
+                    pipe.expire(namespaces_key, self.ttl)
+                await pipe.execute()
+            self.checkpoints_written += 1
+            self.channels_written += len(fields) - 4
+            self.bytes_written += sum(len(value) for value in fields.values())
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Error al guardar checkpoint en Redis: {e}")
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        """
+        Guarda las escrituras pendientes de una tarea sobre el checkpoint
+        actual (salvo las de canales transitorios).
+
+        Args:
+            config: Configuración del checkpoint
+            writes: Escrituras (canal, valor) de la tarea
+            task_id: Identificador de la tarea
+            task_path: Ruta de la tarea
+        """
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = configurable["checkpoint_id"]
+
+        fields = {
+            f"{checkpoint_id}|{task_id}|{WRITES_IDX_MAP.get(channel, idx)}": json.dumps(
+                [task_id, channel, self._dumps(value), task_path])
+            for idx, (channel, value) in enumerate(writes)
+            if channel not in self.transient_channels
+        }
+        if not fields:
+            return
+
+        writes_key = self._writes_key(thread_id, checkpoint_ns)
+        try:
+            async with self.redis_manager.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hset(writes_key, mapping=fields)
+                pipe.expire(writes_key, self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Error al guardar escrituras pendientes en Redis: {e}")
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """
+        Elimina los checkpoints y escrituras de un hilo en todos sus namespaces.
+
+        Args:
+            thread_id: Hilo a eliminar
+        """
+        namespaces_key = self._namespaces_key(thread_id)
+        try:
+            namespaces = await self.redis_manager.redis_client.smembers(namespaces_key)
+            keys = [namespaces_key]
+            for checkpoint_ns in {"", *namespaces}:
+                keys += [self._state_key(thread_id, checkpoint_ns), self._writes_key(thread_id, checkpoint_ns)]
+            await self.redis_manager.redis_client.delete(*keys)
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Error al eliminar hilo de Redis: {e}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Lecturas, checkpoints y canales escritos y errores."""
+        return {
+            "ttl": self.ttl,
+            "reads": self.reads,
+            "prefetch_hits": self.prefetch_hits,
+            "checkpoints_written": self.checkpoints_written,
+            "channels_written": self.channels_written,
+            "avg_checkpoint_bytes": round(self.bytes_written / self.checkpoints_written, 1)
+            if self.checkpoints_written else 0.0,
+            "errors": self.errors
+        }
@@ -0,0 +1,132 @@
+# src/core/container.py
+"""
+Contenedor de servicios compartidos por todo el proceso.
+
+El contenedor es creado y cerrado por el `lifespan` de FastAPI (src/main.py):
+abre una única vez los pools de MySQL, el cliente de Redis y la sesión HTTP,
+y construye los controladores que los reutilizan en cada webhook.
+"""
+from typing import Optional
+import aiohttp
+from src.config.settings import settings
+from src.chains.intent_model import IntentModel
+from src.chains.rule_classifier import rule_classifier
+from src.chains.token_usage import token_usage
+from src.core.checkpointer import RedisCheckpointSaver
+from src.core.database import Database
+from src.core.memory import RedisManager
+from src.core.message_queue import MessageQueue
+from src.core.redis_pool import get_shared_pool
+from src.graphs.main_graph import CONVERSATION_INPUT_CHANNELS
+from src.graphs.registry import graph_registry
+from src.graphs.tracing import graph_tracer
+from src.template.business_responses import business_response_cache
+from src.tools.whatsapp import WhatsAppService
+from src.utils.metrics import StatusRingBuffer, histograms, register_metrics
+
+
+class ServiceContainer:
+    def __init__(self):
+        """
+        Inicializa el contenedor. Las conexiones se abren recién en start().
+        """
+        self.database = Database()
+        self.redis_manager = RedisManager()
+        self.http_session: Optional[aiohttp.ClientSession] = None
+        self.whatsapp_service: Optional[WhatsAppService] = None
+        self.home_assistant_controller = None
+        self.whatsapp_controller = None
+        self.message_queue: Optional[MessageQueue] = None
+        self.status_buffer: Optional[StatusRingBuffer] = None
+        self.intent_model: Optional[IntentModel] = None
+        self.checkpointer: Optional[RedisCheckpointSaver] = None
+
+    async def start(self) -> None:
+        """
+        Abre las conexiones compartidas y construye los controladores.
+        """
+        # Importación diferida para evitar ciclos (los controladores importan src.core)
+        from src.controllers.home_assistant_controller import HomeAssistantController
+        from src.controllers.whatsapp_controller import WhatsAppController
+
+        await self.database.connect()
+        await self.redis_manager.start_cache_invalidation()
+
+        # Compilar y validar los grafos antes de aceptar mensajes; el de
+        # conversación guarda el estado de cada hilo en Redis
+        self.checkpointer = RedisCheckpointSaver(
+            self.redis_manager, transient_channels=CONVERSATION_INPUT_CHANNELS)
+        graph_registry.set_checkpointer("conversation", self.checkpointer)
+        graph_registry.compile_all()
+
+        self.http_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT),
+            connector=aiohttp.TCPConnector(
+                limit=settings.HTTP_MAX_CONNECTIONS)
+        )
+        self.whatsapp_service = WhatsAppService(session=self.http_session)
+
+        self.home_assistant_controller = HomeAssistantController(
+            whatsapp_service=self.whatsapp_service,
+            redis_manager=self.redis_manager,
+            database=self.database,
+            http_session=self.http_session
+        )
+        if settings.INTENT_MODEL_ENABLED:
+            self.intent_model = IntentModel.load(settings.INTENT_MODEL_PATH)
+
+        self.whatsapp_controller = WhatsAppController(
+            whatsapp_service=self.whatsapp_service,
+            redis_manager=self.redis_manager,
+            database=self.database,
+            home_assistant_controller=self.home_assistant_controller,
+            intent_model=self.intent_model,
+            checkpointer=self.checkpointer
+        )
+
+        self.message_queue = MessageQueue(
+            self.whatsapp_controller.process_webhook)
+        await self.message_queue.start()
+        register_metrics("message_queue", self.message_queue.metrics)
+        register_metrics("graphs", graph_registry.metrics)
+        register_metrics("graph_tracing", graph_tracer.metrics)
+        register_metrics("redis_pool", get_shared_pool().metrics)
+        register_metrics("local_cache", self.redis_manager.local_cache_metrics)
+        register_metrics("checkpointer", self.checkpointer.metrics)
+        register_metrics("histograms", histograms.snapshot)
+        register_metrics("mailboxes", self.whatsapp_controller.mailboxes.metrics)
+        register_metrics("whatsapp_controller", self.whatsapp_controller.metrics)
+        register_metrics("business_info", self.whatsapp_controller.business_info.metrics)
+        register_metrics("business_responses", business_response_cache.metrics)
+        register_metrics("intent_classifier_cache",
+                         self.whatsapp_controller.classifier_cache.metrics)
+        register_metrics("rule_classifier", rule_classifier.metrics)
+        register_metrics("llm_tokens", token_usage.metrics)
+        register_metrics("intent_batcher",
+                         self.whatsapp_controller.classifier_cache.batcher.metrics)
+        register_metrics("llm_guard",
+                         self.whatsapp_controller.classifier_cache.guard.metrics)
+        if self.intent_model:
+            register_metrics("intent_model", self.intent_model.metrics)
+        register_metrics("intent_result_cache",
+                         self.whatsapp_controller.classifier_cache.result_cache.metrics)
+
+        if settings.STATUS_STATS_ENABLED:
+            self.status_buffer = StatusRingBuffer(settings.STATUS_STATS_SIZE)
+            register_metrics("whatsapp_statuses", self.status_buffer.snapshot)
+
+    async def close(self) -> None:
+        """
+        Cierra todas las conexiones compartidas.
+        """
+        # Vaciar la cola antes de cerrar las conexiones que usan los workers
+        if self.message_queue:
+            await self.message_queue.stop()
+            self.message_queue = None
+        if self.whatsapp_controller:
+            await self.whatsapp_controller.mailboxes.close()
+        if self.http_session:
+            await self.http_session.close()
+            self.http_session = None
+        await self.redis_manager.close()
+        await self.database.close()
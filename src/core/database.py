@@ -25,6 +25,8 @@ class Database:
                 user=settings.DB_USER_READER,
                 password=settings.DB_PASS_READER,
                 database=settings.DB_NAME,
+                minsize=settings.DB_POOL_MIN_SIZE,
+                maxsize=settings.DB_POOL_MAX_SIZE,
                 autocommit=True,  # Para operaciones de solo lectura
                 charset="utf8mb4",  # Añadir esta línea
                 use_unicode=True   # Añadir esta línea
@@ -37,6 +39,8 @@ class Database:
                 user=settings.DB_USER_WRITER,
                 password=settings.DB_PASS_WRITER,
                 database=settings.DB_NAME,
+                minsize=settings.DB_POOL_MIN_SIZE,
+                maxsize=settings.DB_POOL_MAX_SIZE,
                 autocommit=False,
                 charset="utf8mb4",  # Añadir esta línea
                 use_unicode=True    # Añadir esta línea
@@ -368,6 +372,97 @@ class Database:
             print(f"❌ Error al obtener mensajes de conversación: {e}")
             return []
 
+    async def get_user_messages(self, limit: int = 5000) -> List[Dict[str, Any]]:
+        """
+        Recupera los últimos mensajes enviados por usuarios en todas las
+        conversaciones (para entrenar el modelo local de intenciones).
+
+        Args:
+            limit: Número máximo de mensajes a recuperar
+
+        Returns:
+            Lista de mensajes
+        """
+        await self.connect()
+        query = """
+        SELECT id, content, timestamp 
+        FROM conversation_messages
+        WHERE role = 'user' 
+        ORDER BY id DESC 
+        LIMIT %s
+        """
+        try:
+            async with self.read_pool.acquire() as conn:
+                async with conn.cursor(asyncmy.cursors.DictCursor) as cursor:
+                    await cursor.execute(query, (limit,))
+                    return await cursor.fetchall()
+        except Exception as e:
+            print(f"❌ Error al obtener mensajes de usuarios: {e}")
+            return []
+
+    async def save_intent_label(self, text_hash: str, text: str, intents: List[str], prompt_version: str) -> bool:
+        """
+        Guarda (o actualiza) las intenciones que devolvió el LLM para un texto,
+        para entrenar después el modelo local de intenciones.
+
+        Args:
+            text_hash: Hash del texto normalizado
+            text: Texto del usuario
+            intents: Intenciones devueltas por el LLM
+            prompt_version: Versión del template y modelo del clasificador
+
+        Returns:
+            True si se guardó correctamente
+        """
+        await self.connect()
+        query = """
+        INSERT INTO intent_labels (text_hash, text, intents, prompt_version)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE text = VALUES(text), intents = VALUES(intents),
+            prompt_version = VALUES(prompt_version)
+        """
+        async with self.write_pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                try:
+                    await cursor.execute(query, (text_hash, text, json.dumps(intents), prompt_version))
+                    await conn.commit()
+                    return True
+                except Exception as e:
+                    await conn.rollback()
+                    print(f"❌ Error al guardar etiqueta de intenciones: {e}")
+                    return False
+
+    async def get_intent_labels(self, limit: int = 5000) -> List[Dict[str, Any]]:
+        """
+        Recupera las últimas intenciones devueltas por el LLM (para entrenar
+        el modelo local de intenciones).
+
+        Args:
+            limit: Número máximo de etiquetas a recuperar
+
+        Returns:
+            Lista de etiquetas con el texto y sus intenciones
+        """
+        await self.connect()
+        query = """
+        SELECT text, intents, prompt_version, updated_at
+        FROM intent_labels
+        ORDER BY updated_at DESC
+        LIMIT %s
+        """
+        try:
+            async with self.read_pool.acquire() as conn:
+                async with conn.cursor(asyncmy.cursors.DictCursor) as cursor:
+                    await cursor.execute(query, (limit,))
+                    rows = await cursor.fetchall()
+            for row in rows:
+                if isinstance(row["intents"], str):
+                    row["intents"] = json.loads(row["intents"])
+            return rows
+        except Exception as e:
+            print(f"❌ Error al obtener etiquetas de intenciones: {e}")
+            return []
+
     async def get_user_conversations(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Recupera las conversaciones de un usuario.
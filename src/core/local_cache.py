@@ -0,0 +1,105 @@
+# src/core/local_cache.py
+"""
+Caché local (en memoria del proceso) delante de Redis.
+
+Cada espacio (usuarios, configuración de Home Assistant, información del
+negocio) tiene su propio TTL y cantidad máxima de claves; al superar el
+máximo se descarta la menos usada. RedisManager la consulta antes de ir a
+Redis y la invalida cuando otro worker escribe (pub/sub).
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class LocalCache:
+    def __init__(self, ttl: float, max_entries: int):
+        """
+        Inicializa un espacio de la caché.
+
+        Args:
+            ttl: Segundos que se conserva cada valor
+            max_entries: Cantidad máxima de claves (LRU)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Cambia con cada invalidación: una lectura de Redis que empezó antes
+        # no se guarda (podría traer el valor viejo)
+        self.generation = 0
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Any:
+        """
+        Obtiene un valor vigente.
+
+        Args:
+            key: Clave de Redis
+
+        Returns:
+            Valor o None si no está o venció
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self.entries[key]
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any, generation: Optional[int] = None) -> Any:
+        """
+        Guarda un valor (los None no se guardan).
+
+        Args:
+            key: Clave de Redis
+            value: Valor ya decodificado
+            generation: Generación al empezar la lectura (opcional); si hubo
+                una invalidación desde entonces el valor no se guarda
+
+        Returns:
+            El mismo valor
+        """
+        if value is None or (generation is not None and generation != self.generation):
+            return value
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def invalidate(self, key: str) -> None:
+        """Descarta una clave."""
+        self.generation += 1
+        self.invalidations += 1
+        self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Descarta todas las claves."""
+        self.generation += 1
+        self.entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Aciertos, fallos, proporción de aciertos y tamaño."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,189 @@
+# src/core/mailbox.py
+"""
+Buzones por teléfono delante de WhatsAppController.process_message.
+
+Cada teléfono tiene su propio buzón (cola + tarea) que procesa sus mensajes
+estrictamente en orden, mientras que teléfonos distintos corren en paralelo.
+Los buzones inactivos se eliminan solos. Para que el orden se respete también
+entre varios workers de uvicorn, cada mensaje se procesa con un lease en Redis
+por teléfono (SET NX PX), renovado mientras dure el procesamiento. Un mensaje
+nunca se procesa sin el lease: si otro worker lo tiene se espera a que lo
+libere, y si Redis falla se reintenta con backoff hasta dar el mensaje por
+fallido.
+"""
+import asyncio
+import contextlib
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+from src.config.settings import settings
+from src.core.memory import RedisManager
+
+
+class PhoneMailboxes:
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        redis_manager: Optional[RedisManager] = None,
+        idle_timeout: Optional[float] = None
+    ):
+        """
+        Inicializa el conjunto de buzones.
+
+        Args:
+            handler: Corrutina que procesa un mensaje parseado
+            redis_manager: Gestor de Redis para el lease distribuido (opcional,
+                sin él solo se garantiza el orden dentro del proceso)
+            idle_timeout: Segundos sin mensajes tras los cuales se elimina un buzón
+        """
+        self.handler = handler
+        self.redis_manager = redis_manager
+        self.idle_timeout = idle_timeout or settings.MAILBOX_IDLE_TIMEOUT
+        self.lease_ttl_ms = settings.MAILBOX_LEASE_TTL_MS
+        self.owner = str(uuid.uuid4())
+        self.mailboxes: Dict[str, asyncio.Queue] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+        # Métricas
+        self.created = 0
+        self.evicted = 0
+        self.lease_waits = 0
+        self.lease_slow_waits = 0
+        self.lease_errors = 0
+        self.lease_failures = 0
+
+    def submit(self, phone: str, message: Dict[str, Any]) -> asyncio.Future:
+        """
+        Agrega un mensaje al buzón de su teléfono.
+
+        Args:
+            phone: Teléfono normalizado del remitente
+            message: Mensaje parseado
+
+        Returns:
+            Future que se resuelve con el resultado del handler
+        """
+        future = asyncio.get_running_loop().create_future()
+        mailbox = self.mailboxes.get(phone)
+        if mailbox is None:
+            mailbox = asyncio.Queue()
+            self.mailboxes[phone] = mailbox
+            self.tasks[phone] = asyncio.create_task(
+                self._run(phone, mailbox), name=f"mailbox-{phone}")
+            self.created += 1
+        mailbox.put_nowait((message, future))
+        return future
+
+    async def _run(self, phone: str, mailbox: asyncio.Queue) -> None:
+        """Procesa en orden los mensajes de un teléfono hasta quedar inactivo."""
+        try:
+            while True:
+                try:
+                    message, future = await asyncio.wait_for(mailbox.get(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    # submit() no cede el control, así que la cola vacía aquí es definitiva
+                    if mailbox.empty():
+                        break
+                    continue
+
+                try:
+                    result = await self._process_with_lease(phone, message)
+                    if not future.done():
+                        future.set_result(result)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+        finally:
+            if self.mailboxes.get(phone) is mailbox:
+                del self.mailboxes[phone]
+                del self.tasks[phone]
+                self.evicted += 1
+
+    async def _process_with_lease(self, phone: str, message: Dict[str, Any]) -> Any:
+        """Ejecuta el handler con el lease del teléfono tomado en Redis."""
+        if not self.redis_manager:
+            return await self.handler(message)
+
+        key = f"taborra:lease:phone:{phone}"
+        await self._acquire(key)
+        renewer = asyncio.create_task(self._renew(key))
+        try:
+            return await self.handler(message)
+        finally:
+            # Esperar a que la renovación termine: si no, podría extender
+            # el lease después de liberarlo (o ya en manos de otro dueño)
+            renewer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await renewer
+            await self.redis_manager.release_lease(key, self.owner)
+
+    async def _acquire(self, key: str) -> None:
+        """
+        Espera hasta tomar el lease de un teléfono.
+
+        Mientras otro worker tenga el lease se sigue esperando: lo renueva
+        mientras procesa, así que una espera larga significa que ese teléfono
+        sigue ocupado. Pasado MAILBOX_LEASE_WAIT solo se avisa una vez. Si
+        Redis falla se reintenta con backoff exponencial.
+
+        Raises:
+            RuntimeError: Si Redis falla MAILBOX_LEASE_RETRIES veces seguidas
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.MAILBOX_LEASE_WAIT
+        waited = False
+        warned = False
+        errors = 0
+        while True:
+            acquired = await self.redis_manager.acquire_lease(key, self.owner, self.lease_ttl_ms)
+            if acquired:
+                return
+            if acquired is None:
+                # Redis no disponible: procesar sin el lease podría cruzarse
+                # con otro worker, así que se reintenta o se falla el mensaje
+                errors += 1
+                self.lease_errors += 1
+                if errors >= settings.MAILBOX_LEASE_RETRIES:
+                    self.lease_failures += 1
+                    raise RuntimeError(f"No se pudo tomar el lease {key}: Redis no disponible")
+                await asyncio.sleep(min(
+                    settings.MAILBOX_LEASE_POLL * 2 ** errors,
+                    settings.MAILBOX_LEASE_BACKOFF_MAX))
+                continue
+            errors = 0
+            if not waited:
+                waited = True
+                self.lease_waits += 1
+            if not warned and loop.time() >= deadline:
+                warned = True
+                self.lease_slow_waits += 1
+                print(f"⚠️ El lease {key} sigue ocupado tras {settings.MAILBOX_LEASE_WAIT}s, se sigue esperando")
+            await asyncio.sleep(settings.MAILBOX_LEASE_POLL)
+
+    async def _renew(self, key: str) -> None:
+        """Renueva el lease periódicamente mientras se procesa el mensaje."""
+        interval = self.lease_ttl_ms / 3000
+        while True:
+            await asyncio.sleep(interval)
+            if not await self.redis_manager.renew_lease(key, self.owner, self.lease_ttl_ms):
+                print(f"⚠️ No se pudo renovar el lease {key}")
+                return
+
+    async def close(self) -> None:
+        """Detiene todos los buzones activos."""
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas actuales de los buzones."""
+        return {
+            "active": len(self.mailboxes),
+            "pending": sum(q.qsize() for q in self.mailboxes.values()),
+            "created": self.created,
+            "evicted": self.evicted,
+            "lease_waits": self.lease_waits,
+            "lease_slow_waits": self.lease_slow_waits,
+            "lease_errors": self.lease_errors,
+            "lease_failures": self.lease_failures
+        }
@@ -1,21 +1,228 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import redis.asyncio as redis
+import asyncio
 import json
+import time
 import uuid
 from src.config.settings import settings
+from src.core.local_cache import LocalCache
+from src.core.redis_pool import shared_redis_client
+
+
+# Scripts Lua: solo el dueño del lease puede renovarlo o liberarlo
+_RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+# Espacios de la caché local delante de Redis
+USER_CACHE = "user"
+HA_CONFIG_CACHE = "ha_config"
+BUSINESS_CACHE = "business"
+
+
+def _local_caches() -> Dict[str, LocalCache]:
+    """Espacios de la caché local con su TTL y tamaño desde settings."""
+    if not settings.LOCAL_CACHE_ENABLED:
+        return {}
+    return {
+        USER_CACHE: LocalCache(settings.LOCAL_CACHE_USER_TTL, settings.LOCAL_CACHE_USER_MAX_ENTRIES),
+        HA_CONFIG_CACHE: LocalCache(settings.LOCAL_CACHE_HA_CONFIG_TTL, settings.LOCAL_CACHE_HA_CONFIG_MAX_ENTRIES),
+        # Una sola clave (info_business)
+        BUSINESS_CACHE: LocalCache(settings.BUSINESS_INFO_REFRESH_SECONDS, 1)
+    }
+
+
+# Historial de mensajes por chat: últimos 50, durante 7 días
+HISTORY_MAX_MESSAGES = 50
+HISTORY_EXPIRY = 86400 * 7
+
+
+def _decode_value(value: Any) -> Any:
+    """Deserializa un valor guardado como JSON (o lo devuelve tal cual)."""
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        # Devolver como string si no es JSON
+        return value
+
+
+def _decode_history(messages: List[str]) -> List[Dict[str, Any]]:
+    """Deserializa los mensajes de un historial."""
+    return [json.loads(msg) for msg in messages if msg]
+
+
+def _history_key(chat_id: str) -> str:
+    return f"taborra:chat:{chat_id}:messages"
+
+
+def _chat_key(user_id: str) -> str:
+    return f"taborra:user:{user_id}:current_chat"
+
+
+class RedisBatch:
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        transaction: bool = False,
+        local_caches: Optional[Dict[str, LocalCache]] = None
+    ):
+        """
+        Agrupa operaciones de Redis en un único pipeline: una sola ida y
+        vuelta para todas. Cada método encola su operación y devuelve el
+        lote, y execute() devuelve los resultados decodificados en el orden
+        en que se encolaron (o el valor por defecto de la operación que falló).
+
+        Args:
+            redis_client: Cliente de Redis
+            transaction: Si el lote se ejecuta como MULTI/EXEC (atómico)
+            local_caches: Espacios de la caché local (opcional)
+        """
+        self.pipe = redis_client.pipeline(transaction=transaction)
+        self.local_caches = local_caches or {}
+        # (cantidad de comandos, decodificador, valor por defecto) por operación
+        self.operations: List[Tuple[int, Callable[[List[Any]], Any], Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def _add(self, commands: int, decode: Callable[[List[Any]], Any], default: Any) -> "RedisBatch":
+        self.operations.append((commands, decode, default))
+        return self
+
+    def get_value(self, key: str) -> "RedisBatch":
+        """Encola la lectura de un valor (ver RedisManager.get_value)."""
+        self.pipe.get(key)
+        return self._add(1, lambda r: _decode_value(r[0]), None)
+
+    def get_cached_value(self, namespace: str, key: str) -> "RedisBatch":
+        """
+        Encola la lectura de un valor de un espacio de la caché local: si
+        está en memoria no se envía nada a Redis (ver RedisManager.get_cached_value).
+        """
+        cache = self.local_caches.get(namespace)
+        if cache is None:
+            return self.get_value(key)
+        value = cache.get(key)
+        if value is not None:
+            return self._add(0, lambda r: value, None)
+        generation = cache.generation
+        self.pipe.get(key)
+        return self._add(1, lambda r: cache.put(key, _decode_value(r[0]), generation), None)
+
+    def set_value(self, key: str, value: Any, expiry: int = 3600) -> "RedisBatch":
+        """Encola el guardado de un valor con expiración (ver RedisManager.set_value)."""
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        self.pipe.set(key, value, ex=expiry)
+        return self._add(1, lambda r: True, False)
+
+    def delete_key(self, key: str) -> "RedisBatch":
+        """Encola la eliminación de una clave."""
+        self.pipe.delete(key)
+        return self._add(1, lambda r: True, False)
+
+    def claim_message_id(self, message_id: str, expiry: int = 86400) -> "RedisBatch":
+        """Encola la marca de un mensaje como recibido (ver RedisManager.claim_message_id)."""
+        self.pipe.set(f"message:{message_id}", "1", ex=expiry, nx=True)
+        return self._add(1, lambda r: bool(r[0]), None)
+
+    def get_chat_id(self, user_id: str) -> "RedisBatch":
+        """Encola la lectura del chat actual de un usuario (None si no tiene)."""
+        self.pipe.get(_chat_key(user_id))
+        return self._add(1, lambda r: _decode_value(r[0]), None)
+
+    def get_message_history(self, chat_id: str, limit: int = 10) -> "RedisBatch":
+        """Encola la lectura del historial de un chat (ver RedisManager.get_message_history)."""
+        self.pipe.lrange(_history_key(chat_id), 0, limit - 1)
+        return self._add(1, lambda r: _decode_history(r[0]), [])
+
+    def add_messages_to_history(self, chat_id: str, messages: List[Tuple[str, str]]) -> "RedisBatch":
+        """Encola el agregado de mensajes al historial (ver RedisManager.add_messages_to_history)."""
+        key = _history_key(chat_id)
+        # LPUSH con varios valores deja el último al inicio (más reciente primero)
+        self.pipe.lpush(key, *[json.dumps({"role": role, "content": content}) for role, content in messages])
+        self.pipe.ltrim(key, 0, HISTORY_MAX_MESSAGES - 1)
+        self.pipe.expire(key, HISTORY_EXPIRY)
+        return self._add(3, lambda r: True, False)
+
+    async def execute(self) -> List[Any]:
+        """
+        Ejecuta el lote en una sola ida y vuelta.
+
+        Returns:
+            Resultado de cada operación en orden (su valor por defecto si falló)
+        """
+        if not self.operations:
+            return []
+        try:
+            async with self.pipe as pipe:
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            print(f"❌ Error al ejecutar lote en Redis: {e}")
+            return [default for _, _, default in self.operations]
+
+        decoded, position = [], 0
+        for commands, decode, default in self.operations:
+            chunk = results[position:position + commands]
+            position += commands
+            error = next((r for r in chunk if isinstance(r, Exception)), None)
+            if error:
+                print(f"❌ Error en operación de lote en Redis: {error}")
+                decoded.append(default)
+                continue
+            try:
+                decoded.append(decode(chunk))
+            except Exception as e:
+                print(f"❌ Error al decodificar resultado de Redis: {e}")
+                decoded.append(default)
+        return decoded
 
 
 class RedisManager:
-    def __init__(self: str):
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
         """
         Inicializa el gestor de memoria con Redis.
 
         Args:
-            redis_url: URL de conexión a Redis
+            redis_client: Cliente de Redis (opcional). Si no se indica, se
+                usa el pool compartido por el proceso (src.core.redis_pool)
         """
         self.redis_url = settings.REDIS_URL
-        self.redis_client = redis.from_url(
-            self.redis_url, decode_responses=True)
+        self.redis_client = redis_client or shared_redis_client()
+
+        # Caché local por espacio; las escrituras se anuncian por pub/sub para
+        # que los demás workers (y gestores) descarten su copia
+        self.local_caches = _local_caches()
+        self.cache_origin = uuid.uuid4().hex
+        self.invalidation_channel = settings.LOCAL_CACHE_INVALIDATION_CHANNEL
+        self.invalidation_task: Optional[asyncio.Task] = None
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+
+    async def close(self) -> None:
+        """
+        Cierra el cliente de Redis y las conexiones de su pool (el pool
+        compartido vuelve a conectar si se usa después).
+        """
+        await self.stop_cache_invalidation()
+        try:
+            await self.redis_client.aclose()
+            await self.redis_client.connection_pool.disconnect()
+        except Exception as e:
+            print(f"❌ Error al cerrar conexión con Redis: {e}")
 
     async def set_value(self, key: str, value: Any, expiry: int = 3600) -> bool:
         """
@@ -50,21 +257,140 @@ class RedisManager:
             Valor almacenado o None si no existe
         """
         try:
-            value = await self.redis_client.get(key)
-
-            if value:
-                try:
-                    # Intentar deserializar como JSON
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    # Devolver como string si no es JSON
-                    return value
-
-            return None
+            return _decode_value(await self.redis_client.get(key))
         except Exception as e:
             print(f"❌ Error al obtener valor de Redis: {e}")
             return None
 
+    async def get_cached_value(self, namespace: str, key: str) -> Any:
+        """
+        Obtiene un valor pasando primero por la caché local del espacio; si
+        no está en memoria se lee de Redis y se guarda.
+
+        Args:
+            namespace: Espacio de la caché local (USER_CACHE, HA_CONFIG_CACHE, ...)
+            key: Clave de Redis
+
+        Returns:
+            Valor almacenado o None si no existe
+        """
+        cache = self.local_caches.get(namespace)
+        if cache is None:
+            return await self.get_value(key)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        generation = cache.generation
+        return cache.put(key, await self.get_value(key), generation)
+
+    async def set_cached_value(self, namespace: str, key: str, value: Any, expiry: int = 3600) -> bool:
+        """
+        Guarda un valor en Redis y en la caché local del espacio, y avisa a
+        los demás workers para que descarten su copia.
+
+        Args:
+            namespace: Espacio de la caché local
+            key: Clave para almacenar
+            value: Valor a guardar
+            expiry: Tiempo de expiración en segundos
+
+        Returns:
+            True si se guardó correctamente
+        """
+        saved = await self.set_value(key, value, expiry)
+        # Sin caché local (LOCAL_CACHE_ENABLED=false) nadie escucha las invalidaciones
+        if not self.local_caches:
+            return saved
+        cache = self.local_caches.get(namespace)
+        if cache is not None:
+            cache.invalidate(key)
+            if saved:
+                cache.put(key, value)
+        await self.publish_invalidation(namespace, key)
+        return saved
+
+    async def publish_invalidation(self, namespace: str, key: str) -> None:
+        """
+        Anuncia que una clave de un espacio cambió (las cachés locales de los
+        demás la descartan).
+
+        Args:
+            namespace: Espacio de la caché local
+            key: Clave de Redis
+        """
+        message = json.dumps({"origin": self.cache_origin, "namespace": namespace, "key": key})
+        try:
+            await self.redis_client.publish(self.invalidation_channel, message)
+            self.invalidations_sent += 1
+        except Exception as e:
+            print(f"❌ Error al publicar invalidación en Redis: {e}")
+
+    def _apply_invalidation(self, data: str) -> None:
+        """Descarta la clave anunciada (salvo que la escritura sea propia)."""
+        try:
+            message = json.loads(data)
+        except (TypeError, json.JSONDecodeError):
+            return
+        if message.get("origin") == self.cache_origin:
+            return
+        cache = self.local_caches.get(message.get("namespace"))
+        if cache is not None:
+            cache.invalidate(message.get("key"))
+            self.invalidations_received += 1
+
+    async def start_cache_invalidation(self) -> None:
+        """
+        Empieza a escuchar las invalidaciones de los demás workers.
+        """
+        if self.local_caches and self.invalidation_task is None:
+            self.invalidation_task = asyncio.create_task(self._listen_invalidations())
+
+    async def stop_cache_invalidation(self) -> None:
+        """
+        Deja de escuchar las invalidaciones.
+        """
+        if self.invalidation_task is None:
+            return
+        self.invalidation_task.cancel()
+        try:
+            await self.invalidation_task
+        except asyncio.CancelledError:
+            pass
+        self.invalidation_task = None
+
+    async def _listen_invalidations(self) -> None:
+        """Escucha el canal de invalidaciones y reconecta si se corta."""
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.invalidation_channel)
+                # Mientras no se escuchaba pudo perderse alguna invalidación
+                for cache in self.local_caches.values():
+                    cache.clear()
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error en el canal de invalidaciones de Redis: {e}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def local_cache_metrics(self) -> Dict[str, Any]:
+        """Aciertos y proporción de aciertos por espacio e invalidaciones."""
+        return {
+            "namespaces": {name: cache.metrics() for name, cache in self.local_caches.items()},
+            "listening": self.invalidation_task is not None and not self.invalidation_task.done(),
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received
+        }
+
     async def delete_key(self, key: str) -> bool:
         """
         Elimina una clave de Redis.
@@ -98,6 +424,36 @@ class RedisManager:
             print(f"❌ Error al verificar existencia en Redis: {e}")
             return False
 
+    async def claim_message_id(self, message_id: str, expiry: int = 86400) -> Optional[bool]:
+        """
+        Marca un mensaje como recibido si todavía no lo estaba (SET NX EX):
+        comprobación y marca en una sola operación atómica.
+
+        Args:
+            message_id: ID del mensaje
+            expiry: Tiempo de expiración en segundos
+
+        Returns:
+            True si es nuevo, False si es duplicado, None si Redis falló
+        """
+        try:
+            return bool(await self.redis_client.set(f"message:{message_id}", "1", ex=expiry, nx=True))
+        except Exception as e:
+            print(f"❌ Error al registrar mensaje en Redis: {e}")
+            return None
+
+    def batch(self, transaction: bool = False) -> RedisBatch:
+        """
+        Crea un lote de operaciones que se envían juntas en un pipeline.
+
+        Args:
+            transaction: Si el lote se ejecuta como MULTI/EXEC (atómico)
+
+        Returns:
+            Lote vacío
+        """
+        return RedisBatch(self.redis_client, transaction, self.local_caches)
+
     async def update_expiry(self, key: str, seconds: int = 3600) -> bool:
         """
         Actualiza el tiempo de expiración de una clave.
@@ -116,6 +472,100 @@ class RedisManager:
             print(f"❌ Error al actualizar expiración en Redis: {e}")
             return False
 
+    async def set_capped_value(self, key: str, value: Any, expiry: int, index_key: str, max_entries: int) -> bool:
+        """
+        Guarda un valor con expiración y lo registra en un índice (sorted set)
+        que limita la cantidad de claves de la misma familia. Al superar el
+        límite se eliminan las claves más antiguas.
+
+        Args:
+            key: Clave para almacenar
+            value: Valor a guardar
+            expiry: Tiempo de expiración en segundos
+            index_key: Clave del índice de la familia
+            max_entries: Cantidad máxima de claves en el índice
+
+        Returns:
+            True si se guardó correctamente
+        """
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+
+        now = time.time()
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(key, value, ex=expiry)
+                pipe.zadd(index_key, {key: now})
+                # Quitar del índice las claves que ya expiraron
+                pipe.zremrangebyscore(index_key, "-inf", now - expiry)
+                pipe.zcard(index_key)
+                results = await pipe.execute()
+
+            overflow = results[-1] - max_entries
+            if overflow > 0:
+                oldest = await self.redis_client.zpopmin(index_key, overflow)
+                if oldest:
+                    await self.redis_client.delete(*[member for member, _ in oldest])
+            return True
+        except Exception as e:
+            print(f"❌ Error al guardar valor acotado en Redis: {e}")
+            return False
+
+    async def acquire_lease(self, key: str, token: str, ttl_ms: int) -> Optional[bool]:
+        """
+        Intenta tomar un lease exclusivo (SET NX PX).
+
+        Args:
+            key: Clave del lease
+            token: Identificador único del dueño
+            ttl_ms: Duración del lease en milisegundos
+
+        Returns:
+            True si se tomó, False si lo tiene otro dueño, None si Redis falló
+        """
+        try:
+            return bool(await self.redis_client.set(key, token, nx=True, px=ttl_ms))
+        except Exception as e:
+            print(f"❌ Error al tomar lease en Redis: {e}")
+            return None
+
+    async def renew_lease(self, key: str, token: str, ttl_ms: int) -> bool:
+        """
+        Extiende un lease solo si sigue perteneciendo al dueño indicado.
+
+        Args:
+            key: Clave del lease
+            token: Identificador del dueño
+            ttl_ms: Nueva duración en milisegundos
+
+        Returns:
+            True si se extendió
+        """
+        try:
+            return bool(await self.redis_client.eval(
+                _RENEW_LEASE_SCRIPT, 1, key, token, ttl_ms))
+        except Exception as e:
+            print(f"❌ Error al renovar lease en Redis: {e}")
+            return False
+
+    async def release_lease(self, key: str, token: str) -> bool:
+        """
+        Libera un lease solo si sigue perteneciendo al dueño indicado.
+
+        Args:
+            key: Clave del lease
+            token: Identificador del dueño
+
+        Returns:
+            True si se liberó
+        """
+        try:
+            return bool(await self.redis_client.eval(
+                _RELEASE_LEASE_SCRIPT, 1, key, token))
+        except Exception as e:
+            print(f"❌ Error al liberar lease en Redis: {e}")
+            return False
+
     async def get_or_create_chat_id(self, user_id: str) -> str:
         """
         Obtiene o crea un ID de chat para un usuario.
@@ -129,7 +579,7 @@ class RedisManager:
         if not user_id:
             return str(uuid.uuid4())
 
-        chat_key = f"taborra:user:{user_id}:current_chat"
+        chat_key = _chat_key(user_id)
         chat_id = await self.get_value(chat_key)
 
         if not chat_id:
@@ -163,10 +613,8 @@ class RedisManager:
         Returns:
             Lista de mensajes
         """
-        key = f"taborra:chat:{chat_id}:messages"
         try:
-            messages = await self.redis_client.lrange(key, 0, limit - 1)
-            return [json.loads(msg) for msg in messages if msg]
+            return _decode_history(await self.redis_client.lrange(_history_key(chat_id), 0, limit - 1))
         except Exception as e:
             print(f"❌ Error al obtener historial de mensajes: {e}")
             return []
@@ -183,18 +631,21 @@ class RedisManager:
         Returns:
             True si se añadió correctamente
         """
-        key = f"taborra:chat:{chat_id}:messages"
-        message = json.dumps({"role": role, "content": content})
+        return await self.add_messages_to_history(chat_id, [(role, content)])
 
-        try:
-            # Añadir al inicio de la lista (más reciente primero)
-            await self.redis_client.lpush(key, message)
-            # Limitar el tamaño del historial
-            # Mantener últimos 50 mensajes
-            await self.redis_client.ltrim(key, 0, 49)
-            # Establecer expiración
-            await self.redis_client.expire(key, 86400 * 7)  # 7 días
+    async def add_messages_to_history(self, chat_id: str, messages: List[Tuple[str, str]]) -> bool:
+        """
+        Añade mensajes al historial de un chat, lo recorta y renueva su
+        expiración en una sola transacción (MULTI).
+
+        Args:
+            chat_id: ID del chat
+            messages: Pares (rol, contenido) en orden cronológico
+
+        Returns:
+            True si se añadieron correctamente
+        """
+        if not messages:
             return True
-        except Exception as e:
-            print(f"❌ Error al añadir mensaje al historial: {e}")
-            return False
+        results = await self.batch(transaction=True).add_messages_to_history(chat_id, messages).execute()
+        return results[0]
@@ -0,0 +1,120 @@
+# src/core/message_queue.py
+"""
+Cola de ingestión en proceso para los webhooks de WhatsApp.
+
+El endpoint solo valida y encola el payload; un grupo acotado de workers
+ejecuta el procesamiento completo (clasificación, grafo, BD y envíos) fuera
+del ciclo request/response, para que Meta reciba el 200 de inmediato.
+"""
+import asyncio
+import time
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from src.config.settings import settings
+from src.utils.metrics import LatencyWindow
+
+
+class MessageQueue:
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        max_size: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
+        """
+        Inicializa la cola de mensajes.
+
+        Args:
+            handler: Corrutina que procesa un payload
+            max_size: Cantidad máxima de payloads en espera
+            workers: Cantidad de workers concurrentes
+        """
+        self.handler = handler
+        self.max_size = max_size or settings.QUEUE_MAX_SIZE
+        self.worker_count = workers or settings.QUEUE_WORKERS
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_size)
+        self.workers: List[asyncio.Task] = []
+
+        # Métricas
+        self.latency = LatencyWindow(settings.QUEUE_LATENCY_SAMPLES)
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_workers = 0
+
+    async def start(self) -> None:
+        """Lanza los workers."""
+        for i in range(self.worker_count):
+            self.workers.append(asyncio.create_task(
+                self._worker(), name=f"whatsapp-worker-{i}"))
+        print(f"📥 Cola de mensajes iniciada con {self.worker_count} workers")
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Espera a que se vacíe la cola y detiene los workers.
+
+        Args:
+            timeout: Segundos máximos de espera para vaciar la cola
+        """
+        timeout = settings.QUEUE_DRAIN_TIMEOUT if timeout is None else timeout
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(
+                f"⚠️ Se descartan {self.queue.qsize()} mensajes pendientes al cerrar")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def enqueue(self, payload: Dict[str, Any]) -> bool:
+        """
+        Encola un payload sin bloquear.
+
+        Args:
+            payload: Payload del webhook
+
+        Returns:
+            True si se encoló, False si la cola está llena
+        """
+        try:
+            self.queue.put_nowait((time.perf_counter(), payload))
+            self.enqueued += 1
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            print("⚠️ Cola de mensajes llena, se rechaza el webhook")
+            return False
+
+    async def _worker(self) -> None:
+        """Consume payloads de la cola y los procesa con el handler."""
+        while True:
+            enqueued_at, payload = await self.queue.get()
+            self.busy_workers += 1
+            try:
+                await self.handler(payload)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ Error al procesar mensaje encolado: {e}")
+                traceback.print_exc()
+            finally:
+                self.latency.observe(
+                    (time.perf_counter() - enqueued_at) * 1000)
+                self.busy_workers -= 1
+                self.queue.task_done()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas actuales de la cola."""
+        return {
+            "depth": self.queue.qsize(),
+            "max_size": self.max_size,
+            "workers": self.worker_count,
+            "busy_workers": self.busy_workers,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "enqueue_to_reply": self.latency.snapshot()
+        }
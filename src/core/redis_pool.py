@@ -0,0 +1,134 @@
+# src/core/redis_pool.py
+"""
+Pool de conexiones de Redis compartido por todo el proceso.
+
+Antes cada RedisManager (el del contenedor, el de los handlers al importar,
+el de cada HomeAssistantController) creaba su propio pool con from_url. Ahora
+todos usan el mismo pool acotado (REDIS_MAX_CONNECTIONS): cuando se agotan
+las conexiones se espera una libre hasta REDIS_POOL_TIMEOUT en lugar de abrir
+más. El pool registra la espera por una conexión y el tiempo que cada comando
+(o pipeline) la mantiene tomada en los histogramas compartidos.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+import redis.asyncio as redis
+from redis.asyncio.connection import BlockingConnectionPool
+from src.config.settings import settings
+from src.utils.metrics import HistogramRegistry, histograms
+
+# Atributos con el momento en que el pool entregó cada conexión (antes de
+# conectarla o verificarla) y en que quedó lista para usarse
+_CHECKED_OUT_AT = "_taborra_checked_out_at"
+_ACQUIRED_AT = "_taborra_acquired_at"
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    def __init__(self, *args, registry: Optional[HistogramRegistry] = None, **kwargs):
+        """
+        Pool acotado que mide la espera por una conexión y el uso de cada una.
+
+        Args:
+            registry: Registro de histogramas (opcional, el compartido)
+            *args, **kwargs: Argumentos de BlockingConnectionPool
+        """
+        super().__init__(*args, **kwargs)
+        self.registry = registry or histograms
+
+        # Métricas
+        self.acquisitions = 0
+        self.waiting = 0
+        self.peak_in_use = 0
+        self.wait_timeouts = 0
+
+    async def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except redis.ConnectionError as e:
+            # Solo el pool agotado (BlockingConnectionPool: "No connection
+            # available.", causado por el timeout de la espera); los errores
+            # al conectar o verificar la conexión no son esperas
+            if isinstance(e.__cause__, asyncio.TimeoutError):
+                self.wait_timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+        now = time.perf_counter()
+        # Espera por el pool: hasta que entregó la conexión, sin el tiempo de
+        # conectarla ni del health check
+        checked_out_at = connection.__dict__.pop(_CHECKED_OUT_AT, now)
+        self.registry.observe("redis_pool_wait_ms", (checked_out_at - start) * 1000)
+        setattr(connection, _ACQUIRED_AT, now)
+        self.acquisitions += 1
+        self.peak_in_use = max(self.peak_in_use, len(self._in_use_connections))
+        return connection
+
+    async def ensure_connection(self, connection) -> None:
+        setattr(connection, _CHECKED_OUT_AT, time.perf_counter())
+        await super().ensure_connection(connection)
+
+    async def release(self, connection) -> None:
+        acquired_at = connection.__dict__.pop(_ACQUIRED_AT, None)
+        await super().release(connection)
+        if acquired_at is not None:
+            self.registry.observe("redis_command_duration_ms", (time.perf_counter() - acquired_at) * 1000)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Conexiones abiertas y en uso, utilización, esperas y agotamientos."""
+        in_use = len(self._in_use_connections)
+        return {
+            "max_connections": self.max_connections,
+            "open": in_use + len(self._available_connections),
+            "in_use": in_use,
+            "peak_in_use": self.peak_in_use,
+            "utilization": round(in_use / self.max_connections, 4) if self.max_connections else 0.0,
+            "waiting": self.waiting,
+            "acquisitions": self.acquisitions,
+            "wait_timeouts": self.wait_timeouts
+        }
+
+
+def create_pool(url: Optional[str] = None) -> InstrumentedConnectionPool:
+    """
+    Crea un pool con los límites y timeouts de settings.
+
+    Args:
+        url: URL de Redis (opcional, desde settings)
+
+    Returns:
+        Pool de conexiones
+    """
+    return InstrumentedConnectionPool.from_url(
+        url or settings.REDIS_URL,
+        decode_responses=True,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT
+    )
+
+
+_shared_pool: Optional[InstrumentedConnectionPool] = None
+
+
+def get_shared_pool() -> InstrumentedConnectionPool:
+    """Pool compartido por el proceso (se crea en el primer uso)."""
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = create_pool()
+    return _shared_pool
+
+
+def shared_redis_client() -> redis.Redis:
+    """
+    Cliente de Redis sobre el pool compartido. Cerrar el cliente no cierra
+    el pool.
+
+    Returns:
+        Cliente de Redis
+    """
+    return redis.Redis(connection_pool=get_shared_pool())
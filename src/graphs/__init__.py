@@ -1,5 +1,6 @@
 # src/graphs/__init__.py
 from .main_graph import create_conversation_graph
-from .troubleshooting import create_troubleshooting_graph
+from .registry import GraphRegistry, graph_registry
+from .tracing import GraphTracer, graph_tracer
 
-__all__ = ["create_conversation_graph", "create_troubleshooting_graph"]
+__all__ = ["GraphRegistry", "GraphTracer", "create_conversation_graph", "graph_registry", "graph_tracer"]
\ No newline at end of file
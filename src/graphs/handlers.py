@@ -1,31 +1,39 @@
 """
 Handlers para cada nodo del grafo de conversación principal.
+
+Los nodos son asíncronos (el grafo se ejecuta con `ainvoke`) y reciben los
+servicios compartidos en `config["configurable"]`, de modo que pueden esperar
+directamente a la base de datos o a Home Assistant.
 """
 import traceback
 import uuid
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional
 
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
 
-from src.graphs.troubleshooting import (
-    confirmation_step,
-    keyboard_selection,
-    process_keyboard_selection,
-    process_problem_selection,
-    process_rating,
-    exit_flow
-)
+from src.graphs.troubleshooting import TROUBLESHOOTING_INPUT_KEYS, troubleshooting_flow_state
+from src.template.business_responses import business_response_cache
 
 from src.tools.home_assistant import HomeAssistantTools
 from src.core.database import Database
-from src.core.memory import RedisManager
 
-# Inicializar servicios
-db = Database()
-redis = RedisManager()
+
+def get_service(config: Optional[RunnableConfig], name: str) -> Any:
+    """
+    Obtiene un servicio compartido pasado al grafo en config["configurable"].
+
+    Args:
+        config: Configuración de la ejecución del grafo
+        name: Nombre del servicio (database, home_assistant_controller, ...)
+
+    Returns:
+        El servicio o None si no se pasó
+    """
+    return ((config or {}).get("configurable") or {}).get(name)
 
 
-def detect_intents(state: Dict[str, Any]) -> Dict[str, Any]:
+async def detect_intents(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Nodo para verificar las intenciones detectadas
 
@@ -39,45 +47,25 @@ def detect_intents(state: Dict[str, Any]) -> Dict[str, Any]:
     return state
 
 
-def handle_general_inquiry(state: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_general_inquiry(state: Dict[str, Any]) -> Dict[str, Any]:
     messages = state["messages"]
-    intents = state["intents"]
-    business_info = state["business_info"]
-
-    # Mapeo de intenciones a respuestas predefinidas
-    intent_responses = {
-        "direccion": f"🏢 Nuestra dirección es: {business_info.get('direccion', 'No disponible')}",
-        "horario": f"🕒 Nuestro horario de atención es: {business_info.get('horario', 'No disponible')}",
-        "email": f"📧 Puedes contactarnos por email a: {business_info.get('email', 'No disponible')}",
-        "telefono1": f"📞 Nuestro teléfono principal es: {business_info.get('telefono_1', 'No disponible')}",
-        "telefono2": f"📞 Teléfono alternativo: {business_info.get('telefono_2', 'No disponible')}",
-        "telefono3": f"📞 Otro teléfono: {business_info.get('telefono_3', 'No disponible')}",
-        "whatsapp_servicio_tecnico": f"🔧 WhatsApp del servicio técnico: {business_info.get('whatsapp_servicio_tecnico', 'No disponible')}",
-        "whatsapp_ventas": f"📞 WhatsApp de ventas: {business_info.get('whatsapp_ventas', 'No disponible')}",
-        "whatsapp_administracion": f"📞 WhatsApp de administración: {business_info.get('whatsapp_administracion', 'No disponible')}",
-        "whatsapp_cobranza": f"📞 WhatsApp de cobranza: {business_info.get('whatsapp_cobranza', 'No disponible')}",
-        "security": f"🚨 Teléfono de Security 24: {business_info.get('security', 'No disponible')}",
-        "saludo": "👋 ¡Hola! Soy el asistente virtual de Taborra Alarmas SRL. ¿En qué puedo ayudarte hoy?",
-        "despedida": "👋 ¡Gracias por contactar a Taborra Alarmas SRL! Estamos para ayudarte cuando lo necesites.",
-        "agradecimiento": "🙏 De nada! Aqui estoy para lo que necesites de nuestros servicios! No dudes en preguntar si necesitas otra cosa."
-    }
 
-    # Si hay una intención específica detectada, usar respuesta predefinida
-    detected_intents = [i for i in intents if i in intent_responses]
-
-    if detected_intents:
-        # Si hay múltiples intenciones, combinar las respuestas
-        if len(detected_intents) > 1:
-            response = "\n\n".join([intent_responses[intent]
-                                   for intent in detected_intents])
-        else:
-            response = intent_responses[detected_intents[0]]
+    # Respuestas precompiladas con la información del negocio vigente; si hay
+    # varias intenciones se unen sus respuestas
+    response = business_response_cache.get(state["business_info"]).render(state["intents"])
 
+    if response:
         messages.append(AIMessage(content=response))
-        return {**state, "messages": messages}
+        # Si se llegó desde un troubleshooting activo, la consulta lo da por terminado
+        return {
+            **state,
+            "messages": messages,
+            "troubleshooting_active": False,
+            "troubleshooting_state": None
+        }
 
 
-def start_troubleshooting(state: Dict[str, Any]) -> Dict[str, Any]:
+async def start_troubleshooting(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Nodo para iniciar el flujo de resolución de problemas
 
@@ -90,14 +78,11 @@ def start_troubleshooting(state: Dict[str, Any]) -> Dict[str, Any]:
     # Preparar estado para el flujo de troubleshooting
 
     troubleshooting_state = {
-        "messages": state["messages"],
         "current_step": 0,
         "keyboard_type": None,
         "problem_type": None,
         "solutions_shown": [],
-        "rating": None,
-        "business_info": state["business_info"],
-        "user_data": state.get("user_data", None)
+        "rating": None
     }
 
     return {
@@ -107,123 +92,69 @@ def start_troubleshooting(state: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def process_troubleshooting(state: Dict[str, Any]) -> Dict[str, Any]:
+def troubleshooting_step(node: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable:
     """
-    Nodo para procesar el flujo de resolución de problemas
+    Adapta un nodo del grafo de troubleshooting como nodo del grafo de
+    conversación: el paso del flujo se ejecuta en la misma invocación que el
+    resto del turno, sin un subgrafo anidado por mensaje. Al terminar el
+    flujo con una calificación, la guarda en la base de datos.
+
+    Args:
+        node: Nodo del grafo de troubleshooting (TROUBLESHOOTING_NODES)
+
+    Returns:
+        Nodo asíncrono del grafo de conversación
     """
-    try:
-        # Obtener estado actual
-        troubleshooting_state = state["troubleshooting_state"]
-        current_step = troubleshooting_state.get("current_step", 0)
-
-        # IMPORTANTE: Actualizar los mensajes del troubleshooting_state con los mensajes actuales
-        troubleshooting_state["messages"] = state["messages"]
-
-        # Verificar primero si el usuario quiere salir (antes de cualquier otro procesamiento)
-        last_user_message = None
-        for msg in reversed(troubleshooting_state["messages"]):
-            if isinstance(msg, HumanMessage):
-                last_user_message = msg.content.lower()
-                break
-
-        # Lista ampliada de frases para salir
-        exit_phrases = [
-            "salir", "cancelar", "terminar", "no quiero seguir", "quiero hablar de otra cosa",
-            "volver", "atrás", "atras", "menu", "menú", "menu principal", "exit", "no", "chau",
-            "ya no", "stop", "parar", "no me interesa", "otro tema", "no gracias", "salida"
-        ]
-
-        # Si el usuario quiere salir, hacerlo inmediatamente
-        if last_user_message and any(phrase in last_user_message for phrase in exit_phrases):
-            print(f"Usuario solicitó salir con: '{last_user_message}'")
-            result = exit_flow(troubleshooting_state)
+    async def process_troubleshooting(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        try:
+            # Estado guardado del flujo completado con los mensajes y los
+            # datos del usuario y del negocio del turno actual
+            result = node(troubleshooting_flow_state(state))
+
+            # Verificar si hemos terminado
+            if result.get("current_step", -1) == 0:
+                print("Flujo de troubleshooting terminado")
+                await save_rating(state, result, get_service(config, "database"))
+                return {
+                    **state,
+                    "messages": result["messages"],
+                    "troubleshooting_active": False,
+                    "troubleshooting_state": None,
+                    "rating_info": {
+                        "rating": result.get("rating"),
+                        "keyboard_type": result.get("keyboard_type"),
+                        "problem_type": result.get("problem_type")
+                    }
+                }
+
+            print(f"Continuando flujo, próximo paso: {result.get('current_step')}")
+            # Continuar el flujo: en el estado de la conversación (y en su
+            # checkpoint) queda solo el estado propio del flujo
             return {
                 **state,
                 "messages": result["messages"],
-                "troubleshooting_active": False,
-                "troubleshooting_state": None
+                "troubleshooting_state": {key: value for key, value in result.items()
+                                          if key not in TROUBLESHOOTING_INPUT_KEYS}
             }
-
-        # Si no quiere salir, continuar con el flujo normal
-        print(f"Paso actual: {current_step}")
-
-        if current_step == 0:
-            # Paso inicial de confirmación
-            result = confirmation_step(troubleshooting_state)
-            print("Confirmación mostrada, pasando a paso 1")
-        elif current_step == 1:
-            # Verificar si el usuario quiere continuar
-            print("Procesando respuesta de confirmación")
-            user_confirmed = False
-
-            if last_user_message:
-                confirmation_phrases = ["si", "sí", "yes",
-                                        "quiero", "dale", "ok", "1", "aceptar"]
-                user_confirmed = any(phrase == last_user_message or phrase in last_user_message.split(
-                ) for phrase in confirmation_phrases)
-                print(f"¿Usuario confirmó?: {user_confirmed}")
-
-            if user_confirmed:
-                print("Usuario confirmó, mostrando opciones de teclado")
-                result = keyboard_selection(troubleshooting_state)
-            else:
-                print("Usuario no confirmó, saliendo del flujo")
-                result = exit_flow(troubleshooting_state)
-        elif current_step == 2:
-            # Procesar selección de teclado
-            print("Procesando selección de teclado")
-            result = process_keyboard_selection(troubleshooting_state)
-        elif current_step == 3:
-            # Procesar selección de problema
-            print("Procesando selección de problema")
-            result = process_problem_selection(troubleshooting_state)
-        elif current_step == 4:
-            # Procesar calificación
-            print("Procesando calificación")
-            result = process_rating(troubleshooting_state)
-        else:
-            # Paso no reconocido, salir del flujo
-            print(f"Paso no reconocido: {current_step}, saliendo")
-            result = exit_flow(troubleshooting_state)
-
-        # Verificar si hemos terminado
-        if result.get("current_step", -1) == 0:
-            print("Flujo de troubleshooting terminado")
+        except Exception as e:
+            print(f"Error en process_troubleshooting: {e}")
+            traceback.print_exc()
+            # Para cualquier error, salir del flujo con mensaje de error
+            messages = state["messages"]
+            messages.append(AIMessage(
+                content="Lo siento, hubo un problema con el asistente de resolución. Por favor, contacta directamente con nuestro servicio técnico."))
             return {
                 **state,
-                "messages": result["messages"],
+                "messages": messages,
                 "troubleshooting_active": False,
-                "troubleshooting_state": None,
-                "rating_info": {
-                    "rating": result.get("rating"),
-                    "keyboard_type": result.get("keyboard_type"),
-                    "problem_type": result.get("problem_type")
-                }
+                "troubleshooting_state": None
             }
 
-        print(f"Continuando flujo, próximo paso: {result.get('current_step')}")
-        # Continuar el flujo
-        return {
-            **state,
-            "messages": result["messages"],
-            "troubleshooting_state": result
-        }
-    except Exception as e:
-        print(f"Error en process_troubleshooting: {e}")
-        traceback.print_exc()
-        # Para cualquier error, salir del flujo con mensaje de error
-        messages = state["messages"]
-        messages.append(AIMessage(
-            content="Lo siento, hubo un problema con el asistente de resolución. Por favor, contacta directamente con nuestro servicio técnico."))
-        return {
-            **state,
-            "messages": messages,
-            "troubleshooting_active": False,
-            "troubleshooting_state": None
-        }
+    process_troubleshooting.__name__ = node.__name__
+    return process_troubleshooting
 
 
-def handle_general_response(state: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_general_response(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Nodo para responder cuando no se detectan intenciones
 
@@ -243,7 +174,7 @@ def handle_general_response(state: Dict[str, Any]) -> Dict[str, Any]:
     return {**state, "messages": messages}
 
 
-def handle_access_denied(state: Dict[str, Any]) -> Dict[str, Any]:
+async def handle_access_denied(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Nodo para manejar solicitudes de acceso denegado por nivel insuficiente
 
@@ -283,18 +214,52 @@ def handle_access_denied(state: Dict[str, Any]) -> Dict[str, Any]:
     return {**state, "messages": messages}
 
 
-# En src/graphs/handlers.py
+async def save_rating(state: Dict[str, Any], result: Dict[str, Any], database: Optional[Database]) -> None:
+    """
+    Guarda la calificación con la que terminó un flujo de troubleshooting.
 
-def handle_home_assistant_request(state: Dict[str, Any]) -> Dict[str, Any]:
+    Args:
+        state: Estado de la conversación
+        result: Estado final del flujo de troubleshooting
+        database: Servicio de base de datos
     """
-    Nodo para marcar que se necesita una acción de Home Assistant.
-    Este nodo no realiza operaciones asíncronas, solo prepara el estado.
+    rating = result.get("rating")
+    user_id = (state.get("user_data") or {}).get("id")
+    if rating is None:
+        return
+    if not database or not user_id:
+        print(
+            f"⚠️ No se pudo guardar la calificación del teléfono {(state.get('user_data') or {}).get('phone')}")
+        return
+
+    keyboard_type = result.get("keyboard_type") or "desconocido"
+    problem_type = result.get("problem_type") or "desconocido"
+    try:
+        await database.save_rating(
+            user_id=user_id,
+            rating=rating,
+            keyboard_type=keyboard_type,
+            problem_type=problem_type
+        )
+        print(
+            f"✅ Calificación {rating} guardada para usuario {user_id}, problema {problem_type}, teclado {keyboard_type}")
+    except Exception as e:
+        print(f"❌ Error al guardar calificación: {e}")
+
+
+async def handle_home_assistant_request(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+    """
+    Nodo que dispara en Home Assistant los métodos de las intenciones
+    detectadas. El resultado llega luego por el webhook de respuesta.
 
     Args:
         state: Estado actual de la conversación
+        config: Configuración del grafo con el controlador de Home Assistant
+            y el servicio de WhatsApp
 
     Returns:
-        Estado actualizado con información para Home Assistant
+        Estado actualizado con la respuesta para el usuario (response_sent
+        indica que ya se envió)
     """
     messages = state["messages"]
     user_data = state.get("user_data", {})
@@ -316,26 +281,41 @@ def handle_home_assistant_request(state: Dict[str, Any]) -> Dict[str, Any]:
             AIMessage(content="⚠️ No se pudo identificar tu información de usuario."))
         return {**state, "messages": messages}
 
-    # Agregar un mensaje genérico mientras procesamos
-    messages.append(
-        AIMessage(content="🔄 Procesando tu solicitud con Home Assistant, dame un momento..."))
+    ha_controller = get_service(config, "home_assistant_controller")
+    if not ha_controller:
+        messages.append(AIMessage(
+            content="⚠️ Home Assistant no está disponible en este momento. Por favor, intenta más tarde."))
+        return {**state, "messages": messages}
 
-    # Marcar en el estado que se necesita una acción de Home Assistant
-    # Esto será procesado por el controlador después de que el grafo termine
-    return {
-        **state,
-        "messages": messages,
-        "requires_home_assistant": True,
-        "ha_request": {
-            "user_id": user_id,
-            "phone": phone,
-            "intents": intents,
-            "last_message": state["messages"][-2].content if len(state["messages"]) >= 2 else ""
-        }
-    }
+    # Primero el aviso al usuario y después el disparo: la respuesta de Home
+    # Assistant llega por el webhook y puede adelantarse al aviso
+    processing = "🔄 Procesando tu solicitud con Home Assistant, dame un momento..."
+    whatsapp_service = get_service(config, "whatsapp_service")
+    if whatsapp_service:
+        await whatsapp_service.send_message(phone, processing)
+
+    errors = []
+    try:
+        for intent in intents:
+            result = await ha_controller.trigger_home_assistant(user_id, phone, intent)
+            if result.get("success"):
+                print(f"✅ Método {intent} ejecutado correctamente en Home Assistant.")
+                # El resultado se enviará cuando Home Assistant responda
+                messages.append(AIMessage(content=processing))
+                return {**state, "messages": messages, "response_sent": bool(whatsapp_service)}
+            print(f"❌ Error: {result.get('message')}")
+            errors.append(result.get("message"))
+    except Exception as e:
+        print(f"❌ Error al procesar solicitud de Home Assistant: {e}")
+        errors = [
+            "⚠️ Ocurrió un error al procesar tu solicitud a Home Assistant. Por favor, intenta más tarde."]
+
+    messages.append(AIMessage(content="\n\n".join(errors) or
+                              "⚠️ No se pudo procesar tu solicitud con Home Assistant."))
+    return {**state, "messages": messages}
 
 
-def finalize_response(state: Dict[str, Any]) -> Dict[str, Any]:
+async def finalize_response(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Nodo final que marca el término del procesamiento
 
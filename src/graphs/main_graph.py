@@ -3,18 +3,23 @@ Grafo principal para el sistema de conversación del chatbot.
 """
 from typing import Dict, Any, List, TypedDict, Optional
 from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph
 from src.graphs.handlers import (
     detect_intents,
     handle_general_inquiry,
     handle_home_assistant_request,
     start_troubleshooting,
-    process_troubleshooting,
+    troubleshooting_step,
     handle_general_response,
     handle_access_denied,
     finalize_response
 )
-from src.graphs.routers import route_main_conversation
+from src.graphs.registry import graph_registry
+from src.graphs.routers import (TROUBLESHOOTING_NODE_PREFIX, TROUBLESHOOTING_STEPS, route_conversation,
+                                route_troubleshooting_step)
+from src.graphs.troubleshooting import TROUBLESHOOTING_NODES
+from src.graphs.tracing import graph_tracer
 
 # Definir el tipo del estado
 
@@ -29,13 +34,45 @@ class ConversationState(TypedDict):
     troubleshooting_active: bool
     troubleshooting_state: Optional[Dict[str, Any]]
     rating_info: Optional[Dict[str, Any]]
-    requires_home_assistant: Optional[bool]
-    ha_request: Optional[Dict[str, Any]]
+    response_sent: bool
 
 
-def create_conversation_graph():
+# Canales que el controlador arma en cada mensaje: no se guardan en los
+# checkpoints, solo el estado de los flujos (troubleshooting)
+CONVERSATION_INPUT_CHANNELS = ("messages", "user_data", "user_level", "intents", "context", "business_info",
+                               "response_sent")
+
+# Pasos del troubleshooting: los nodos del grafo de troubleshooting como
+# nodos del grafo principal (un paso por mensaje, en la misma ejecución)
+TROUBLESHOOTING_STEP_NODES = {
+    TROUBLESHOOTING_NODE_PREFIX + name: troubleshooting_step(node)
+    for name, node in TROUBLESHOOTING_NODES.items()
+}
+
+# Nodos del grafo principal
+CONVERSATION_NODES = {
+    "DETECT_INTENTS": detect_intents,
+    "GENERAL_INQUIRY": handle_general_inquiry,
+    "HOME_ASSISTANT_REQUEST": handle_home_assistant_request,
+    "START_TROUBLESHOOTING": start_troubleshooting,
+    **TROUBLESHOOTING_STEP_NODES,
+    "GENERAL_RESPONSE": handle_general_response,
+    "ACCESS_DENIED": handle_access_denied,
+    "FINAL": finalize_response
+}
+
+
+def create_conversation_graph(checkpointer: Optional[BaseCheckpointSaver] = None):
     """
-    Crea y retorna el grafo principal de conversación.
+    Crea y retorna el grafo principal de conversación. Los nodos son
+    asíncronos: el grafo se ejecuta con `ainvoke`, pasando los servicios
+    compartidos en config["configurable"]. En la aplicación se usa la
+    instancia compilada de graph_registry.get("conversation"), con el
+    checkpointer de Redis que guarda el estado de cada hilo (teléfono:chat).
+
+    Args:
+        checkpointer: Checkpointer del estado entre mensajes (opcional; sin
+            él, el estado de los flujos se pasa en cada invocación)
 
     Returns:
         Grafo compilado listo para ser invocado
@@ -43,38 +80,37 @@ def create_conversation_graph():
     # Construir el grafo
     conversation_graph = StateGraph(ConversationState)
 
-    # Añadir nodos
-    conversation_graph.add_node("DETECT_INTENTS", detect_intents)
-    conversation_graph.add_node("GENERAL_INQUIRY", handle_general_inquiry)
-    conversation_graph.add_node(
-        "HOME_ASSISTANT_REQUEST", handle_home_assistant_request)
-    conversation_graph.add_node("START_TROUBLESHOOTING", start_troubleshooting)
-    conversation_graph.add_node("TROUBLESHOOTING", process_troubleshooting)
-    conversation_graph.add_node("GENERAL_RESPONSE", handle_general_response)
-    conversation_graph.add_node("ACCESS_DENIED", handle_access_denied)
-    conversation_graph.add_node("FINAL", finalize_response)
-
-    # Añadir enrutamiento condicional desde DETECT_INTENTS
+    # Añadir nodos, instrumentados
+    for name, node in CONVERSATION_NODES.items():
+        conversation_graph.add_node(name, graph_tracer.node("conversation", name, node))
+
+    # Añadir enrutamiento condicional desde DETECT_INTENTS; un flujo de
+    # troubleshooting activo va directo al nodo de su paso
     conversation_graph.add_conditional_edges(
         "DETECT_INTENTS",
-        route_main_conversation,
+        graph_tracer.router("conversation", "route_conversation", route_conversation),
         {
             "GENERAL_INQUIRY": "GENERAL_INQUIRY",
             "HOME_ASSISTANT_REQUEST": "HOME_ASSISTANT_REQUEST",
             "START_TROUBLESHOOTING": "START_TROUBLESHOOTING",
-            "TROUBLESHOOTING": "TROUBLESHOOTING",
+            **{name: name for name in TROUBLESHOOTING_STEP_NODES},
             "GENERAL_RESPONSE": "GENERAL_RESPONSE",
             "ACCESS_DENIED": "ACCESS_DENIED"
         }
     )
 
-    # Añadir bordes directos
-    conversation_graph.add_edge("START_TROUBLESHOOTING", "TROUBLESHOOTING")
+    # Al iniciar el troubleshooting, el primer paso según la tabla de transiciones
+    conversation_graph.add_conditional_edges(
+        "START_TROUBLESHOOTING",
+        graph_tracer.router("conversation", "route_troubleshooting_step", route_troubleshooting_step),
+        {name: name for name in TROUBLESHOOTING_STEP_NODES}
+    )
 
     # Todos los nodos finalizan en el nodo FINAL
     conversation_graph.add_edge("GENERAL_INQUIRY", "FINAL")
     conversation_graph.add_edge("HOME_ASSISTANT_REQUEST", "FINAL")
-    conversation_graph.add_edge("TROUBLESHOOTING", "FINAL")
+    for name in TROUBLESHOOTING_STEP_NODES:
+        conversation_graph.add_edge(name, "FINAL")
     conversation_graph.add_edge("GENERAL_RESPONSE", "FINAL")
     conversation_graph.add_edge("ACCESS_DENIED", "FINAL")
 
@@ -83,4 +119,12 @@ def create_conversation_graph():
     conversation_graph.set_finish_point("FINAL")
 
     # Compilar el grafo
-    return conversation_graph.compile()
+    return conversation_graph.compile(checkpointer=checkpointer)
+
+
+# El registro valida que existan todos los nodos, incluidos los destinos de la
+# tabla de transiciones del troubleshooting y su salida
+TROUBLESHOOTING_TARGETS = {"EXIT"} | {
+    node for step in TROUBLESHOOTING_STEPS.values() for node in step["transitions"].values()}
+graph_registry.register("conversation", create_conversation_graph, [
+    *CONVERSATION_NODES, *(TROUBLESHOOTING_NODE_PREFIX + node for node in sorted(TROUBLESHOOTING_TARGETS))])
@@ -0,0 +1,160 @@
+# src/graphs/registry.py
+"""
+Registro de grafos compilados.
+
+Cada módulo de grafos registra su función de construcción; el registro los
+compila y valida una única vez al iniciar el proceso (ServiceContainer.start)
+y entrega siempre el mismo objeto compilado. Los grafos compilados no guardan
+estado entre ejecuciones, así que todos los controladores y mensajes pueden
+compartirlos.
+"""
+import time
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+START_NODE = "__start__"
+END_NODE = "__end__"
+
+
+class GraphRegistry:
+    def __init__(self):
+        """
+        Inicializa el registro vacío.
+        """
+        self.factories: Dict[str, Callable[[], Any]] = {}
+        self.required_nodes: Dict[str, Tuple[str, ...]] = {}
+        self.checkpointers: Dict[str, Any] = {}
+        self.graphs: Dict[str, Any] = {}
+
+        # Métricas
+        self.compile_ms: Dict[str, float] = {}
+        self.lookups = 0
+
+    def register(self, name: str, factory: Callable[[], Any], required_nodes: Iterable[str] = ()) -> None:
+        """
+        Registra la función que construye y compila un grafo.
+
+        Args:
+            name: Nombre del grafo
+            factory: Función sin argumentos que devuelve el grafo compilado
+            required_nodes: Nodos que el grafo compilado debe contener
+        """
+        self.factories[name] = factory
+        self.required_nodes[name] = tuple(required_nodes)
+        self.graphs.pop(name, None)
+
+    def set_checkpointer(self, name: str, checkpointer: Any) -> None:
+        """
+        Asigna el checkpointer con el que se compila un grafo (su función de
+        construcción debe aceptar el argumento checkpointer). Si cambia, el
+        grafo se vuelve a compilar en la próxima consulta.
+
+        Args:
+            name: Nombre del grafo
+            checkpointer: Checkpointer de LangGraph
+        """
+        if self.checkpointers.get(name) is not checkpointer:
+            self.checkpointers[name] = checkpointer
+            self.graphs.pop(name, None)
+
+    def compile(self, name: str) -> Any:
+        """
+        Compila y valida un grafo registrado, reemplazando el anterior.
+
+        Args:
+            name: Nombre del grafo
+
+        Returns:
+            Grafo compilado
+
+        Raises:
+            KeyError: Si el grafo no está registrado
+            ValueError: Si el grafo compilado no pasa la validación
+        """
+        start = time.perf_counter()
+        checkpointer = self.checkpointers.get(name)
+        factory = self.factories[name]
+        graph = factory(checkpointer=checkpointer) if checkpointer is not None else factory()
+        self.validate(name, graph, self.required_nodes[name])
+        self.compile_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+        self.graphs[name] = graph
+        return graph
+
+    def compile_all(self) -> None:
+        """
+        Compila y valida todos los grafos registrados.
+        """
+        for name in self.factories:
+            self.compile(name)
+        print("✅ Grafos compilados: " + ", ".join(
+            f"{name} ({ms} ms)" for name, ms in self.compile_ms.items()))
+
+    def get(self, name: str) -> Any:
+        """
+        Devuelve el grafo compilado compartido (lo compila si todavía no se
+        hizo, por ejemplo en scripts que no usan el contenedor).
+
+        Args:
+            name: Nombre del grafo
+
+        Returns:
+            Grafo compilado
+        """
+        self.lookups += 1
+        graph = self.graphs.get(name)
+        if graph is None:
+            graph = self.compile(name)
+        return graph
+
+    @staticmethod
+    def validate(name: str, graph: Any, required_nodes: Iterable[str] = ()) -> None:
+        """
+        Verifica que el grafo tenga los nodos esperados, que todos sean
+        alcanzables desde la entrada y que desde todos se llegue al final.
+
+        Args:
+            name: Nombre del grafo (para el mensaje de error)
+            graph: Grafo compilado
+            required_nodes: Nodos que el grafo debe contener
+
+        Raises:
+            ValueError: Si el grafo no es válido
+        """
+        drawable = graph.get_graph()
+        nodes = set(drawable.nodes)
+        missing = [node for node in required_nodes if node not in nodes]
+        if missing:
+            raise ValueError(f"❌ Al grafo {name} le faltan los nodos {missing}")
+
+        forward: Dict[str, set] = {node: set() for node in nodes}
+        backward: Dict[str, set] = {node: set() for node in nodes}
+        for edge in drawable.edges:
+            forward[edge.source].add(edge.target)
+            backward[edge.target].add(edge.source)
+
+        def reachable(origin: str, adjacency: Dict[str, set]) -> set:
+            seen, pending = {origin}, [origin]
+            while pending:
+                for node in adjacency[pending.pop()] - seen:
+                    seen.add(node)
+                    pending.append(node)
+            return seen
+
+        unreachable = nodes - reachable(START_NODE, forward)
+        if unreachable:
+            raise ValueError(f"❌ Nodos inalcanzables en el grafo {name}: {sorted(unreachable)}")
+        dead_ends = nodes - reachable(END_NODE, backward)
+        if dead_ends:
+            raise ValueError(f"❌ Nodos sin salida en el grafo {name}: {sorted(dead_ends)}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Grafos compilados, tiempo de compilación y consultas."""
+        return {
+            "compiled": sorted(self.graphs),
+            "checkpointed": sorted(self.checkpointers),
+            "compile_ms": dict(self.compile_ms),
+            "lookups": self.lookups
+        }
+
+
+# Registro compartido por todo el proceso
+graph_registry = GraphRegistry()
@@ -1,8 +1,40 @@
 """
 Funciones de enrutamiento para los grafos de conversación.
 """
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from langchain_core.messages import HumanMessage
+from src.template.prompts import TROUBLESHOOTING_PHRASES
+from src.utils.phrase_matcher import PhraseMatcher
+
+GENERAL_INTENTS = ["direccion", "horario", "email", "telefono1", "telefono2", "telefono3", "whatsapp",
+                   "whatsapp_servicio_tecnico", "whatsapp_ventas",
+                   "whatsapp_administracion", "whatsapp_cobranza",
+                   "security", "saludo", "despedida", "agradecimiento"]
+
+# Consultas que, detectadas durante el troubleshooting, lo interrumpen.
+# Saludos, despedidas y agradecimientos los maneja el propio flujo.
+TROUBLESHOOTING_ESCAPE_INTENTS = ["direccion", "horario", "email", "telefono1", "telefono2", "telefono3",
+                                  "whatsapp_servicio_tecnico", "whatsapp_ventas",
+                                  "whatsapp_administracion", "whatsapp_cobranza", "security"]
+
+# Autómata único con las frases de salida y confirmación del troubleshooting
+TROUBLESHOOTING_PHRASE_MATCHER = PhraseMatcher(TROUBLESHOOTING_PHRASES)
+
+# Máquina de estados del troubleshooting: por paso, si espera una respuesta
+# estructurada (número de menú, modelo, problema o confirmación) y el nodo
+# que procesa cada evento del mensaje ("default" para el resto). Un evento
+# "exit" termina el flujo en cualquier paso.
+TROUBLESHOOTING_STEPS = {
+    0: {"structured_input": False, "transitions": {"default": "CONFIRMATION"}},
+    1: {"structured_input": True, "transitions": {"confirm": "KEYBOARD_SELECTION", "default": "EXIT"}},
+    2: {"structured_input": True, "transitions": {"default": "PROCESS_KEYBOARD"}},
+    3: {"structured_input": True, "transitions": {"default": "PROCESS_PROBLEM"}},
+    4: {"structured_input": True, "transitions": {"default": "PROCESS_RATING"}},
+}
+
+
+# Prefijo de los nodos del troubleshooting dentro del grafo de conversación
+TROUBLESHOOTING_NODE_PREFIX = "TROUBLESHOOTING_"
 
 
 def route_main_conversation(state: Dict[str, Any]) -> str:
@@ -16,15 +48,14 @@ def route_main_conversation(state: Dict[str, Any]) -> str:
     Returns:
         Nombre del nodo al que dirigir el flujo
     """
-    # Intenciones generales de información para cualquier nivel
-
     if state.get("troubleshooting_active", False):
+        # Una consulta de información en texto libre interrumpe el flujo
+        if any(intent in state.get("intents", []) for intent in TROUBLESHOOTING_ESCAPE_INTENTS):
+            return "GENERAL_INQUIRY"
         return "TROUBLESHOOTING"
 
-    general_intents = ["direccion", "horario", "email", "telefono1", "telefono2", "telefono3", "whatsapp",
-                       "whatsapp_servicio_tecnico", "whatsapp_ventas",
-                       "whatsapp_administracion", "whatsapp_cobranza",
-                       "security", "saludo", "despedida", "agradecimiento"]
+    # Intenciones generales de información para cualquier nivel
+    general_intents = GENERAL_INTENTS
 
     intents = state["intents"]
     user_level = state["user_level"]
@@ -52,46 +83,97 @@ def route_main_conversation(state: Dict[str, Any]) -> str:
     return "GENERAL_RESPONSE"
 
 
+def troubleshooting_event(message: Optional[str], current_step: Optional[int] = None) -> str:
+    """
+    Clasifica el mensaje del usuario en un evento de la máquina de estados
+    del troubleshooting.
+
+    Args:
+        message: Último mensaje del usuario
+        current_step: Paso actual del flujo (opcional)
+
+    Returns:
+        "exit", "confirm" o "default"
+    """
+    if not message:
+        return "default"
+    categories, only_phrases = TROUBLESHOOTING_PHRASE_MATCHER.scan(message)
+    if "exit" in categories:
+        return "exit"
+    # "no", "volver", ... solo salen si el mensaje no tiene otras palabras
+    # ("no", "ok no") o en la confirmación
+    if "exit_alone" in categories and (only_phrases or current_step == 1):
+        return "exit"
+    if "confirm" in categories:
+        return "confirm"
+    return "default"
+
+
 def route_troubleshooting(state: Dict[str, Any]) -> str:
     """
-    Enrutador para el grafo de troubleshooting.
-    Determina el siguiente paso en el flujo de resolución de problemas.
+    Enrutador de entrada del grafo de troubleshooting.
+    Cada mensaje del usuario avanza un único paso: el nodo sale de la tabla
+    de transiciones del paso actual según el evento del mensaje.
 
     Args:
         state: Estado actual del proceso de troubleshooting
 
     Returns:
-        Nombre del siguiente nodo en el flujo
+        Nombre del nodo que procesa el mensaje
+    """
+    current_step = state.get("current_step", 0)
+
+    # Último mensaje del usuario
+    last_user_message = None
+    for msg in reversed(state.get("messages", [])):
+        if isinstance(msg, HumanMessage):
+            last_user_message = msg.content.lower()
+            break
+
+    event = troubleshooting_event(last_user_message, current_step)
+    if event == "exit":
+        print(f"Usuario solicitó salir con: '{last_user_message}'")
+        return "EXIT"
+
+    step = TROUBLESHOOTING_STEPS.get(current_step)
+    if step is None:
+        print(f"Paso no reconocido: {current_step}, saliendo")
+        return "EXIT"
+
+    print(f"Paso actual: {current_step}, evento: {event}")
+    transitions = step["transitions"]
+    return transitions.get(event, transitions["default"])
+
+
+def route_troubleshooting_step(state: Dict[str, Any]) -> str:
+    """
+    Enrutador del troubleshooting dentro del grafo de conversación: aplica
+    la tabla de transiciones al paso guardado del flujo y al mensaje del turno.
+
+    Args:
+        state: Estado actual de la conversación
+
+    Returns:
+        Nombre del nodo del paso en el grafo de conversación
+    """
+    flow = state.get("troubleshooting_state") or {}
+    return TROUBLESHOOTING_NODE_PREFIX + route_troubleshooting(
+        {"current_step": flow.get("current_step", 0), "messages": state.get("messages", [])})
+
+
+def route_conversation(state: Dict[str, Any]) -> str:
+    """
+    Enrutador del grafo de conversación después de detectar las intenciones:
+    el destino de route_main_conversation o, si es el troubleshooting, el
+    nodo del paso que procesa el mensaje.
+
+    Args:
+        state: Estado actual de la conversación
+
+    Returns:
+        Nombre del nodo al que dirigir el flujo
     """
-    current_step = state["current_step"]
-
-    # Verificar si el usuario quiere salir
-    if len(state["messages"]) > 0 and isinstance(state["messages"][-1], HumanMessage):
-        last_msg = state["messages"][-1].content.lower()
-        exit_phrases = ["salir", "cancelar", "terminar", "no quiero seguir", "quiero hablar de otra cosa",
-                        "volver", "atrás", "atras", "menu", "menú", "menu principal"]
-        if any(phrase in last_msg for phrase in exit_phrases):
-            return "EXIT"
-
-    # Enrutar basado en el paso actual
-    if current_step == 0:
-        return "CONFIRMATION"
-    elif current_step == 1:
-        if len(state["messages"]) > 0 and isinstance(state["messages"][-1], HumanMessage):
-            last_msg = state["messages"][-1].content.lower()
-            confirmation_phrases = ["si", "sí", "yes", "Si", "SI", "SÍ", "quiero", "quiero seguir",
-                                    "quiero continuar", "quiero seguir con esto", "quiero continuar con esto",
-                                    "quiero", "dale", "ok", "1", "aceptar"]
-            if any(phrase == last_msg or phrase in last_msg.split() for phrase in confirmation_phrases):
-                return "KEYBOARD_SELECTION"
-            else:
-                return "EXIT"
-        return "CONFIRMATION"
-    elif current_step == 2:
-        return "PROCESS_KEYBOARD"
-    elif current_step == 3:
-        return "PROCESS_PROBLEM"
-    elif current_step == 4:
-        return "PROCESS_RATING"
-
-    return "EXIT"
+    destination = route_main_conversation(state)
+    if destination == "TROUBLESHOOTING":
+        return route_troubleshooting_step(state)
+    return destination
@@ -0,0 +1,170 @@
+# src/graphs/tracing.py
+"""
+Instrumentación de los grafos de conversación.
+
+Los nodos y enrutadores se envuelven al construir cada grafo. Por cada
+ejecución de un nodo se registra su duración (con estado ok/error) y la
+cantidad de mensajes de entrada y salida, y por cada decisión de un
+enrutador su duración y el destino elegido, todo en los histogramas
+compartidos de src.utils.metrics. Los nodos que superan el umbral se
+registran como lentos junto con el chat.
+"""
+import inspect
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from langchain_core.runnables import RunnableConfig
+from src.config.settings import settings
+from src.utils.metrics import HistogramRegistry, histograms
+
+# Buckets para la cantidad de mensajes del estado
+MESSAGE_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class GraphTracer:
+    def __init__(
+        self,
+        registry: Optional[HistogramRegistry] = None,
+        enabled: Optional[bool] = None,
+        slow_node_ms: Optional[float] = None,
+        recent_slow: int = 50
+    ):
+        """
+        Inicializa el instrumentador.
+
+        Args:
+            registry: Registro de histogramas (opcional, el compartido)
+            enabled: Si se instrumentan los grafos (opcional, desde settings)
+            slow_node_ms: Umbral de nodo lento en ms (opcional, desde settings)
+            recent_slow: Cantidad de nodos lentos recientes conservados
+        """
+        self.registry = registry or histograms
+        self.enabled = settings.GRAPH_TRACING_ENABLED if enabled is None else enabled
+        self.slow_node_ms = slow_node_ms or settings.GRAPH_SLOW_NODE_MS
+        self.recent_slow = deque(maxlen=recent_slow)
+
+        # Métricas
+        self.slow_nodes = 0
+        self.errors = 0
+
+    def node(self, graph: str, name: str, fn: Callable) -> Callable:
+        """
+        Envuelve un nodo para medirlo. Los nodos asíncronos siguen siendo
+        asíncronos y los síncronos, síncronos; el nodo recibe config solo si
+        lo declara.
+
+        Args:
+            graph: Nombre del grafo
+            name: Nombre del nodo
+            fn: Función del nodo
+
+        Returns:
+            Nodo instrumentado (o el mismo si la instrumentación está apagada)
+        """
+        if not self.enabled:
+            return fn
+        wants_config = "config" in inspect.signature(fn).parameters
+
+        # Sin functools.wraps: LangGraph inspecciona la firma para decidir si
+        # pasa config (solo si el parámetro está anotado como RunnableConfig),
+        # y el envoltorio siempre lo necesita (servicios del nodo y chat de los
+        # nodos lentos)
+        if inspect.iscoroutinefunction(fn):
+            async def traced_async(state: Dict[str, Any], config: RunnableConfig):
+                start, messages_in = time.perf_counter(), _message_count(state)
+                try:
+                    result = await (fn(state, config) if wants_config else fn(state))
+                except Exception as e:
+                    self._record(graph, name, start, messages_in, None, config, e)
+                    raise
+                self._record(graph, name, start, messages_in, result, config)
+                return result
+            traced_async.__name__ = fn.__name__
+            return traced_async
+
+        def traced(state: Dict[str, Any], config: RunnableConfig):
+            start, messages_in = time.perf_counter(), _message_count(state)
+            try:
+                result = fn(state, config) if wants_config else fn(state)
+            except Exception as e:
+                self._record(graph, name, start, messages_in, None, config, e)
+                raise
+            self._record(graph, name, start, messages_in, result, config)
+            return result
+        traced.__name__ = fn.__name__
+        return traced
+
+    def router(self, graph: str, name: str, fn: Callable[[Dict[str, Any]], str]) -> Callable[[Dict[str, Any]], str]:
+        """
+        Envuelve un enrutador para medir cada decisión.
+
+        Args:
+            graph: Nombre del grafo
+            name: Nombre del enrutador
+            fn: Función de enrutamiento
+
+        Returns:
+            Enrutador instrumentado (o el mismo si la instrumentación está apagada)
+        """
+        if not self.enabled:
+            return fn
+
+        def traced(state: Dict[str, Any]) -> str:
+            start = time.perf_counter()
+            decision = fn(state)
+            self.registry.observe("graph_route_duration_ms", (time.perf_counter() - start) * 1000,
+                                  graph=graph, router=name, decision=decision)
+            return decision
+        traced.__name__ = fn.__name__
+        return traced
+
+    def _record(
+        self,
+        graph: str,
+        name: str,
+        start: float,
+        messages_in: int,
+        result: Any,
+        config: Optional[Dict[str, Any]],
+        error: Optional[Exception] = None
+    ) -> None:
+        """Registra una ejecución de un nodo y, si fue lenta, la informa."""
+        duration_ms = (time.perf_counter() - start) * 1000
+        self.registry.observe("graph_node_duration_ms", duration_ms,
+                              graph=graph, node=name, status="error" if error else "ok")
+        self.registry.observe("graph_node_messages", messages_in, MESSAGE_COUNT_BUCKETS,
+                              graph=graph, node=name, direction="in")
+        if error:
+            self.errors += 1
+            print(f"❌ Error en el nodo {graph}.{name}: {error}")
+        else:
+            self.registry.observe("graph_node_messages", _message_count(result), MESSAGE_COUNT_BUCKETS,
+                                  graph=graph, node=name, direction="out")
+
+        if duration_ms >= self.slow_node_ms:
+            chat_id = ((config or {}).get("configurable") or {}).get("chat_id")
+            self.slow_nodes += 1
+            self.recent_slow.append({"graph": graph, "node": name, "ms": round(duration_ms, 1),
+                                     "chat_id": chat_id, "at": time.time()})
+            print(f"🐢 Nodo lento {graph}.{name}: {duration_ms:.0f} ms (chat {chat_id})")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Nodos lentos, errores y los últimos nodos lentos."""
+        return {
+            "enabled": self.enabled,
+            "slow_node_ms": self.slow_node_ms,
+            "slow_nodes": self.slow_nodes,
+            "errors": self.errors,
+            "recent_slow": list(self.recent_slow)
+        }
+
+
+def _message_count(state: Any) -> int:
+    """Cantidad de mensajes del estado (0 si no tiene)."""
+    if not isinstance(state, dict):
+        return 0
+    return len(state.get("messages") or ())
+
+
+# Instrumentador compartido por todos los grafos
+graph_tracer = GraphTracer()
@@ -1,17 +1,18 @@
 """
-Grafo de resolución de problemas para la alarma.
+Pasos del flujo de resolución de problemas para la alarma.
+
+Cada paso es un nodo del grafo de conversación (ver main_graph): la tabla de
+transiciones de routers elige el paso que procesa cada mensaje.
 """
 from typing import Dict, Any, List, TypedDict, Optional
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langgraph.graph import StateGraph
-from src.template.keyboard_types import KEYBOARD_TYPES, get_keyboard_options_text, get_problems_options_text, generate_solution_response
-from src.graphs.routers import route_troubleshooting
-from src.core.database import Database
-
-# Definición del tipo de estado
-db = Database()
+from src.template.keyboard_types import (KEYBOARD_TYPES, KEYBOARD_INDEX, PROBLEM_INDEXES, normalize_option,
+                                         get_keyboard_options_text, get_problems_options_text,
+                                         generate_solution_response)
+from src.graphs.routers import TROUBLESHOOTING_PHRASE_MATCHER, TROUBLESHOOTING_STEPS
 
 
+# Definición del tipo de estado
 class TroubleshootingState(TypedDict):
     messages: List[BaseMessage]
     current_step: int
@@ -20,6 +21,62 @@ class TroubleshootingState(TypedDict):
     solutions_shown: List[str]
     rating: Optional[int]
     business_info: Dict[str, Any]
+    user_data: Optional[Dict[str, Any]]
+
+
+# Campos que el flujo recibe de la conversación en cada mensaje; no forman
+# parte del estado guardado del flujo
+TROUBLESHOOTING_INPUT_KEYS = ("messages", "business_info", "user_data")
+
+
+def troubleshooting_flow_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Arma el estado del flujo para sus nodos: el guardado en la conversación
+    completado con los mensajes y los datos del usuario y del negocio del turno.
+
+    Args:
+        state: Estado de la conversación con troubleshooting_state
+
+    Returns:
+        Estado del flujo de troubleshooting
+    """
+    return {**state["troubleshooting_state"], **{key: state.get(key) for key in TROUBLESHOOTING_INPUT_KEYS}}
+
+
+def is_structured_troubleshooting_input(state: Dict[str, Any], text: str) -> bool:
+    """
+    Indica si un mensaje es la respuesta esperada por el paso actual del
+    flujo (confirmación, número de menú, modelo/problema o calificación),
+    en cuyo caso no hace falta clasificar sus intenciones.
+
+    Args:
+        state: Estado del flujo de troubleshooting
+        text: Texto del usuario
+
+    Returns:
+        True si el mensaje es una respuesta estructurada del paso actual
+    """
+    current_step = state.get("current_step", 0)
+    if not TROUBLESHOOTING_STEPS.get(current_step, {}).get("structured_input"):
+        return False
+
+    message = normalize_option(text)
+    if message.isdigit():
+        return True
+
+    if current_step == 1:
+        # Solo confirmaciones o negativas de la tabla ("si", "dale", "no
+        # gracias"); cualquier otro texto puede ser una consulta y se clasifica
+        return TROUBLESHOOTING_PHRASE_MATCHER.scan(text)[1]
+    if current_step == 2:
+        return KEYBOARD_INDEX.select(message) is not None
+    if current_step == 3:
+        index = PROBLEM_INDEXES.get(state.get("keyboard_type"))
+        return bool(index) and index.select(message) is not None
+
+    # Paso 4: cualquier texto libre puede ser una consulta nueva
+    return False
+
 
 # Handlers para cada paso del flujo
 
@@ -91,20 +148,8 @@ def process_keyboard_selection(state: TroubleshootingState) -> TroubleshootingSt
             user_message = msg.content
             break
 
-    selected_keyboard = None
-
-    # Verificar selección por número
-    if user_message.isdigit():
-        idx = int(user_message) - 1
-        keys = list(KEYBOARD_TYPES.keys())
-        if 0 <= idx < len(keys):
-            selected_keyboard = keys[idx]
-    else:
-        # Determinar qué teclado seleccionó por nombre
-        for key, keyboard in KEYBOARD_TYPES.items():
-            if keyboard["name"].lower() in user_message.lower() or key.lower() in user_message.lower():
-                selected_keyboard = key
-                break
+    # Selección por número, clave o nombre con el índice precomputado
+    selected_keyboard = KEYBOARD_INDEX.select(user_message)
 
     if not selected_keyboard:
         # No pudimos identificar el teclado
@@ -163,22 +208,11 @@ def process_problem_selection(state: TroubleshootingState) -> TroubleshootingSta
             AIMessage(content="Lo siento, ocurrió un error. Vamos a comenzar de nuevo."))
         return {**state, "messages": messages, "current_step": 1}
 
-    keyboard = KEYBOARD_TYPES.get(keyboard_type, {})
-    problems = keyboard.get("problems", {})
-
-    selected_problem = None
-    # Verificar selección por número
-    if user_message.isdigit():
-        idx = int(user_message) - 1
-        keys = list(problems.keys())
-        if 0 <= idx < len(keys):
-            selected_problem = keys[idx]
-    else:
-        # Determinar qué problema seleccionó por nombre
-        for key, problem in problems.items():
-            if problem["title"].lower() in user_message.lower() or key.lower() in user_message.lower():
-                selected_problem = key
-                break
+    problems = KEYBOARD_TYPES.get(keyboard_type, {}).get("problems", {})
+
+    # Selección por número, clave o título con el índice precomputado
+    index = PROBLEM_INDEXES.get(keyboard_type)
+    selected_problem = index.select(user_message) if index else None
 
     if not selected_problem:
         # No pudimos identificar el problema
@@ -264,77 +298,12 @@ def exit_flow(state: TroubleshootingState) -> TroubleshootingState:
     return {**state, "messages": messages, "current_step": 0}
 
 
-def create_troubleshooting_graph():
-    """
-    Crea y retorna el grafo de resolución de problemas
-
-    Returns:
-        Grafo compilado listo para ser invocado
-    """
-    # Construir el grafo
-    troubleshooting_graph = StateGraph(TroubleshootingState)
-
-    # Añadir nodos
-    troubleshooting_graph.add_node("CONFIRMATION", confirmation_step)
-    troubleshooting_graph.add_node("KEYBOARD_SELECTION", keyboard_selection)
-    troubleshooting_graph.add_node(
-        "PROCESS_KEYBOARD", process_keyboard_selection)
-    troubleshooting_graph.add_node(
-        "PROCESS_PROBLEM", process_problem_selection)
-    troubleshooting_graph.add_node("PROCESS_RATING", process_rating)
-    troubleshooting_graph.add_node("EXIT", exit_flow)
-
-    # Añadir enrutador condicional
-    troubleshooting_graph.add_conditional_edges(
-        "CONFIRMATION",
-        route_troubleshooting,
-        {
-            "KEYBOARD_SELECTION": "KEYBOARD_SELECTION",
-            "EXIT": "EXIT",
-        }
-    )
-
-    troubleshooting_graph.add_conditional_edges(
-        "KEYBOARD_SELECTION",
-        route_troubleshooting,
-        {
-            "PROCESS_KEYBOARD": "PROCESS_KEYBOARD",
-            "EXIT": "EXIT"
-        }
-    )
-
-    troubleshooting_graph.add_conditional_edges(
-        "PROCESS_KEYBOARD",
-        route_troubleshooting,
-        {
-            "PROCESS_PROBLEM": "PROCESS_PROBLEM",
-            "EXIT": "EXIT"
-        }
-    )
-
-    troubleshooting_graph.add_conditional_edges(
-        "PROCESS_PROBLEM",
-        route_troubleshooting,
-        {
-            "PROCESS_RATING": "PROCESS_RATING",
-            "EXIT": "EXIT"
-        }
-    )
-
-    troubleshooting_graph.add_conditional_edges(
-        "PROCESS_RATING",
-        route_troubleshooting,
-        {
-            "CONFIRMATION": "CONFIRMATION",
-            "EXIT": "EXIT"
-        }
-    )
-
-    # Define el punto de entrada
-    troubleshooting_graph.set_entry_point("CONFIRMATION")
-
-    # Define el punto de terminación
-    troubleshooting_graph.set_finish_point("EXIT")
-
-    # Compilar el grafo
-    return troubleshooting_graph.compile()
+# Nodos del grafo: los destinos de la tabla de transiciones y la salida
+TROUBLESHOOTING_NODES = {
+    "CONFIRMATION": confirmation_step,
+    "KEYBOARD_SELECTION": keyboard_selection,
+    "PROCESS_KEYBOARD": process_keyboard_selection,
+    "PROCESS_PROBLEM": process_problem_selection,
+    "PROCESS_RATING": process_rating,
+    "EXIT": exit_flow
+}
@@ -7,18 +7,16 @@ from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Importar componentes
-from src.core.database import Database
-from src.core.memory import RedisManager
-from src.routes import whatsapp_routes, home_assistant_routes
+from src.core.container import ServiceContainer
+from src.routes import whatsapp_routes, home_assistant_routes, metrics_routes
 from pathlib import Path
 
 
 # Cargar variables de entorno
 os.environ.clear()
 load_dotenv(override=True)
-# Inicializar servicios
-database = Database()
-redis_manager = RedisManager()
+# Contenedor de servicios compartidos (pools de BD, Redis y sesiones HTTP)
+services = ServiceContainer()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 static_dir = BASE_DIR / "public"
@@ -28,17 +26,18 @@ static_dir = BASE_DIR / "public"
 async def lifespan(app: FastAPI):
     # Inicializar servicios
     print("🚀 Iniciando servicios...")
-    await database.connect()
+    await services.start()
+    app.state.services = services
 
     # Cargar información del negocio en Redis
-    business_info = await database.load_business_info()
-    await redis_manager.set_value("info_business", business_info)
+    business_info = await services.database.load_business_info()
+    await services.whatsapp_controller.business_info.set(business_info)
 
     yield  # FastAPI ejecuta la app
 
     # Cerrar servicios al finalizar
     print("🔴 Cerrando servicios...")
-    await database.close()
+    await services.close()
 
 # Crear la aplicación FastAPI
 app = FastAPI(lifespan=lifespan)
@@ -52,6 +51,7 @@ app.include_router(whatsapp_routes.router,
                    prefix="/webhook", tags=["WhatsApp"])
 app.include_router(home_assistant_routes.router,
                    prefix="/webhook", tags=["Home Assistant"])
+app.include_router(metrics_routes.router, tags=["Métricas"])
 
 
 @app.get("/")
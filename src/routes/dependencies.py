@@ -0,0 +1,63 @@
+# src/routes/dependencies.py
+"""
+Dependencias de FastAPI que exponen los servicios del contenedor compartido.
+"""
+import secrets
+from typing import Optional
+from fastapi import Header, HTTPException, Request
+from src.config.settings import settings
+from src.core.container import ServiceContainer
+from src.core.database import Database
+from src.core.memory import RedisManager
+from src.core.message_queue import MessageQueue
+from src.controllers.whatsapp_controller import WhatsAppController
+from src.controllers.home_assistant_controller import HomeAssistantController
+from src.utils.metrics import StatusRingBuffer
+
+
+def get_services(request: Request) -> ServiceContainer:
+    """Devuelve el contenedor creado en el lifespan de la aplicación."""
+    return request.app.state.services
+
+
+def get_database(request: Request) -> Database:
+    """Devuelve el servicio de base de datos con los pools compartidos."""
+    return get_services(request).database
+
+
+def get_redis_manager(request: Request) -> RedisManager:
+    """Devuelve el gestor de Redis compartido."""
+    return get_services(request).redis_manager
+
+
+def get_whatsapp_controller(request: Request) -> WhatsAppController:
+    """Devuelve el controlador de WhatsApp compartido."""
+    return get_services(request).whatsapp_controller
+
+
+def get_home_assistant_controller(request: Request) -> HomeAssistantController:
+    """Devuelve el controlador de Home Assistant compartido."""
+    return get_services(request).home_assistant_controller
+
+
+def get_message_queue(request: Request) -> MessageQueue:
+    """Devuelve la cola de ingestión de mensajes de WhatsApp."""
+    return get_services(request).message_queue
+
+
+def get_status_buffer(request: Request) -> Optional[StatusRingBuffer]:
+    """Devuelve el buffer de estados de entrega (None si está deshabilitado)."""
+    return get_services(request).status_buffer
+
+
+def require_metrics_token(authorization: Optional[str] = Header(default=None)) -> None:
+    """
+    Protege los endpoints de métricas: deshabilitados (404) si no hay
+    METRICS_TOKEN configurado y, si lo hay, exigen "Bearer <token>".
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido",
+                            headers={"WWW-Authenticate": "Bearer"})
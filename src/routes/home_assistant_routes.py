@@ -5,34 +5,15 @@ import traceback
 from typing import Dict, Any
 from src.controllers.home_assistant_controller import HomeAssistantController
 from src.core.database import Database
+from src.routes.dependencies import get_home_assistant_controller, get_database
 
 router = APIRouter()
 
-# Dependencia para obtener el controlador
-
-
-async def get_controller():
-    controller = HomeAssistantController()
-    await controller.initialize()
-    try:
-        yield controller
-    finally:
-        await controller.close()
-
-
-async def get_database():
-    database = Database()
-    await database.connect()
-    try:
-        yield database
-    finally:
-        await database.close()
-
 
 @router.post("/home_assistant_response")
 async def process_home_assistant_response(
     request: Request,
-    controller: HomeAssistantController = Depends(get_controller),
+    controller: HomeAssistantController = Depends(get_home_assistant_controller),
     database: Database = Depends(get_database)
 ):
     """
@@ -77,7 +58,7 @@ async def process_home_assistant_response(
 @router.post("/trigger_home_assistant")
 async def trigger_home_assistant(
     request_data: Dict[str, Any] = Body(...),
-    controller: HomeAssistantController = Depends(get_controller)
+    controller: HomeAssistantController = Depends(get_home_assistant_controller)
 ):
     """
     Endpoint para disparar acciones en Home Assistant manualmente.
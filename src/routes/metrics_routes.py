@@ -0,0 +1,26 @@
+# src/routes/metrics_routes.py
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from src.routes.dependencies import require_metrics_token
+from src.utils.metrics import collect_metrics, histograms
+
+# Exponen detalles internos: solo con METRICS_TOKEN configurado y enviado
+router = APIRouter(dependencies=[Depends(require_metrics_token)])
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Endpoint con las métricas en memoria de los componentes registrados
+    """
+    return collect_metrics()
+
+
+@router.get("/metrics/histograms", response_class=PlainTextResponse)
+async def get_histograms():
+    """
+    Endpoint con los histogramas (duración de nodos y decisiones de los
+    grafos) en formato de texto de Prometheus
+    """
+    return PlainTextResponse(histograms.render_prometheus(),
+                             media_type="text/plain; version=0.0.4")
@@ -1,13 +1,21 @@
 # src/routes/whatsapp_routes.py
-from fastapi import APIRouter, Request, HTTPException
+import json
+from typing import Optional
+from fastapi import APIRouter, Request, HTTPException, Depends
 from src.controllers.whatsapp_controller import WhatsAppController
+from src.core.message_queue import MessageQueue
+from src.routes.dependencies import get_whatsapp_controller, get_message_queue, get_status_buffer
+from src.utils.helpers import is_status_only_payload, extract_status_events
+from src.utils.metrics import StatusRingBuffer
 
 router = APIRouter()
-whatsapp_controller = WhatsAppController()
 
 
 @router.get("/whatsapp")
-async def validate_webhook(request: Request):
+async def validate_webhook(
+    request: Request,
+    whatsapp_controller: WhatsAppController = Depends(get_whatsapp_controller)
+):
     """
     Endpoint para validar webhook de WhatsApp
     """
@@ -29,25 +37,35 @@ async def validate_webhook(request: Request):
 
 
 @router.post("/whatsapp")
-async def process_whatsapp_message(request: Request):
+async def process_whatsapp_message(
+    request: Request,
+    message_queue: MessageQueue = Depends(get_message_queue),
+    status_buffer: Optional[StatusRingBuffer] = Depends(get_status_buffer)
+):
     """
-    Endpoint para procesar mensajes de WhatsApp
+    Endpoint para recibir mensajes de WhatsApp.
+    Valida y encola el payload; el procesamiento ocurre en los workers de la cola.
     """
-    try:
-        # Inicializar servicios si es necesario
-        await whatsapp_controller.initialize()
+    body = await request.body()
+
+    # Camino rápido: las entregas de solo estados se responden sin decodificar el JSON
+    if is_status_only_payload(body):
+        if status_buffer is not None:
+            status_buffer.record(extract_status_events(body))
+        return {"status": "Estado ignorado"}
 
+    try:
         # Obtener payload
-        data = await request.json()
+        data = json.loads(body)
+    except Exception as e:
+        print(f"❌ Error al decodificar payload de WhatsApp: {e}")
+        raise HTTPException(status_code=400, detail="Payload inválido")
 
-        # Procesar mensaje
-        response = await whatsapp_controller.process_message(data)
+    if not isinstance(data, dict) or not data.get("entry"):
+        return {"status": "Payload ignorado"}
 
-        return response
+    # Si la cola está llena, Meta reintentará la entrega más tarde
+    if not message_queue.enqueue(data):
+        raise HTTPException(status_code=503, detail="Cola de mensajes llena")
 
-    except Exception as e:
-        print(f"❌ Error al procesar mensaje: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # Asegurarse de cerrar conexiones
-        await whatsapp_controller.close()
+    return {"status": "Mensaje encolado"}
@@ -1,5 +1,9 @@
 # src/templates/__init__.py
-from .keyboard_types import KEYBOARD_TYPES, get_keyboard_options_text, get_problems_options_text, generate_solution_response
+from .keyboard_types import (KEYBOARD_TYPES, KEYBOARD_INDEX, PROBLEM_INDEXES, SelectionIndex,
+                             get_keyboard_options_text, get_problems_options_text, generate_solution_response)
+from .business_responses import (GENERAL_INQUIRY_TEMPLATES, BusinessResponseBundle, BusinessResponseCache,
+                                 business_response_cache)
 
-__all__ = ["KEYBOARD_TYPES", "get_keyboard_options_text",
-           "get_problems_options_text", "generate_solution_response"]
+__all__ = ["KEYBOARD_TYPES", "KEYBOARD_INDEX", "PROBLEM_INDEXES", "SelectionIndex", "get_keyboard_options_text",
+           "get_problems_options_text", "generate_solution_response", "GENERAL_INQUIRY_TEMPLATES",
+           "BusinessResponseBundle", "BusinessResponseCache", "business_response_cache"]
@@ -0,0 +1,126 @@
+# src/template/business_responses.py
+"""
+Respuestas a las consultas generales con los datos del negocio.
+
+Las respuestas de cada intención se arman una sola vez por versión de la
+información del negocio (BusinessResponseBundle) y quedan en memoria; cada
+mensaje solo une las de las intenciones detectadas. El paquete se vuelve a
+armar únicamente cuando cambia la información del negocio.
+"""
+import json
+from typing import Any, Dict, Iterable, Optional
+
+# Respuesta por intención; los campos faltantes se muestran como "No disponible"
+GENERAL_INQUIRY_TEMPLATES = {
+    "direccion": "🏢 Nuestra dirección es: {direccion}",
+    "horario": "🕒 Nuestro horario de atención es: {horario}",
+    "email": "📧 Puedes contactarnos por email a: {email}",
+    "telefono1": "📞 Nuestro teléfono principal es: {telefono_1}",
+    "telefono2": "📞 Teléfono alternativo: {telefono_2}",
+    "telefono3": "📞 Otro teléfono: {telefono_3}",
+    "whatsapp_servicio_tecnico": "🔧 WhatsApp del servicio técnico: {whatsapp_servicio_tecnico}",
+    "whatsapp_ventas": "📞 WhatsApp de ventas: {whatsapp_ventas}",
+    "whatsapp_administracion": "📞 WhatsApp de administración: {whatsapp_administracion}",
+    "whatsapp_cobranza": "📞 WhatsApp de cobranza: {whatsapp_cobranza}",
+    "security": "🚨 Teléfono de Security 24: {security}",
+    "saludo": "👋 ¡Hola! Soy el asistente virtual de Taborra Alarmas SRL. ¿En qué puedo ayudarte hoy?",
+    "despedida": "👋 ¡Gracias por contactar a Taborra Alarmas SRL! Estamos para ayudarte cuando lo necesites.",
+    "agradecimiento": "🙏 De nada! Aqui estoy para lo que necesites de nuestros servicios! No dudes en preguntar si necesitas otra cosa."
+}
+
+
+class _BusinessFields(dict):
+    """Datos del negocio para format_map: los campos faltantes quedan "No disponible"."""
+
+    def __missing__(self, key: str) -> str:
+        return "No disponible"
+
+
+def business_info_version(business_info: Dict[str, Any]) -> str:
+    """
+    Versión de la información del negocio (cambia si cambia cualquier campo).
+
+    Args:
+        business_info: Información del negocio
+
+    Returns:
+        Representación canónica de los datos
+    """
+    return json.dumps(business_info or {}, sort_keys=True, default=str)
+
+
+class BusinessResponseBundle:
+    def __init__(self, business_info: Dict[str, Any]):
+        """
+        Arma las respuestas de todas las intenciones con una versión de la
+        información del negocio.
+
+        Args:
+            business_info: Información del negocio
+        """
+        self.version = business_info_version(business_info)
+        fields = _BusinessFields(business_info or {})
+        self.responses = {intent: template.format_map(fields)
+                          for intent, template in GENERAL_INQUIRY_TEMPLATES.items()}
+
+    def render(self, intents: Iterable[str]) -> Optional[str]:
+        """
+        Respuesta para las intenciones detectadas, en el orden recibido.
+
+        Args:
+            intents: Intenciones detectadas
+
+        Returns:
+            Respuestas unidas o None si ninguna intención tiene respuesta
+        """
+        responses = [self.responses[intent] for intent in intents if intent in self.responses]
+        return "\n\n".join(responses) if responses else None
+
+
+class BusinessResponseCache:
+    def __init__(self):
+        """
+        Inicializa la caché del paquete de respuestas vigente.
+        """
+        self.bundle: Optional[BusinessResponseBundle] = None
+        self.source: Optional[Dict[str, Any]] = None
+
+        # Métricas
+        self.builds = 0
+        self.version_checks = 0
+        self.lookups = 0
+
+    def get(self, business_info: Dict[str, Any]) -> BusinessResponseBundle:
+        """
+        Devuelve el paquete de respuestas de la información del negocio. Si
+        es el mismo objeto que la vez anterior se reutiliza sin compararlo;
+        si es otro, se compara su versión y solo se arma de nuevo si cambió.
+
+        Args:
+            business_info: Información del negocio
+
+        Returns:
+            Paquete de respuestas precompiladas
+        """
+        self.lookups += 1
+        if self.bundle is not None and business_info is self.source:
+            return self.bundle
+
+        self.version_checks += 1
+        if self.bundle is None or business_info_version(business_info) != self.bundle.version:
+            self.bundle = BusinessResponseBundle(business_info)
+            self.builds += 1
+        self.source = business_info
+        return self.bundle
+
+    def metrics(self) -> Dict[str, Any]:
+        """Paquetes armados, comparaciones de versión y consultas."""
+        return {
+            "builds": self.builds,
+            "version_checks": self.version_checks,
+            "lookups": self.lookups
+        }
+
+
+# Paquete compartido por todo el proceso
+business_response_cache = BusinessResponseCache()
@@ -1,5 +1,6 @@
 # Definición de tipos de teclados y sus problemas comunes
-from typing import Dict
+from typing import Any, Dict, List, Optional, Tuple
+from src.utils.helpers import remove_accents
 
 
 KEYBOARD_TYPES = {
@@ -332,6 +333,76 @@ KEYBOARD_TYPES = {
 }
 
 
+def normalize_option(text: str) -> str:
+    """
+    Normaliza la respuesta del usuario a un menú: sin acentos, en
+    minúsculas y sin puntuación en los extremos.
+
+    Args:
+        text: Texto del usuario
+
+    Returns:
+        Texto normalizado
+    """
+    text = (text or "").lower().strip(" .!?¿¡")
+    # La mayoría de las respuestas son ASCII (números, "si", modelos)
+    return text if text.isascii() else remove_accents(text)
+
+
+class SelectionIndex:
+    def __init__(self, items: Dict[str, Dict[str, Any]], label_field: str):
+        """
+        Índices precomputados para elegir una opción de un menú del catálogo
+        por número, por clave o por nombre. Se construyen una única vez al
+        cargar el catálogo.
+
+        Args:
+            items: Opciones del menú en el orden en que se muestran
+            label_field: Campo con el nombre visible de cada opción
+        """
+        self.keys = list(items)
+        self.by_number = {str(i): key for i, key in enumerate(self.keys, 1)}
+        # Nombres y claves normalizados, en el orden del catálogo
+        self.labels: List[Tuple[str, str]] = []
+        self.by_label: Dict[str, str] = {}
+        for key, item in items.items():
+            for label in (item[label_field], key):
+                normalized = normalize_option(label)
+                self.labels.append((normalized, key))
+                self.by_label.setdefault(normalized, key)
+        self.options_text = "".join(
+            f"{i}. {item[label_field]}\n" for i, item in enumerate(items.values(), 1))
+
+    def select(self, text: str) -> Optional[str]:
+        """
+        Elige la opción que corresponde a la respuesta del usuario: un número
+        del menú, o un nombre o clave exactos (búsqueda directa), o un
+        mensaje que contenga alguno de ellos.
+
+        Args:
+            text: Texto del usuario
+
+        Returns:
+            Clave de la opción o None si no se reconoce
+        """
+        message = normalize_option(text)
+        if message.isdigit():
+            return self.by_number.get(str(int(message)))
+        key = self.by_label.get(message)
+        if key:
+            return key
+        for label, key in self.labels:
+            if label in message:
+                return key
+        return None
+
+
+# Índices de selección de teclados y de los problemas de cada teclado
+KEYBOARD_INDEX = SelectionIndex(KEYBOARD_TYPES, "name")
+PROBLEM_INDEXES = {key: SelectionIndex(keyboard["problems"], "title")
+                   for key, keyboard in KEYBOARD_TYPES.items() if keyboard.get("problems")}
+
+
 def get_keyboard_image_url(keyboard_type, base_url):
     """Genera URL completa usando la base proporcionada"""
     keyboard = KEYBOARD_TYPES.get(keyboard_type)
@@ -347,10 +418,7 @@ def get_keyboard_options_text() -> str:
     Returns:
         Texto formateado con opciones
     """
-    options_text = ""
-    for i, (key, keyboard) in enumerate(KEYBOARD_TYPES.items(), 1):
-        options_text += f"{i}. {keyboard['name']}\n"
-    return options_text
+    return KEYBOARD_INDEX.options_text
 
 
 def get_problems_options_text(keyboard_type: str) -> str:
@@ -363,14 +431,10 @@ def get_problems_options_text(keyboard_type: str) -> str:
     Returns:
         Texto formateado con opciones
     """
-    keyboard = KEYBOARD_TYPES.get(keyboard_type)
-    if not keyboard or not keyboard.get("problems"):
+    index = PROBLEM_INDEXES.get(keyboard_type)
+    if not index:
         return "No hay problemas definidos para este teclado."
-
-    options_text = ""
-    for i, (key, problem) in enumerate(keyboard["problems"].items(), 1):
-        options_text += f"{i}. {problem['title']}\n"
-    return options_text
+    return index.options_text
 
 
 def generate_solution_response(problem_data: Dict) -> str:
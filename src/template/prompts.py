@@ -17,34 +17,139 @@ INTENTS_HA = {
     }
 }
 
-# Template base para el clasificador de intenciones (sin las intenciones de HA)
-INTENT_CLASSIFIER_BASE_TEMPLATE = """
-Eres un asistente especializado en detectar intenciones en mensajes.
-A continuación, se te dará un mensaje del usuario y deberás identificar todas las intenciones presentes.
-
-Las posibles intenciones son:
-- control_alarma: Si el usuario quiere controlar su alarma, es decir, cambiar algun estado. PRENDER, APAGAR, ANULAR, REINICIAR, ACTIVAR, DESACTIVAR.
-- direccion: Si pregunta dónde está ubicada la empresa o cómo llegar
-- horario: Si pregunta por los horarios de atención
-- email: Si solicita un correo electrónico de contacto
-- telefono[1,2,3]: Si pide un número de teléfono para llamar, devolve los 3 telefonos siempre
-- security: Si quiere contactar con el servicio de monitoreo (nombre empresa: Security 24)
-- whatsapp_servicio_tecnico: Si quiere contactar al servicio técnico
-- whatsapp_ventas: Si quiere contactar con ventas
-- whatsapp_administracion: Si quiere contactar con administración
-- whatsapp_cobranza: Si quiere contactar con cobranzas o pagar
-- saludo: Si está saludando
-- despedida: Si se está despidiendo
-- problema_alarma: Si indica que tiene un problema con su alarma, o tiene una pregunta frecuente de la alarma (como anular una zona, preguntas sobre su alarma, etc)
-- agradecimiento: Cuando el cliente agradece por la atención recibida.
-
-
-IMPORTANTE: NO clasifiques mensajes cortos y simples como "si", "no", "ok", o números sueltos. Estos NO deben tener ninguna intención asignada.
-
-Mensaje del usuario: {text}
-
-Devuelve solo las intenciones detectadas, separadas por comas. Si no detectas ninguna, devuelve "ninguna".
-"""
+# Prompt del clasificador de intenciones. Las instrucciones fijas van en el
+# mensaje de sistema, idéntico para todos los usuarios, para que el proveedor
+# pueda reutilizar el prefijo en caché; las intenciones de Home Assistant del
+# usuario y su mensaje van al final, en el mensaje humano.
+INTENT_CLASSIFIER_SYSTEM_TEMPLATE = """Eres un asistente especializado en detectar intenciones. Detecta todas las intenciones presentes en el mensaje del usuario.
+
+Intenciones posibles:
+- control_alarma: quiere cambiar el estado de su alarma (PRENDER, APAGAR, ANULAR, REINICIAR, ACTIVAR, DESACTIVAR)
+- direccion: pregunta dónde está la empresa o cómo llegar
+- horario: pregunta por los horarios de atención
+- email: pide un correo electrónico de contacto
+- telefono[1,2,3]: pide un teléfono para llamar; devuelve siempre telefono1,telefono2,telefono3
+- security: quiere contactar al servicio de monitoreo (Security 24)
+- whatsapp_servicio_tecnico: quiere contactar al servicio técnico
+- whatsapp_ventas: quiere contactar con ventas
+- whatsapp_administracion: quiere contactar con administración
+- whatsapp_cobranza: quiere contactar con cobranzas o pagar
+- saludo: está saludando
+- despedida: se está despidiendo
+- problema_alarma: tiene un problema o una pregunta frecuente sobre su alarma (anular una zona, etc.)
+- agradecimiento: agradece la atención recibida
+Si el mensaje trae "Intenciones de Home Assistant", también son posibles.
+
+Mensajes cortos como "si", "no", "ok" o números sueltos NO tienen intención.
+
+Devuelve solo las intenciones separadas por comas, o "ninguna" si no hay."""
+
+INTENT_CLASSIFIER_USER_TEMPLATE = """{ha_section}Mensaje del usuario: {text}"""
+
+# Vocabulario del clasificador local por reglas (sin acentos y en minúsculas).
+# Cada frase resuelve sus intenciones solo si el mensaje completo queda
+# cubierto por frases conocidas y palabras de relleno; si no, se consulta al LLM.
+INTENT_RULE_PHRASES = {
+    "saludo": ["hola", "buenas", "buen dia", "buenos dias", "buenas tardes",
+               "buenas noches", "que tal", "como estas", "como andan"],
+    "despedida": ["chau", "chao", "adios", "hasta luego", "hasta pronto", "nos vemos"],
+    "agradecimiento": ["gracias", "muchas gracias", "mil gracias", "te agradezco",
+                       "muy amable"],
+    "direccion": ["direccion", "donde estan", "donde quedan", "donde se encuentran",
+                  "ubicacion", "como llego", "domicilio"],
+    "horario": ["horario", "horarios", "horario de atencion", "a que hora abren",
+                "a que hora cierran", "hasta que hora"],
+    "email": ["email", "mail", "correo", "correo electronico"],
+    "telefono1,telefono2,telefono3": ["telefono", "telefonos", "numero de telefono",
+                                      "llamar", "llamarlos"],
+    "security": ["security", "security 24", "monitoreo", "central de monitoreo"],
+    "whatsapp_servicio_tecnico": ["servicio tecnico", "soporte tecnico", "tecnico"],
+    "whatsapp_ventas": ["ventas", "vendedor", "comprar", "presupuesto"],
+    "whatsapp_administracion": ["administracion"],
+    "whatsapp_cobranza": ["cobranza", "cobranzas", "pagar", "pago", "factura"],
+    "problema_alarma": ["problema con mi alarma", "problema con la alarma",
+                        "problemas con mi alarma", "problemas con la alarma"],
+}
+
+# Mensajes cortos que, según el prompt, no tienen ninguna intención
+TRIVIAL_MESSAGE_PHRASES = ["si", "no", "ok", "okey", "okay", "dale", "listo", "bueno",
+                           "bien", "perfecto", "salir", "cancelar", "menu", "volver"]
+
+# Palabras que pueden acompañar a una frase sin cambiar la intención
+INTENT_RULE_FILLER_WORDS = [
+    "a", "al", "con", "cual", "cuales", "dame", "de", "del", "el", "en", "es",
+    "favor", "info", "informacion", "la", "las", "los", "me", "mi", "necesito",
+    "numero", "o", "para", "pasame", "pasan", "pasas", "podrias", "por", "porfa",
+    "puedo", "quiero", "queria", "saber", "son", "su", "sus", "tienen", "tu",
+    "un", "una", "y", "e", "contacto", "contactar", "hablar", "comunicarme",
+    "whatsapp", "area", "sector", "consulta", "tengo", "hay",
+]
+
+# Frases del asistente de troubleshooting (sin acentos; se buscan como
+# palabras completas). "exit" termina el flujo en cualquier paso aunque
+# aparezca dentro de una frase; "exit_alone" solo si es el mensaje completo
+# o en la confirmación (paso 1), porque dentro de una respuesta es parte de
+# ella ("no puedo activar el sistema"); "confirm" acepta la ayuda ofrecida.
+# Si aparecen una salida y una confirmación, gana la salida.
+TROUBLESHOOTING_PHRASES = {
+    "exit": ["salir", "cancelar", "no quiero seguir", "quiero hablar de otra cosa", "menu principal",
+             "exit", "chau", "stop", "no me interesa", "otro tema", "no gracias"],
+    "exit_alone": ["no", "ya no", "volver", "atras", "menu", "terminar", "parar", "salida"],
+    "confirm": ["si", "yes", "quiero", "dale", "ok", "1", "aceptar"],
+}
+
+# Ejemplos semilla para entrenar el modelo local de intenciones
+# (python -m src.chains.train_intent_model). Se suman a las frases de
+# INTENT_RULE_PHRASES y al historial exportado; la clave "" agrupa los
+# mensajes sin intención.
+INTENT_TRAINING_SEED = {
+    "": ["si", "no", "ok", "dale", "1", "2", "3", "4", "5", "listo ya esta",
+         "ya lo hice", "sigue igual", "no funciono", "funciono perfecto",
+         "modelo 1555", "teclado alonso", "el de la foto", "no se cual es"],
+    "saludo": ["hola buenas", "hola que tal", "buen dia como estan",
+               "buenas tardes, como va", "hola!!", "holaa buenas noches"],
+    "despedida": ["bueno chau", "nos vemos, saludos", "hasta mañana",
+                  "me voy, hasta luego", "chau chau"],
+    "agradecimiento": ["gracias por la ayuda", "muchas gracias por todo",
+                       "genial gracias", "gracias, muy amables",
+                       "te agradezco la atencion"],
+    "direccion": ["donde queda el local", "cual es la direccion de la empresa",
+                  "donde estan ubicados", "como llego a la oficina",
+                  "me pasas la direccion", "en que calle estan"],
+    "horario": ["a que hora atienden", "cual es el horario de atencion",
+                "estan abiertos hoy", "atienden los sabados",
+                "hasta que hora estan", "que horarios tienen"],
+    "email": ["cual es el mail de la empresa", "me pasas un correo",
+              "a que email escribo", "tienen correo electronico"],
+    "telefono1,telefono2,telefono3": ["a que numero los llamo", "me pasas un telefono",
+                                      "tienen telefono fijo", "quiero llamarlos",
+                                      "cual es el numero para llamar"],
+    "security": ["quiero hablar con el monitoreo", "como contacto a security 24",
+                 "necesito la central de monitoreo", "numero de security"],
+    "whatsapp_servicio_tecnico": ["necesito un tecnico", "quiero hablar con servicio tecnico",
+                                  "pueden mandar un tecnico", "contacto de soporte tecnico"],
+    "whatsapp_ventas": ["quiero comprar una alarma", "quiero un presupuesto de camaras",
+                        "hablar con ventas", "cuanto sale una alarma"],
+    "whatsapp_administracion": ["hablar con administracion", "contacto de administracion",
+                                "consulta administrativa"],
+    "whatsapp_cobranza": ["quiero pagar la cuota", "como pago la factura",
+                          "hablar con cobranzas", "tengo una deuda", "medios de pago"],
+    "problema_alarma": ["tengo un problema con la alarma", "la alarma no anda",
+                        "la alarma suena sola", "no puedo activar la alarma",
+                        "como anulo una zona", "el teclado no prende",
+                        "la alarma no se desactiva", "me pide la clave y no funciona",
+                        "tengo un problema"],
+    "control_alarma": ["activa la alarma", "desactiva la alarma", "prende la alarma",
+                       "apaga la alarma", "anula la zona 3", "reinicia la alarma"],
+    "estado_alarma": ["como esta la alarma", "la alarma esta activada?",
+                      "estado de la alarma", "esta prendida la alarma"],
+    "escaneo_camara": ["escanea las camaras", "revisa las camaras",
+                       "fijate las camaras", "hace un escaneo de camaras"],
+    "video_camara": ["mandame un video de la camara", "quiero ver un video del patio",
+                     "video de la camara de la entrada"],
+    "imagen_camara": ["mandame una foto de la camara", "quiero una imagen del frente",
+                      "captura de la camara del garage"],
+}
 
 # Template para respuestas generales
 GENERAL_RESPONSE_TEMPLATE = """
@@ -7,16 +7,23 @@ from src.config.settings import settings
 
 
 class HomeAssistantTools:
-    def __init__(self, webhook_url: Optional[str] = None, token: Optional[str] = None):
+    def __init__(
+        self,
+        webhook_url: Optional[str] = None,
+        token: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None
+    ):
         """
         Inicializa la herramienta para comunicarse con Home Assistant vía webhook.
 
         Args:
             webhook_url: URL del webhook configurado en Home Assistant del cliente
             token: Token de autenticación para el webhook
+            session: Sesión HTTP compartida (opcional)
         """
         self.webhook_url = webhook_url
         self.token = token
+        self.session = session
 
         if not self.webhook_url:
             print("⚠️ No se ha configurado un webhook para Home Assistant")
@@ -53,37 +60,40 @@ class HomeAssistantTools:
         if params:
             payload["params"] = params
 
+        session = self.session or aiohttp.ClientSession()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.webhook_url,
-                    headers={
-                        "Authorization": f"Bearer {self.token}",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload
-                ) as response:
-                    text = await response.text()
-                    print(f"Respuesta del webhook HA: {text}")
-                    if response.status == 200:
-                        try:
-                            # Siempre intentar obtener el JSON
-                            response_data = await response.json()
-                            print(f"Respuesta del webhook HA: {response_data}")
-                            return {
-                                "success": True,
-                                "data": response_data
-                            }
-                        except Exception:
-                            # Si no hay JSON, devolver éxito sin datos
-                            return {
-                                "success": True,
-                                "message": "Solicitud enviada exitosamente"
-                            }
-                    else:
-                        error_text = await response.text()
+            async with session.post(
+                self.webhook_url,
+                headers={
+                    "Authorization": f"Bearer {self.token}",
+                    "Content-Type": "application/json"
+                },
+                json=payload
+            ) as response:
+                text = await response.text()
+                print(f"Respuesta del webhook HA: {text}")
+                if response.status == 200:
+                    try:
+                        # Siempre intentar obtener el JSON
+                        response_data = await response.json()
+                        print(f"Respuesta del webhook HA: {response_data}")
                         return {
-                            "error": f"Error en la llamada al webhook (código {response.status}): {error_text}"
+                            "success": True,
+                            "data": response_data
                         }
+                    except Exception:
+                        # Si no hay JSON, devolver éxito sin datos
+                        return {
+                            "success": True,
+                            "message": "Solicitud enviada exitosamente"
+                        }
+                else:
+                    error_text = await response.text()
+                    return {
+                        "error": f"Error en la llamada al webhook (código {response.status}): {error_text}"
+                    }
         except Exception as e:
             return {"error": f"Error de conexión con Home Assistant: {str(e)}"}
+        finally:
+            if session is not self.session:
+                await session.close()
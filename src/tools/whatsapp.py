@@ -4,23 +4,31 @@ from src.config.settings import settings
 
 
 class WhatsAppService:
-    def __init__(self, phone_id: Optional[str] = None, access_token: Optional[str] = None):
+    def __init__(
+        self,
+        phone_id: Optional[str] = None,
+        access_token: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None
+    ):
         """
         Inicializa el servicio de WhatsApp.
 
         Args:
             phone_id: ID del teléfono en WhatsApp Business API
             access_token: Token de acceso
+            session: Sesión HTTP compartida (opcional). Si no se indica, se
+                abre una sesión temporal por cada envío
         """
         self.phone_id = phone_id or settings.WHATSAPP_PHONE_ID
         self.access_token = access_token or settings.WHATSAPP_ACCESS_TOKEN
+        self.session = session
 
         if not self.phone_id or not self.access_token:
             print("⚠️ El servicio de WhatsApp está deshabilitado")
             self.enabled = False
         else:
             self.enabled = True
-            self.api_url = f"https://graph.facebook.com/v22.0/{self.phone_id}/messages"
+            self.api_url = f"{settings.WHATSAPP_API_URL}/{self.phone_id}/messages"
             self.headers = {
                 "Authorization": f"Bearer {self.access_token}",
                 "Content-Type": "application/json"
@@ -126,28 +134,32 @@ class WhatsAppService:
         Returns:
             Respuesta de la API
         """
+        session = self.session or aiohttp.ClientSession()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_url,
-                    json=payload,
-                    headers=self.headers,
-                    timeout=10
-                ) as response:
-                    response_data = await response.json()
-
-                    if response.status == 200:
-                        print(
-                            f"✅ Éxito enviando {action_desc}: {response_data}")
-                    else:
-                        print(
-                            f"⚠️ Error enviando {action_desc}: {response_data}")
-
-                    return response_data
+            async with session.post(
+                self.api_url,
+                json=payload,
+                headers=self.headers,
+                timeout=settings.HTTP_TIMEOUT
+            ) as response:
+                response_data = await response.json()
+
+                if response.status == 200:
+                    print(
+                        f"✅ Éxito enviando {action_desc}: {response_data}")
+                else:
+                    print(
+                        f"⚠️ Error enviando {action_desc}: {response_data}")
+
+                return response_data
         except Exception as e:
             error_data = {"error": f"Error al enviar {action_desc}: {str(e)}"}
             print(f"❌ {error_data['error']}")
             return error_data
+        finally:
+            # Solo cerrar la sesión si fue creada para este envío
+            if session is not self.session:
+                await session.close()
 
     async def split_and_send_message(self, to: str, message: str, max_length: int = 4000) -> List[Dict[str, Any]]:
         """
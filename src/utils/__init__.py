@@ -1,4 +1,6 @@
 # src/utils/__init__.py
-from .helpers import normalize_phone, remove_accents, parse_whatsapp_payload
+from .helpers import normalize_phone, normalize_text, remove_accents, parse_whatsapp_payload, iter_whatsapp_messages
+from .phrase_matcher import PhraseMatcher
 
-__all__ = ["normalize_phone", "remove_accents", "parse_whatsapp_payload"]
+__all__ = ["PhraseMatcher", "normalize_phone", "normalize_text", "remove_accents",
+           "parse_whatsapp_payload", "iter_whatsapp_messages"]
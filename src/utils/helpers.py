@@ -1,6 +1,9 @@
 # src/utils/helpers.py
+import re
 import unicodedata
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Tuple
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9ñ]+")
 
 
 def normalize_phone(phone: str) -> str:
@@ -39,67 +42,158 @@ def remove_accents(text: str) -> str:
     return ''.join([c for c in text if not unicodedata.combining(c)])
 
 
-def parse_whatsapp_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+_STATUSES_KEY_RE = re.compile(rb'"statuses"\s*:')
+_MESSAGES_KEY_RE = re.compile(rb'"messages"\s*:')
+_STATUS_VALUE_RE = re.compile(rb'"status"\s*:\s*"([a-z_]+)"')
+_STATUS_TIMESTAMP_RE = re.compile(rb'"timestamp"\s*:\s*"?(\d+)')
+
+
+def normalize_text(text: str) -> str:
     """
-    Procesa el payload de WhatsApp para extraer información relevante.
+    Normaliza un mensaje: sin acentos, minúsculas y sin signos de puntuación.
 
     Args:
-        data: Payload de WhatsApp
+        text: Texto del usuario
 
     Returns:
-        Diccionario con datos extraídos
+        Texto normalizado con palabras separadas por un espacio
     """
-    try:
-        result = {
-            "success": False,
-            "message_id": None,
-            "text": None,
-            "phone": None,
-            "name": None
-        }
+    text = (text or "").lower()
+    if not text.isascii():
+        text = remove_accents(text)
+    return _NON_WORD_RE.sub(" ", text).strip()
+
+
+def is_status_only_payload(body: bytes) -> bool:
+    """
+    Detecta sin decodificar el JSON si una entrega solo trae estados
+    (sent/delivered/read/failed) y ningún mensaje entrante.
+
+    Se buscan las claves (con comillas y ':'), de modo que ni el valor
+    "field": "messages" ni un texto de usuario (escapado en el JSON) que
+    contenga esas palabras producen falsos positivos.
+
+    Args:
+        body: Cuerpo crudo de la solicitud
+
+    Returns:
+        True si la entrega es solo de estados
+    """
+    return _STATUSES_KEY_RE.search(body) is not None and _MESSAGES_KEY_RE.search(body) is None
+
+
+def extract_status_events(body: bytes) -> List[Tuple[str, int]]:
+    """
+    Extrae pares (estado, timestamp) de una entrega de estados sin decodificar el JSON.
+
+    Args:
+        body: Cuerpo crudo de la solicitud
 
-        entry = data.get("entry", [])
-        if not entry:
-            return result
+    Returns:
+        Lista de pares (estado, timestamp unix); timestamp 0 si no se pudo asociar
+    """
+    statuses = _STATUS_VALUE_RE.findall(body)
+    timestamps = _STATUS_TIMESTAMP_RE.findall(body)
+    if len(timestamps) != len(statuses):
+        timestamps = [b"0"] * len(statuses)
+    return [(status.decode(), int(timestamp)) for status, timestamp in zip(statuses, timestamps)]
 
-        changes = entry[0].get("changes", [])
-        if not changes:
-            return result
 
-        value = changes[0].get("value", {})
-        if "statuses" in value:
-            return result
+def _parse_message(message_data: Dict[str, Any], contact_names: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Extrae la información relevante de un mensaje individual.
 
-        messages = value.get("messages", [])
-        if not messages:
-            return result
+    Args:
+        message_data: Mensaje dentro de value["messages"]
+        contact_names: Nombres de perfil indexados por wa_id
 
-        message_data = messages[0]
-        result["message_id"] = message_data.get("id", "")
+    Returns:
+        Diccionario con datos extraídos
+    """
+    result = {
+        "success": False,
+        "message_id": message_data.get("id", ""),
+        "text": None,
+        "phone": None,
+        "name": None
+    }
+
+    # Extraer texto
+    if message_data.get("type") == "text":
+        result["text"] = message_data.get("text", {}).get("body", "")
+    elif message_data.get("type") == "interactive":
+        interactive = message_data.get("interactive", {})
+        if interactive.get("type") == "button_reply":
+            result["text"] = interactive.get(
+                "button_reply", {}).get("title", "")
+
+    # Extraer teléfono
+    sender = message_data.get("from", "")
+    result["phone"] = normalize_phone(sender)
+
+    # Extraer nombre (por wa_id; si no coincide, el primer contacto)
+    result["name"] = contact_names.get(sender) or next(
+        iter(contact_names.values()), "Usuario")
+
+    if result["message_id"] and result["text"] and result["phone"]:
+        result["success"] = True
+
+    return result
+
+
+def iter_whatsapp_messages(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre todas las entradas y cambios de un payload de WhatsApp y
+    genera un diccionario por cada mensaje entrante, en el orden de entrega.
 
-        # Extraer texto
-        if message_data.get("type") == "text":
-            result["text"] = message_data.get("text", {}).get("body", "")
-        elif message_data.get("type") == "interactive":
-            interactive = message_data.get("interactive", {})
-            if interactive.get("type") == "button_reply":
-                result["text"] = interactive.get(
-                    "button_reply", {}).get("title", "")
+    Args:
+        data: Payload de WhatsApp
 
-        # Extraer teléfono
-        result["phone"] = normalize_phone(message_data.get("from", ""))
+    Yields:
+        Diccionario con datos extraídos de cada mensaje
+    """
+    for entry in data.get("entry", None) or []:
+        for change in entry.get("changes", None) or []:
+            value = change.get("value", {}) or {}
+            messages = value.get("messages", None) or []
+            if not messages:
+                # Cambios de solo estados (sent/delivered/read) u otros eventos
+                continue
+
+            contact_names = {}
+            for contact in value.get("contacts", None) or []:
+                name = (contact.get("profile") or {}).get("name")
+                if name:
+                    contact_names[contact.get("wa_id", "")] = name
+
+            for message_data in messages:
+                try:
+                    yield _parse_message(message_data, contact_names)
+                except Exception as e:
+                    print(f"❌ Error al procesar mensaje de WhatsApp: {e}")
 
-        # Extraer nombre
-        try:
-            result["name"] = value.get("contacts", [{}])[0]["profile"]["name"]
-        except (IndexError, KeyError):
-            result["name"] = "Usuario"
 
-        if result["message_id"] and result["text"] and result["phone"]:
-            result["success"] = True
+def parse_whatsapp_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Procesa el payload de WhatsApp y devuelve solo el primer mensaje.
+    Para entregas con varios mensajes usar iter_whatsapp_messages.
 
-        return result
+    Args:
+        data: Payload de WhatsApp
 
+    Returns:
+        Diccionario con datos extraídos
+    """
+    try:
+        for message in iter_whatsapp_messages(data):
+            return message
+        return {
+            "success": False,
+            "message_id": None,
+            "text": None,
+            "phone": None,
+            "name": None
+        }
     except Exception as e:
         print(f"❌ Error al procesar payload de WhatsApp: {e}")
         return {"success": False}
@@ -0,0 +1,256 @@
+# src/utils/metrics.py
+"""
+Utilidades mínimas de métricas en memoria.
+
+Cada componente registra una función que devuelve un diccionario con sus
+métricas actuales; el endpoint /metrics las agrupa por nombre. Los
+histogramas con etiquetas (p. ej. la duración de cada nodo del grafo) se
+exponen además en formato de texto de Prometheus en /metrics/histograms.
+"""
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+# Límites de los buckets de duración en milisegundos
+DEFAULT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 1000):
+        """
+        Ventana acotada con las últimas muestras de latencia.
+
+        Args:
+            size: Cantidad máxima de muestras conservadas
+        """
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def observe(self, value_ms: float) -> None:
+        """Registra una muestra en milisegundos."""
+        self.samples.append(value_ms)
+        self.count += 1
+
+    def percentile(self, pct: float) -> float:
+        """Percentil por rango más cercano sobre la ventana actual."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = max(0, min(len(ordered) - 1,
+                  int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[idx]
+
+    def snapshot(self) -> Dict[str, float]:
+        """Resumen de la ventana: total observado, p50, p99 y máximo."""
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(50), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            "max_ms": round(max(self.samples), 2) if self.samples else 0.0
+        }
+
+
+class StatusRingBuffer:
+    # Códigos compactos para los estados de entrega de WhatsApp
+    STATUS_CODES = {"sent": 1, "delivered": 2, "read": 3, "failed": 4}
+    STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+    def __init__(self, size: int = 4096):
+        """
+        Buffer circular de tamaño fijo con los últimos eventos de estado.
+        Guarda un byte por estado y el retraso (segundos) entre el timestamp
+        de Meta y la recepción del webhook.
+
+        Args:
+            size: Cantidad máxima de eventos conservados
+        """
+        self.size = size
+        self.codes = bytearray(size)
+        self.lags = array("d", bytes(8 * size))
+        self.position = 0
+        self.total = 0
+
+    def record(self, events: Iterable[Tuple[str, int]]) -> None:
+        """
+        Registra eventos (estado, timestamp unix de Meta).
+
+        Args:
+            events: Pares (estado, timestamp)
+        """
+        now = time.time()
+        for status, timestamp in events:
+            idx = self.position
+            self.codes[idx] = self.STATUS_CODES.get(status, 0)
+            self.lags[idx] = max(0.0, now - timestamp) if timestamp else -1.0
+            self.position = (idx + 1) % self.size
+            self.total += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Conteo y retraso p50/p99 por estado sobre el buffer actual."""
+        filled = min(self.total, self.size)
+        by_status: Dict[str, list] = {}
+        for idx in range(filled):
+            name = self.STATUS_NAMES.get(self.codes[idx], "other")
+            by_status.setdefault(name, []).append(self.lags[idx])
+
+        result = {"total": self.total, "window": filled}
+        for name, lags in by_status.items():
+            lags = sorted(lag for lag in lags if lag >= 0)
+            result[name] = {
+                "count": len(by_status[name]),
+                "lag_p50_s": round(lags[len(lags) // 2], 3) if lags else None,
+                "lag_p99_s": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 3) if lags else None
+            }
+        return result
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS_MS):
+        """
+        Histograma acumulado con buckets fijos: memoria constante sin
+        importar cuántas muestras se observen.
+
+        Args:
+            buckets: Límites superiores de los buckets, en orden creciente
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Registra una muestra."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Any:
+        """
+        Estimación del cuantil: límite superior del bucket que lo contiene
+        ("+Inf" si cae por encima del último bucket).
+        """
+        if not self.count:
+            return 0.0
+        target, cumulative = q * self.count, 0
+        for idx, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target and idx < len(self.buckets):
+                return self.buckets[idx]
+        return "+Inf"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Total, suma, promedio y cuantiles p50/p99 estimados."""
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "avg": round(self.sum / self.count, 3) if self.count else 0.0,
+            "p50_le": self.quantile(0.5),
+            "p99_le": self.quantile(0.99)
+        }
+
+
+class HistogramRegistry:
+    def __init__(self):
+        """
+        Registro de histogramas por nombre y etiquetas.
+        """
+        self.histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], Histogram]] = {}
+        self.buckets: Dict[str, Sequence[float]] = {}
+        # Acceso rápido por las etiquetas en el orden en que llegan (sin ordenar en cada muestra)
+        self._lookup: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], Histogram] = {}
+
+    def histogram(self, name: str, buckets: Optional[Sequence[float]] = None, **labels: str) -> Histogram:
+        """
+        Devuelve (o crea) el histograma de un nombre y combinación de etiquetas.
+
+        Args:
+            name: Nombre de la métrica
+            buckets: Límites de los buckets (solo se usan al crear la métrica)
+            **labels: Etiquetas de la serie
+
+        Returns:
+            Histograma de la serie
+        """
+        lookup_key = (name, tuple(labels.items()))
+        histogram = self._lookup.get(lookup_key)
+        if histogram is not None:
+            return histogram
+
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            bucket_bounds = self.buckets.setdefault(name, buckets or DEFAULT_BUCKETS_MS)
+            histogram = series[key] = Histogram(bucket_bounds)
+        self._lookup[lookup_key] = histogram
+        return histogram
+
+    def observe(self, name: str, value: float, buckets: Optional[Sequence[float]] = None, **labels: str) -> None:
+        """Registra una muestra en la serie indicada."""
+        self.histogram(name, buckets, **labels).observe(value)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Resumen de cada serie: {métrica: {"etiqueta=valor,...": resumen}}."""
+        return {
+            name: {",".join(f"{k}={v}" for k, v in key): histogram.snapshot()
+                   for key, histogram in series.items()}
+            for name, series in self.histograms.items()
+        }
+
+    def render_prometheus(self) -> str:
+        """Todas las series en formato de texto de Prometheus."""
+        lines: List[str] = []
+        for name, series in self.histograms.items():
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in series.items():
+                labels = [f'{k}="{_escape_label(v)}"' for k, v in key]
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    bucket_labels = ",".join(labels + [f'le="{bound}"'])
+                    lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative}")
+                suffix = "{" + ",".join(labels) + "}" if labels else ""
+                lines.append(f"{name}_sum{suffix} {histogram.sum}")
+                lines.append(f"{name}_count{suffix} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    """Escapa un valor de etiqueta para el formato de Prometheus."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Histogramas compartidos por todo el proceso
+histograms = HistogramRegistry()
+
+
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """
+    Registra (o reemplaza) un proveedor de métricas.
+
+    Args:
+        name: Nombre del componente
+        provider: Función sin argumentos que devuelve las métricas actuales
+    """
+    _providers[name] = provider
+
+
+def collect_metrics() -> Dict[str, Any]:
+    """
+    Recolecta las métricas de todos los componentes registrados.
+
+    Returns:
+        Diccionario {componente: métricas}
+    """
+    result = {}
+    for name, provider in _providers.items():
+        try:
+            result[name] = provider()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
@@ -0,0 +1,107 @@
+# src/utils/phrase_matcher.py
+"""
+Búsqueda simultánea de muchas frases en un mensaje.
+
+Las frases de una tabla (por categoría) se compilan una sola vez en un trie
+de palabras sobre el texto normalizado (sin acentos ni puntuación). Cada
+mensaje se recorre una vez, palabra por palabra, con un costo que no depende
+de la cantidad de frases; al comparar palabras completas "no" no coincide
+dentro de "nombre".
+"""
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from src.utils.helpers import normalize_text
+
+# Marca de fin de frase dentro de un nodo del trie
+_PHRASE_END = ""
+
+
+class PhraseMatcher:
+    def __init__(self, phrases: Dict[str, Iterable[str]]):
+        """
+        Compila el trie de la tabla de frases.
+
+        Args:
+            phrases: Frases por categoría (p. ej. {"exit": [...], "confirm": [...]})
+        """
+        self.phrase_categories: Dict[str, Set[str]] = {}
+        self.trie: Dict[str, Any] = {}
+        for category, category_phrases in phrases.items():
+            for phrase in category_phrases:
+                normalized = normalize_text(phrase)
+                if not normalized:
+                    continue
+                self.phrase_categories.setdefault(normalized, set()).add(category)
+                node = self.trie
+                for word in normalized.split():
+                    node = node.setdefault(word, {})
+                node[_PHRASE_END] = normalized
+
+    def find(self, text: str) -> List[str]:
+        """
+        Frases de la tabla encontradas en el mensaje, en orden de aparición.
+        En cada posición gana la frase más larga ("no quiero seguir" antes
+        que "no") y las coincidencias no se superponen.
+
+        Args:
+            text: Texto del usuario
+
+        Returns:
+            Lista de frases normalizadas
+        """
+        return self._find_words(normalize_text(text).split())
+
+    def _find_words(self, words: List[str]) -> List[str]:
+        """Frases encontradas en las palabras ya normalizadas (ver find)."""
+        found: List[str] = []
+        i, total = 0, len(words)
+        while i < total:
+            node = self.trie.get(words[i])
+            if node is None:
+                i += 1
+                continue
+            match, end, j = node.get(_PHRASE_END), i + 1, i + 1
+            while j < total:
+                node = node.get(words[j])
+                if node is None:
+                    break
+                j += 1
+                if _PHRASE_END in node:
+                    match, end = node[_PHRASE_END], j
+            if match:
+                found.append(match)
+                i = end
+            else:
+                i += 1
+        return found
+
+    def scan(self, text: str) -> Tuple[Set[str], bool]:
+        """
+        Categorías de las frases encontradas y si el mensaje está formado
+        solo por frases de la tabla ("no", "ok no", "no, no").
+
+        Args:
+            text: Texto del usuario
+
+        Returns:
+            (conjunto de categorías, True si no hay palabras fuera de las frases)
+        """
+        words = normalize_text(text).split()
+        found: Set[str] = set()
+        covered = 0
+        phrases = self._find_words(words)
+        for phrase in phrases:
+            found |= self.phrase_categories[phrase]
+            covered += phrase.count(" ") + 1
+        return found, bool(phrases) and covered == len(words)
+
+    def categories(self, text: str) -> Set[str]:
+        """
+        Categorías de las frases encontradas en el mensaje.
+
+        Args:
+            text: Texto del usuario
+
+        Returns:
+            Conjunto de categorías (vacío si no hay ninguna frase)
+        """
+        return self.scan(text)[0]
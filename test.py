@@ -59,7 +59,8 @@ async def test_conversation():
         }
 
         # Procesar con el grafo
-        result = conversation_graph.invoke(state)
+        result = await conversation_graph.ainvoke(
+            state, config={"configurable": {"database": database}})
 
         # Extraer respuesta
         if result["messages"] and len(result["messages"]) > len(messages_history):